@@ -0,0 +1,70 @@
+# app/core/category_names.py
+
+from typing import Dict, Iterable, Optional
+
+from bson import ObjectId
+
+from .cache import TTLCache
+from .config import settings
+from .versions import categories_version, read_version
+from ..db.mongodb import database
+
+# Nome exibido para agrupamentos sem categoria (transações antigas sem nome
+# nem category_id, ou categorias que não existem mais)
+UNCATEGORIZED = "Sem categoria"
+
+
+class CategoryNameMap:
+    """
+    Mapa usuário -> {category_id: nome}, mantido em memória.
+    Os relatórios agrupam por category_id e resolvem os nomes aqui, sem um
+    $lookup por relatório. O mapa guarda o contador `categories:<id>` lido ao
+    montá-lo; as rotas de criação, atualização e exclusão de categorias
+    incrementam o contador, então um nome alterado em qualquer worker aparece
+    no relatório seguinte.
+    """
+
+    def __init__(self, maxsize: int, ttl: float):
+        self._cache = TTLCache(maxsize=maxsize, ttl=ttl)
+
+    async def _load(self, user_id: ObjectId, version: int) -> Dict[ObjectId, str]:
+        names = {}
+        async for category in database["categories"].find({"user_id": user_id}, {"name": 1}):
+            names[category["_id"]] = category["name"]
+        self._cache.set(user_id, (version, names))
+        return names
+
+    async def get_names(self, user_id: ObjectId, category_ids: Iterable[ObjectId] = ()) -> Dict[ObjectId, str]:
+        """
+        Retorna os nomes das categorias do usuário. O mapa é recarregado se o
+        contador de categorias mudou ou se algum dos `category_ids` não estiver
+        nele (ex.: categoria criada antes do contador existir).
+        """
+        # O contador é lido antes das categorias: uma alteração no meio muda o
+        # contador e o mapa montado aqui é descartado na próxima consulta
+        version = await read_version(categories_version(user_id))
+        cached = self._cache.get(user_id)
+        if cached is not None and cached[0] == version:
+            names = cached[1]
+            if all(category_id in names for category_id in category_ids):
+                return names
+        return await self._load(user_id, version)
+
+    @staticmethod
+    def name_of(names: Dict[ObjectId, str], category_id: Optional[ObjectId], legacy_name: Optional[str] = None) -> str:
+        """Nome de um agrupamento: pelo category_id, ou pelo nome legado gravado na transação."""
+        if category_id is not None:
+            return names.get(category_id, UNCATEGORIZED)
+        return legacy_name or UNCATEGORIZED
+
+    def invalidate_user(self, user_id: ObjectId) -> None:
+        self._cache.invalidate(user_id)
+
+    def stats(self) -> dict:
+        return self._cache.stats()
+
+
+category_names = CategoryNameMap(
+    maxsize=settings.CATEGORY_NAME_CACHE_MAXSIZE,
+    ttl=settings.CATEGORY_NAME_CACHE_TTL_SECONDS
+)
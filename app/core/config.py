@@ -1,4 +1,5 @@
 # app/core/config.py
+from typing import Literal, Optional
 from pydantic_settings import BaseSettings, SettingsConfigDict
 
 class Settings(BaseSettings):
@@ -6,9 +7,71 @@ class Settings(BaseSettings):
     MONGO_URL: str
     DATABASE_NAME: str
 
+    # Pool de conexões do MongoDB
+    MONGO_MAX_POOL_SIZE: int = 100
+    MONGO_MIN_POOL_SIZE: int = 0
+    MONGO_MAX_IDLE_TIME_MS: Optional[int] = None
+    MONGO_WAIT_QUEUE_TIMEOUT_MS: Optional[int] = None
+    # Compressão do protocolo, em ordem de preferência (ex.: "zstd,snappy,zlib").
+    # zstd e snappy dependem dos pacotes zstandard / python-snappy.
+    MONGO_COMPRESSORS: str = ""
+    # Transações multi-documento nas escritas de transações (saldos e rollups).
+    # None detecta no startup: ligadas em replica set / mongos, desligadas em servidor standalone.
+    MONGO_TRANSACTIONS: Optional[bool] = None
+    # Preferência de leitura das queries de relatório e dashboard
+    MONGO_REPORT_READ_PREFERENCE: Literal[
+        "primary", "primaryPreferred", "secondary", "secondaryPreferred", "nearest"
+    ] = "primary"
+
     # Adicione esta linha para a chave secreta da autenticação
     SECRET_KEY: str
 
+    # Índices: se True, o startup roda explain() nas queries dos routers
+    # e falha caso alguma delas planeje um COLLSCAN
+    VERIFY_INDEXES: bool = False
+
+    # Cache do usuário autenticado (evita um find_one em users por requisição)
+    USER_CACHE_MAXSIZE: int = 10_000
+    USER_CACHE_TTL_SECONDS: float = 60.0
+
+    # Mapa de acesso usuário -> contas usado nas verificações de permissão
+    ACCOUNT_ACCESS_CACHE_MAXSIZE: int = 10_000
+    ACCOUNT_ACCESS_CACHE_TTL_SECONDS: float = 30.0
+
+    # Pool dedicado ao bcrypt: threads de trabalho, tamanho máximo da fila
+    # e quanto tempo uma requisição espera por uma vaga antes de receber 503
+    PASSWORD_HASH_WORKERS: int = 4
+    PASSWORD_HASH_MAX_QUEUE: int = 64
+    PASSWORD_HASH_QUEUE_TIMEOUT_SECONDS: float = 5.0
+
+    # Cache de tokens JWT já verificados (as entradas nunca passam do 'exp' do token)
+    TOKEN_CACHE_MAXSIZE: int = 50_000
+    TOKEN_CACHE_MAX_TTL_SECONDS: float = 300.0
+
+    # Cache dos períodos já fechados da série temporal de relatórios (por usuário).
+    # As escritas deste processo invalidam os períodos afetados; o TTL limita o
+    # tempo que escritas feitas por outros workers levam para aparecer.
+    TIMESERIES_CACHE_MAXSIZE: int = 2_000
+    TIMESERIES_CACHE_TTL_SECONDS: float = 600.0
+
+    # Nomes das categorias de cada usuário, usados para rotular os relatórios
+    CATEGORY_NAME_CACHE_MAXSIZE: int = 10_000
+    CATEGORY_NAME_CACHE_TTL_SECONDS: float = 300.0
+
+    # Jobs em segundo plano (app/db/jobs.py): tamanho de cada lote, pausa entre
+    # lotes para não saturar o primário e validade do lease do worker
+    JOB_CHUNK_SIZE: int = 500
+    JOB_CHUNK_PAUSE_SECONDS: float = 0.05
+    JOB_LEASE_SECONDS: float = 60.0
+
+    # Agendador das transações recorrentes (app/db/recurring.py): intervalo entre
+    # as varreduras, tamanho de cada insert_many e limite de ocorrências
+    # atrasadas geradas por regra em uma varredura (o restante fica para a próxima)
+    RECURRING_SCHEDULER_ENABLED: bool = True
+    RECURRING_SCHEDULER_INTERVAL_SECONDS: float = 60.0
+    RECURRING_INSERT_BATCH_SIZE: int = 1000
+    RECURRING_MAX_CATCH_UP: int = 60
+
     # Define o arquivo de onde carregar as variáveis (.env)
     model_config = SettingsConfigDict(env_file=".env")
 
@@ -0,0 +1,98 @@
+# app/core/export.py
+
+"""
+Exportação de transações em streaming (NDJSON ou CSV).
+
+Os geradores consomem um cursor do Motor documento a documento e emitem blocos
+de bytes de tamanho limitado, então o uso de memória é o mesmo para cem ou
+para milhões de transações.
+"""
+
+import csv
+import io
+import json
+from datetime import datetime
+from decimal import Decimal
+from typing import Any, AsyncIterator, Dict
+
+from bson import ObjectId
+
+# Campos exportados, na mesma ordem do modelo TransactionInDB
+EXPORT_FIELDS = [
+    "_id", "user_id", "account_id", "category_id", "type", "status", "expense_type",
+    "description", "value", "transaction_date", "notes",
+]
+CSV_FIELDS = EXPORT_FIELDS + ["current_installment", "total_installments"]
+
+# Tamanho aproximado de cada bloco enviado ao cliente
+CHUNK_SIZE = 64 * 1024
+
+
+def _json_default(value: Any) -> Any:
+    if isinstance(value, ObjectId):
+        return str(value)
+    if isinstance(value, Decimal):
+        return str(value)
+    if isinstance(value, datetime):
+        return value.isoformat()
+    raise TypeError(f"Tipo não serializável: {type(value).__name__}")
+
+
+def _export_row(doc: Dict[str, Any]) -> Dict[str, Any]:
+    row = {field: doc.get(field) for field in EXPORT_FIELDS}
+    row["installment_details"] = doc.get("installment_details")
+    return row
+
+
+async def stream_ndjson(cursor) -> AsyncIterator[bytes]:
+    """Emite uma transação por linha em JSON (application/x-ndjson)."""
+    buffer = []
+    size = 0
+    try:
+        async for doc in cursor:
+            line = json.dumps(_export_row(doc), default=_json_default, ensure_ascii=False) + "\n"
+            buffer.append(line)
+            size += len(line)
+            if size >= CHUNK_SIZE:
+                yield "".join(buffer).encode("utf-8")
+                buffer.clear()
+                size = 0
+        if buffer:
+            yield "".join(buffer).encode("utf-8")
+    finally:
+        await cursor.close()
+
+
+def _csv_value(value: Any) -> Any:
+    if value is None:
+        return ""
+    if isinstance(value, (ObjectId, Decimal)):
+        return str(value)
+    if isinstance(value, datetime):
+        return value.isoformat()
+    return value
+
+
+async def stream_csv(cursor) -> AsyncIterator[bytes]:
+    """Emite as transações em CSV, com cabeçalho na primeira linha."""
+    output = io.StringIO()
+    writer = csv.writer(output)
+    writer.writerow(CSV_FIELDS)
+    try:
+        async for doc in cursor:
+            installments = doc.get("installment_details") or {}
+            writer.writerow(
+                [_csv_value(doc.get(field)) for field in EXPORT_FIELDS]
+                + [
+                    _csv_value(installments.get("current_installment")),
+                    _csv_value(installments.get("total_installments")),
+                ]
+            )
+            if output.tell() >= CHUNK_SIZE:
+                yield output.getvalue().encode("utf-8")
+                output.seek(0)
+                output.truncate(0)
+        if output.tell():
+            yield output.getvalue().encode("utf-8")
+    finally:
+        await cursor.close()
@@ -0,0 +1,292 @@
+# app/core/metrics.py
+
+"""
+Métricas em memória no formato de exposição do Prometheus.
+
+Implementação mínima de Counter, Gauge e Histogram com rótulos, suficiente para
+expor a latência por rota, as requisições em andamento e a duração dos comandos
+do MongoDB no endpoint /metrics.
+"""
+
+import time
+from bisect import bisect_left
+from threading import Lock
+from typing import Callable, Dict, List, Tuple
+
+from pymongo import monitoring
+
+# Limites (em segundos) dos buckets dos histogramas de latência
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+LabelValues = Tuple[str, ...]
+
+
+def _format_labels(names: Tuple[str, ...], values: LabelValues, extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+class _Metric:
+    type_name = ""
+
+    def __init__(self, name: str, documentation: str, labelnames: Tuple[str, ...] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = labelnames
+        self._lock = Lock()
+
+    def _header(self) -> List[str]:
+        return [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.type_name}"]
+
+
+class Counter(_Metric):
+    type_name = "counter"
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._values: Dict[LabelValues, float] = {}
+
+    def inc(self, *labels: str, amount: float = 1.0) -> None:
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0.0) + amount
+
+    def render(self) -> List[str]:
+        # Cópia sob o lock: os listeners do driver chamam inc() de outras threads
+        with self._lock:
+            values = list(self._values.items())
+        lines = self._header()
+        for labels, value in sorted(values):
+            lines.append(f"{self.name}{_format_labels(self.labelnames, labels)} {value}")
+        return lines
+
+
+class Gauge(Counter):
+    type_name = "gauge"
+
+    def dec(self, *labels: str, amount: float = 1.0) -> None:
+        self.inc(*labels, amount=-amount)
+
+    def set(self, *labels: str, value: float) -> None:
+        with self._lock:
+            self._values[labels] = value
+
+
+class CallbackMetric(_Metric):
+    """Métrica cujo valor é lido de uma função no momento da exposição."""
+
+    def __init__(self, name: str, documentation: str, callback: Callable[[], Dict[LabelValues, float]],
+                 labelnames: Tuple[str, ...] = (), type_name: str = "gauge"):
+        super().__init__(name, documentation, labelnames)
+        self._callback = callback
+        self.type_name = type_name
+
+    def render(self) -> List[str]:
+        lines = self._header()
+        for labels, value in sorted(self._callback().items()):
+            lines.append(f"{self.name}{_format_labels(self.labelnames, labels)} {value}")
+        return lines
+
+
+class Histogram(_Metric):
+    type_name = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: Tuple[str, ...] = (),
+                 buckets: Tuple[float, ...] = DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+        # Para cada combinação de rótulos: contagem por bucket, soma e total
+        self._values: Dict[LabelValues, list] = {}
+
+    def observe(self, value: float, *labels: str) -> None:
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            entry = self._values.get(labels)
+            if entry is None:
+                entry = self._values[labels] = [[0] * len(self.buckets), 0.0, 0]
+            if index < len(self.buckets):
+                entry[0][index] += 1
+            entry[1] += value
+            entry[2] += 1
+
+    def render(self) -> List[str]:
+        # Cópia sob o lock (inclusive das contagens, que observe() altera no lugar)
+        with self._lock:
+            values = [(labels, (list(entry[0]), entry[1], entry[2])) for labels, entry in self._values.items()]
+        lines = self._header()
+        for labels, (bucket_counts, total, count) in sorted(values):
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets, bucket_counts):
+                cumulative += bucket_count
+                le = _format_labels(self.labelnames, labels, f'le="{bound}"')
+                lines.append(f"{self.name}_bucket{le} {cumulative}")
+            le = _format_labels(self.labelnames, labels, 'le="+Inf"')
+            lines.append(f"{self.name}_bucket{le} {count}")
+            lines.append(f"{self.name}_sum{_format_labels(self.labelnames, labels)} {total}")
+            lines.append(f"{self.name}_count{_format_labels(self.labelnames, labels)} {count}")
+        return lines
+
+
+class Registry:
+    def __init__(self):
+        self._metrics: List[_Metric] = []
+
+    def register(self, metric):
+        self._metrics.append(metric)
+        return metric
+
+    def render(self) -> str:
+        lines = []
+        for metric in self._metrics:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+registry = Registry()
+
+# --- MÉTRICAS HTTP ---
+
+http_request_duration = registry.register(Histogram(
+    "http_request_duration_seconds",
+    "Latência das requisições HTTP por rota.",
+    ("method", "route", "status"),
+))
+http_requests_in_flight = registry.register(Gauge(
+    "http_requests_in_flight",
+    "Requisições HTTP em andamento por rota.",
+    ("method", "route"),
+))
+
+# --- MÉTRICAS DO MONGODB ---
+
+mongo_command_duration = registry.register(Histogram(
+    "mongodb_command_duration_seconds",
+    "Duração dos comandos do MongoDB por coleção e comando.",
+    ("collection", "command", "outcome"),
+))
+mongo_command_documents = registry.register(Counter(
+    "mongodb_command_documents_total",
+    "Documentos retornados ou afetados pelos comandos do MongoDB.",
+    ("collection", "command"),
+))
+
+
+def register_cache_metrics(caches: Dict[str, Callable[[], dict]]) -> None:
+    """
+    Expõe acertos, falhas e tamanho de caches em memória.
+    `caches` mapeia o nome do cache para uma função que retorna o seu stats().
+    """
+    def collect(field: str) -> Callable[[], Dict[LabelValues, float]]:
+        return lambda: {(name, ): stats()[field] for name, stats in caches.items()}
+
+    registry.register(CallbackMetric(
+        "app_cache_hits_total", "Acertos dos caches em memória.", collect("hits"), ("cache",), "counter"
+    ))
+    registry.register(CallbackMetric(
+        "app_cache_misses_total", "Falhas dos caches em memória.", collect("misses"), ("cache",), "counter"
+    ))
+    registry.register(CallbackMetric(
+        "app_cache_size", "Entradas atualmente nos caches em memória.", collect("size"), ("cache",)
+    ))
+
+
+# --- MIDDLEWARE ---
+
+class MetricsMiddleware:
+    """
+    Middleware ASGI que mede a latência de cada requisição e o número de
+    requisições em andamento. A rota é identificada pelo template do path
+    (ex.: /transactions/{id}), para não criar uma série por ID.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        method = scope["method"]
+        route = _route_template(scope)
+        status_code = "500"
+
+        async def send_wrapper(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = str(message["status"])
+            await send(message)
+
+        http_requests_in_flight.inc(method, route)
+        started = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            http_requests_in_flight.dec(method, route)
+            http_request_duration.observe(time.perf_counter() - started, method, route, status_code)
+
+
+def _route_template(scope) -> str:
+    """Descobre o template da rota que atende o path, sem executar o endpoint."""
+    from starlette.routing import Match
+
+    app = scope.get("app")
+    router = getattr(app, "router", None)
+    for route in getattr(router, "routes", []):
+        match, child_scope = route.matches(scope)
+        if match == Match.FULL:
+            route = child_scope.get("route", route)
+            return getattr(route, "path", scope["path"])
+    return "unmatched"
+
+
+# --- LISTENER DE COMANDOS DO MONGODB ---
+
+class MongoCommandListener(monitoring.CommandListener):
+    """
+    Registra a duração e a quantidade de documentos de cada comando enviado
+    ao MongoDB, separados por coleção e nome do comando.
+    """
+
+    def __init__(self):
+        self._pending: Dict[Tuple[int, int], Tuple[str, str]] = {}
+        self._lock = Lock()
+
+    def started(self, event: monitoring.CommandStartedEvent) -> None:
+        collection = event.command.get(event.command_name)
+        if not isinstance(collection, str):
+            # Comandos como getMore guardam a coleção em outro campo
+            collection = event.command.get("collection", "-")
+        with self._lock:
+            self._pending[(event.request_id, event.operation_id)] = (collection, event.command_name)
+
+    def succeeded(self, event: monitoring.CommandSucceededEvent) -> None:
+        collection, command = self._pop(event)
+        mongo_command_duration.observe(event.duration_micros / 1_000_000, collection, command, "success")
+        documents = _document_count(event.reply)
+        if documents:
+            mongo_command_documents.inc(collection, command, amount=documents)
+
+    def failed(self, event: monitoring.CommandFailedEvent) -> None:
+        collection, command = self._pop(event)
+        mongo_command_duration.observe(event.duration_micros / 1_000_000, collection, command, "failure")
+
+    def _pop(self, event) -> Tuple[str, str]:
+        with self._lock:
+            return self._pending.pop((event.request_id, event.operation_id), ("-", event.command_name))
+
+
+def _document_count(reply) -> int:
+    """Quantidade de documentos lidos (cursor) ou escritos (n) por um comando."""
+    cursor = reply.get("cursor")
+    if isinstance(cursor, dict):
+        batch = cursor.get("firstBatch", cursor.get("nextBatch"))
+        if batch is not None:
+            return len(batch)
+    n = reply.get("n")
+    return n if isinstance(n, int) else 0
@@ -0,0 +1,62 @@
+# app/core/pagination.py
+
+import base64
+import json
+from datetime import datetime
+from typing import Any, Dict, Tuple
+
+from bson import ObjectId
+
+
+class InvalidCursorError(ValueError):
+    """Levantada quando o token de continuação não pode ser decodificado."""
+
+
+def encode_cursor(sort_value: datetime, document_id: ObjectId) -> str:
+    """
+    Gera um token de continuação opaco a partir da chave de ordenação
+    (transaction_date, _id) do último documento da página.
+    """
+    payload = {"d": sort_value.isoformat(), "i": str(document_id)}
+    raw = json.dumps(payload, separators=(",", ":")).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Tuple[datetime, ObjectId]:
+    """Decodifica um token gerado por encode_cursor."""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        payload = json.loads(base64.urlsafe_b64decode(padded.encode("ascii")))
+        return datetime.fromisoformat(payload["d"]), ObjectId(payload["i"])
+    except Exception as exc:
+        raise InvalidCursorError("Cursor inválido.") from exc
+
+
+def encode_score_cursor(score: float, document_id: ObjectId) -> str:
+    """Token de continuação para listagens ordenadas por relevância (score, _id)."""
+    payload = {"s": score, "i": str(document_id)}
+    raw = json.dumps(payload, separators=(",", ":")).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+
+def decode_score_cursor(cursor: str) -> Tuple[float, ObjectId]:
+    """Decodifica um token gerado por encode_score_cursor."""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        payload = json.loads(base64.urlsafe_b64decode(padded.encode("ascii")))
+        return float(payload["s"]), ObjectId(payload["i"])
+    except Exception as exc:
+        raise InvalidCursorError("Cursor inválido.") from exc
+
+
+def keyset_filter(field: str, sort_value: Any, document_id: ObjectId) -> Dict[str, Any]:
+    """
+    Filtro que posiciona a busca logo após o último documento visto,
+    para uma ordenação descendente por (field, _id).
+    """
+    return {
+        "$or": [
+            {field: {"$lt": sort_value}},
+            {field: sort_value, "_id": {"$lt": document_id}},
+        ]
+    }
@@ -0,0 +1,157 @@
+# app/core/permissions.py
+
+from typing import Dict, List, Optional
+
+from bson import ObjectId
+from fastapi import HTTPException
+
+from .cache import TTLCache
+from .config import settings
+from .versions import access_version, bump, read_version
+from ..db.loader import account_loader
+from ..db.mongodb import database
+
+# Níveis de acesso a uma conta, do mais fraco para o mais forte.
+# "owner" não é gravado no banco: é derivado do campo user_id da conta.
+ACCESS_LEVELS = {"read": 1, "edit": 2, "owner": 3}
+
+
+def _level_from_account(account: dict, user_id: ObjectId) -> Optional[str]:
+    """Calcula o nível de acesso de um usuário a partir do documento da conta."""
+    if account["user_id"] == user_id:
+        return "owner"
+
+    for permission in account.get("permissions") or []:
+        if permission["user_id"] == user_id:
+            return permission["permission_level"]
+    return None
+
+
+def has_access(account: dict, user_id: ObjectId, required_level: str = "read") -> bool:
+    """Se o usuário tem pelo menos o nível pedido na conta, a partir do documento dela."""
+    level = _level_from_account(account, user_id)
+    return level is not None and ACCESS_LEVELS[level] >= ACCESS_LEVELS[required_level]
+
+
+class AccountAccessMap:
+    """
+    Mapa pré-calculado usuário -> {account_id: nível}, mantido em memória.
+    Um único find() monta o mapa de um usuário; as verificações seguintes
+    servem do mapa enquanto o contador de acesso do usuário (`access:<id>` em
+    change_versions) não mudar. As escritas que alteram o acesso incrementam
+    o contador, então um compartilhamento rebaixado ou removido em um worker
+    vale em todos na verificação seguinte. A leitura do contador é uma busca
+    por _id agrupada pelo DataLoader entre as requisições concorrentes.
+    """
+
+    def __init__(self, maxsize: int, ttl: float):
+        self._cache = TTLCache(maxsize=maxsize, ttl=ttl)
+
+    async def get_levels(self, user_id: ObjectId) -> Dict[ObjectId, str]:
+        # O contador é lido ANTES das contas: uma alteração no meio muda o
+        # contador e o mapa montado aqui é descartado na próxima verificação
+        version = await read_version(access_version(user_id))
+        cached = self._cache.get(user_id)
+        if cached is not None and cached[0] == version:
+            return cached[1]
+
+        levels = {}
+        cursor = database["accounts"].find(
+            {"$or": [{"user_id": user_id}, {"permissions.user_id": user_id}]},
+            {"user_id": 1, "permissions": 1}
+        )
+        async for account in cursor:
+            level = _level_from_account(account, user_id)
+            if level is not None:
+                levels[account["_id"]] = level
+
+        self._cache.set(user_id, (version, levels))
+        return levels
+
+    def forget_user(self, user_id: ObjectId) -> None:
+        """Descarta o mapa do usuário só neste worker (ex.: mapa desatualizado no caminho frio)."""
+        self._cache.invalidate(user_id)
+
+    async def invalidate_user(self, user_id: ObjectId) -> None:
+        """Invalida o mapa do usuário em todos os workers."""
+        await bump(access_version(user_id))
+        self.forget_user(user_id)
+
+    async def invalidate_account(self, account: dict) -> None:
+        """Invalida o mapa do dono e de todos os usuários com quem a conta é compartilhada."""
+        user_ids = [account["user_id"]]
+        user_ids.extend(permission["user_id"] for permission in account.get("permissions") or [])
+        await bump(*(access_version(user_id) for user_id in user_ids))
+        for user_id in user_ids:
+            self.forget_user(user_id)
+
+    def stats(self) -> dict:
+        return self._cache.stats()
+
+
+account_access = AccountAccessMap(
+    maxsize=settings.ACCOUNT_ACCESS_CACHE_MAXSIZE,
+    ttl=settings.ACCOUNT_ACCESS_CACHE_TTL_SECONDS
+)
+
+
+async def accounts_with_access(user_id: ObjectId, required_level: str = "read") -> List[ObjectId]:
+    """
+    Contas em que o usuário tem pelo menos o nível pedido, lidas do mapa de acesso.
+    Usado como filtro ($in) de escritas condicionais, que assim verificam a
+    permissão na própria operação, sem uma leitura prévia do documento.
+    """
+    levels = await account_access.get_levels(user_id)
+    return [
+        account_id for account_id, level in levels.items()
+        if ACCESS_LEVELS[level] >= ACCESS_LEVELS[required_level]
+    ]
+
+
+async def get_account_access_level(
+    account_id: ObjectId,
+    user_id: ObjectId,
+    not_found_detail: str = "A conta especificada não foi encontrada."
+) -> Optional[str]:
+    """
+    Retorna o nível de acesso do usuário à conta ('owner', 'edit', 'read') ou None.
+    Levanta 404 se a conta não existir.
+    """
+    levels = await account_access.get_levels(user_id)
+    level = levels.get(account_id)
+    if level is not None:
+        return level
+
+    # Caminho frio: a conta não está no mapa. Consultamos o documento para
+    # diferenciar "não existe" de "sem permissão" e para corrigir um mapa
+    # desatualizado.
+    account = await account_loader.load(account_id)
+    if not account:
+        raise HTTPException(status_code=404, detail=not_found_detail)
+
+    level = _level_from_account(account, user_id)
+    if level is not None:
+        account_access.forget_user(user_id)
+    return level
+
+
+async def verify_account_permission(
+    account_id: ObjectId,
+    user_id: ObjectId,
+    required_level: str = "read"
+) -> str:
+    """
+    Verifica se o usuário tem a permissão necessária na conta.
+    Levanta exceções HTTP se a conta não for encontrada ou se não houver permissão.
+    required_level pode ser 'read', 'edit' ou 'owner'.
+    """
+    level = await get_account_access_level(account_id, user_id)
+    if level is None:
+        raise HTTPException(status_code=403, detail="Você não tem permissão para acessar esta conta.")
+
+    if ACCESS_LEVELS[level] < ACCESS_LEVELS[required_level]:
+        if required_level == "owner":
+            raise HTTPException(status_code=403, detail="Apenas o dono pode realizar esta operação.")
+        raise HTTPException(status_code=403, detail="Você não tem permissão de edição para esta conta.")
+
+    return level
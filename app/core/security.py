@@ -1,18 +1,60 @@
 # app/core/security.py
 
+import asyncio
+import hashlib
+import time
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta
-from typing import Optional
+from typing import Callable, Optional, TypeVar
 from jose import JWTError, jwt
 from passlib.context import CryptContext
+from .cache import TTLCache
 from .config import settings
+from .metrics import Gauge, Histogram, registry
+
+T = TypeVar("T")
 
 # 1. Configuração do Hashing de Senhas
 #    Usamos o algoritmo bcrypt, que é o padrão da indústria.
 pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 
+#    O bcrypt é propositalmente lento (dezenas de ms). Para não travar o event
+#    loop, o hashing roda em um pool de threads de tamanho fixo (o bcrypt libera
+#    o GIL). O semáforo limita quantas operações podem estar no pool ou na fila:
+#    numa avalanche de logins as excedentes esperam e, depois do timeout,
+#    recebem 503 em vez de acumular trabalho sem limite.
+_hash_executor = ThreadPoolExecutor(
+    max_workers=settings.PASSWORD_HASH_WORKERS, thread_name_prefix="password-hash"
+)
+_hash_slots = asyncio.Semaphore(settings.PASSWORD_HASH_WORKERS + settings.PASSWORD_HASH_MAX_QUEUE)
+
+password_hash_pending = registry.register(Gauge(
+    "password_hash_pending",
+    "Operações de bcrypt em execução ou aguardando no pool.",
+))
+
+
+class PasswordHasherBusyError(Exception):
+    """Levantada quando o pool de hashing está saturado além do tempo de espera."""
+
 # 2. Definição dos parâmetros do Token JWT
 ALGORITHM = "HS256"
 ACCESS_TOKEN_EXPIRE_MINUTES = 30  # O token expira em 30 minutos
+REFRESH_TOKEN_EXPIRE_MINUTES = 60 * 24 * 7  # O refresh token expira em 7 dias
+
+# 3. Cache de tokens já verificados
+#    O mesmo bearer token chega centenas de vezes por minuto; guardamos as claims
+#    decodificadas, indexadas por um digest do token, até o 'exp' do próprio token.
+token_cache = TTLCache(
+    maxsize=settings.TOKEN_CACHE_MAXSIZE,
+    ttl=settings.TOKEN_CACHE_MAX_TTL_SECONDS
+)
+
+jwt_decode_duration = registry.register(Histogram(
+    "jwt_decode_duration_seconds",
+    "Tempo de CPU gasto em jwt.decode nas falhas do cache de tokens.",
+    buckets=(0.00001, 0.000025, 0.00005, 0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005),
+))
 
 # --- Funções de Segurança ---
 
@@ -24,6 +66,29 @@ def get_password_hash(password: str) -> str:
     """Gera o hash de uma senha em texto puro."""
     return pwd_context.hash(password)
 
+async def _run_in_hash_pool(func: Callable[..., T], *args) -> T:
+    """Executa uma função de hashing no pool dedicado, respeitando o limite da fila."""
+    try:
+        await asyncio.wait_for(_hash_slots.acquire(), timeout=settings.PASSWORD_HASH_QUEUE_TIMEOUT_SECONDS)
+    except asyncio.TimeoutError:
+        raise PasswordHasherBusyError()
+
+    password_hash_pending.inc()
+    try:
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(_hash_executor, func, *args)
+    finally:
+        password_hash_pending.dec()
+        _hash_slots.release()
+
+async def verify_password_async(plain_password: str, hashed_password: str) -> bool:
+    """Versão assíncrona de verify_password: roda o bcrypt fora do event loop."""
+    return await _run_in_hash_pool(verify_password, plain_password, hashed_password)
+
+async def get_password_hash_async(password: str) -> str:
+    """Versão assíncrona de get_password_hash: roda o bcrypt fora do event loop."""
+    return await _run_in_hash_pool(get_password_hash, password)
+
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     """Cria um novo token de acesso JWT."""
     to_encode = data.copy()
@@ -34,4 +99,27 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
 
     to_encode.update({"exp": expire})
     encoded_jwt = jwt.encode(to_encode, settings.SECRET_KEY, algorithm=ALGORITHM)
-    return encoded_jwt
\ No newline at end of file
+    return encoded_jwt
+
+def decode_access_token(token: str) -> dict:
+    """
+    Verifica e decodifica um token JWT, reaproveitando o resultado de verificações
+    anteriores do mesmo token. Levanta JWTError se o token for inválido ou expirado.
+    Tokens inválidos nunca são armazenados.
+    """
+    key = hashlib.sha256(token.encode("utf-8")).digest()
+    payload = token_cache.get(key)
+    if payload is not None:
+        return payload
+
+    started = time.perf_counter()
+    payload = jwt.decode(token, settings.SECRET_KEY, algorithms=[ALGORITHM])
+    jwt_decode_duration.observe(time.perf_counter() - started)
+
+    ttl = settings.TOKEN_CACHE_MAX_TTL_SECONDS
+    expires_at = payload.get("exp")
+    if isinstance(expires_at, (int, float)):
+        ttl = min(ttl, expires_at - time.time())
+    if ttl > 0:
+        token_cache.set(key, payload, ttl=ttl)
+    return payload
@@ -0,0 +1,108 @@
+# app/core/serialization.py
+
+"""
+Serialização rápida de documentos do MongoDB para JSON.
+
+As rotas de listagem devolvem documentos que o próprio servidor gravou. Em vez
+de revalidar cada linha pelo response_model (PyObjectId, Decimal, etc.), os
+documentos são convertidos diretamente em bytes JSON, produzindo o mesmo
+esquema de resposta: mesmos campos, mesma ordem, ObjectId e Decimal como string
+e datas em ISO 8601. A serialização usa o orjson (dependência do projeto): com
+o json da biblioteca padrão este caminho não seria mais rápido que o
+response_model.
+"""
+
+from datetime import date, datetime
+from decimal import Decimal
+from enum import Enum
+from typing import Any, Dict, FrozenSet, Iterable, List, Optional, Tuple, Type
+
+import orjson
+from bson import ObjectId
+from fastapi import Response
+from pydantic import BaseModel
+
+
+def _default(value: Any) -> Any:
+    """Converte os tipos que o encoder JSON não conhece nativamente."""
+    if isinstance(value, (ObjectId, Decimal)):
+        return str(value)
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    if isinstance(value, Enum):
+        return value.value
+    raise TypeError(f"Tipo não serializável: {type(value).__name__}")
+
+
+def dumps(content: Any) -> bytes:
+    """Serializa para bytes JSON compactos, no mesmo formato da JSONResponse."""
+    return orjson.dumps(content, default=_default)
+
+
+class DocumentSerializer:
+    """
+    Projeta documentos do banco nos campos de um modelo Pydantic.
+    Os campos são lidos pelo alias (ex.: `_id`) e emitidos com o mesmo nome que o
+    FastAPI usaria (by_alias=True). Campos ausentes recebem o valor padrão do
+    modelo e campos extras do documento são descartados.
+    `fields`, quando informado, limita a saída a esse subconjunto de campos
+    (mantendo a ordem do modelo).
+    """
+
+    def __init__(self, model: Type[BaseModel], fields: Optional[FrozenSet[str]] = None):
+        self._fields: List[Tuple[str, Any]] = []
+        for name, info in model.model_fields.items():
+            key = info.alias or name
+            if fields is not None and key not in fields:
+                continue
+            default = None if info.is_required() or info.default_factory else info.default
+            self._fields.append((key, default))
+
+    def row(self, doc: Dict[str, Any]) -> Dict[str, Any]:
+        return {key: doc.get(key, default) for key, default in self._fields}
+
+    def dumps(self, docs: Iterable[Dict[str, Any]]) -> bytes:
+        return dumps([self.row(doc) for doc in docs])
+
+
+_serializers: Dict[Tuple[Type[BaseModel], Optional[FrozenSet[str]]], DocumentSerializer] = {}
+
+
+def serializer_for(model: Type[BaseModel], fields: Optional[Iterable[str]] = None) -> DocumentSerializer:
+    """Retorna (e memoriza) o serializador de um modelo e subconjunto de campos."""
+    key = (model, frozenset(fields) if fields is not None else None)
+    serializer = _serializers.get(key)
+    if serializer is None:
+        serializer = _serializers[key] = DocumentSerializer(model, key[1])
+    return serializer
+
+
+def model_field_keys(model: Type[BaseModel]) -> Tuple[str, ...]:
+    """Nomes dos campos de um modelo como aparecem nos documentos (alias ou nome)."""
+    return tuple(info.alias or name for name, info in model.model_fields.items())
+
+
+def documents_response(
+    docs: Iterable[Dict[str, Any]],
+    model: Type[BaseModel],
+    headers: Optional[Dict[str, str]] = None,
+    fields: Optional[Iterable[str]] = None
+) -> Response:
+    """Resposta JSON de uma lista de documentos confiáveis, sem revalidação."""
+    return Response(
+        content=serializer_for(model, fields).dumps(docs),
+        media_type="application/json",
+        headers=headers
+    )
+
+
+def document_response(
+    doc: Dict[str, Any],
+    model: Type[BaseModel],
+    fields: Optional[Iterable[str]] = None
+) -> Response:
+    """Resposta JSON de um único documento confiável, sem revalidação."""
+    return Response(
+        content=dumps(serializer_for(model, fields).row(doc)),
+        media_type="application/json"
+    )
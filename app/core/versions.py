@@ -0,0 +1,153 @@
+# app/core/versions.py
+
+"""
+Versões de alteração por usuário e por conta, usadas nos ETags das leituras.
+
+Cada usuário e cada conta têm um contador na coleção `change_versions`. As
+escritas dos routers de transações, contas e categorias (e os jobs e o
+agendador de recorrências, que também gravam transações) incrementam o
+contador de quem foi afetado, na mesma transação multi-documento da escrita
+quando ela existe, ou logo depois dela. Como o contador fica no banco, uma
+escrita feita em qualquer worker invalida os ETags de todos.
+
+Outros contadores por usuário validam caches em memória, que assim valem
+entre workers:
+- `access:<id>` muda quando as contas a que ele tem acesso mudam (criação,
+  exclusão ou compartilhamento de conta) e valida o mapa de acesso de
+  app/core/permissions.py;
+- `history:<id>` muda quando uma escrita toca uma transação com data anterior
+  ao dia atual (a única que pode alterar um intervalo já fechado) e valida o
+  cache de intervalos fechados de app/db/timeseries.py;
+- `categories:<id>` muda a cada criação, edição ou exclusão de categoria e
+  valida o mapa de nomes de app/core/category_names.py.
+
+As rotas de leitura derivam um ETag forte do path, da query string e dos
+contadores relevantes, lidos numa única busca por _id, e respondem
+`If-None-Match` com 304 sem executar a consulta da rota. Os contadores são
+lidos ANTES da consulta: uma escrita que termine durante a leitura muda o
+contador e o ETag devolvido deixa de valer, nunca o contrário.
+"""
+
+import hashlib
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, Iterable, List
+
+from bson import ObjectId
+from fastapi import HTTPException, Request, status
+from pymongo import UpdateOne
+
+from ..db.loader import change_version_loader
+from ..db.mongodb import database
+
+VERSION_COLLECTION = "change_versions"
+
+# Folga do corte de `history:<id>`: uma escrita datada de ontem que só termina
+# alguns minutos depois da meia-noite ainda incrementa o contador
+HISTORY_CUTOFF_MARGIN = timedelta(minutes=5)
+
+
+def user_version(user_id: ObjectId) -> str:
+    return f"user:{user_id}"
+
+
+def account_version(account_id: ObjectId) -> str:
+    return f"account:{account_id}"
+
+
+def access_version(user_id: ObjectId) -> str:
+    return f"access:{user_id}"
+
+
+def history_version(user_id: ObjectId) -> str:
+    return f"history:{user_id}"
+
+
+def categories_version(user_id: ObjectId) -> str:
+    return f"categories:{user_id}"
+
+
+async def bump(*keys: str, session=None) -> None:
+    """Incrementa os contadores das chaves (criando os que não existem)."""
+    operations = [
+        UpdateOne({"_id": key}, {"$inc": {"version": 1}}, upsert=True) for key in sorted(set(keys))
+    ]
+    if operations:
+        await database[VERSION_COLLECTION].bulk_write(operations, ordered=False, session=session)
+
+
+async def bump_user(user_id: ObjectId, session=None) -> None:
+    await bump(user_version(user_id), session=session)
+
+
+async def bump_categories(user_id: ObjectId, session=None) -> None:
+    """Incrementa a versão do usuário e a das suas categorias."""
+    await bump(user_version(user_id), categories_version(user_id), session=session)
+
+
+async def bump_account(account: Dict[str, Any], session=None) -> None:
+    """Incrementa a versão da conta e a do seu dono."""
+    await bump(account_version(account["_id"]), user_version(account["user_id"]), session=session)
+
+
+def _history_cutoff() -> datetime:
+    """Início do dia (UTC, sem fuso) a partir do qual nenhum intervalo está fechado."""
+    now = datetime.now(timezone.utc).replace(tzinfo=None) + HISTORY_CUTOFF_MARGIN
+    return datetime(now.year, now.month, now.day)
+
+
+async def bump_transactions(transactions: Iterable[Dict[str, Any]], session=None) -> None:
+    """
+    Incrementa as versões dos usuários e das contas das transações alteradas,
+    e a `history:<id>` do usuário quando alguma delas é anterior ao dia atual.
+    """
+    keys = []
+    cutoff = _history_cutoff()
+    for transaction in transactions:
+        keys.append(user_version(transaction["user_id"]))
+        if transaction.get("account_id") is not None:
+            keys.append(account_version(transaction["account_id"]))
+        date = transaction.get("transaction_date")
+        if date is not None:
+            if date.tzinfo is not None:
+                date = date.astimezone(timezone.utc).replace(tzinfo=None)
+            if date < cutoff:
+                keys.append(history_version(transaction["user_id"]))
+    await bump(*keys, session=session)
+
+
+async def read_version(key: str) -> int:
+    """Valor atual de um contador (0 se nunca incrementado), agrupado pelo DataLoader."""
+    counter = await change_version_loader.load(key)
+    return counter["version"] if counter else 0
+
+
+# --- LEITURAS CONDICIONAIS ---
+
+async def _current_versions(keys: List[str]) -> Dict[str, int]:
+    cursor = database[VERSION_COLLECTION].find({"_id": {"$in": keys}}, {"version": 1})
+    return {doc["_id"]: doc["version"] async for doc in cursor}
+
+
+def _matches(if_none_match: str, etag: str) -> bool:
+    """Comparação fraca do If-None-Match (RFC 9110): ignora o prefixo W/."""
+    tags = [tag.strip() for tag in if_none_match.split(",")]
+    return "*" in tags or any(tag.removeprefix("W/") == etag for tag in tags)
+
+
+async def conditional_etag(request: Request, *keys: str) -> str:
+    """
+    Calcula o ETag da leitura a partir das versões `keys` (ex.: user_version(id)).
+    Levanta 304 Not Modified se o cliente já tiver essa versão; senão retorna
+    o ETag, que a rota devolve no cabeçalho da resposta.
+    """
+    versions = await _current_versions(list(keys))
+    digest = hashlib.sha256(request.url.path.encode("utf-8"))
+    digest.update(repr(sorted(request.query_params.multi_items())).encode("utf-8"))
+    for key in keys:
+        digest.update(f"\0{key}={versions.get(key, 0)}".encode("utf-8"))
+    etag = f'"{digest.hexdigest()[:32]}"'
+
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match and _matches(if_none_match, etag):
+        raise HTTPException(status_code=status.HTTP_304_NOT_MODIFIED, headers={"ETag": etag})
+    return etag
@@ -0,0 +1,210 @@
+# app/db/balances.py
+
+"""
+Totais correntes (running totals) das contas.
+
+Cada documento de conta guarda `total_income`, `total_expenses` e
+`current_balance` (saldo inicial + receitas - despesas). Os campos são
+atualizados com $inc na mesma transação de cada escrita do router de
+transações, de modo que o resumo da conta é uma leitura O(1).
+
+A reconciliação recalcula os totais a partir das transações e corrige
+qualquer divergência:
+    python -m app.db.balances reconcile [--account <account_id>] [--dry-run]
+"""
+
+import asyncio
+import sys
+from decimal import Decimal
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from bson import ObjectId
+from pymongo import UpdateOne
+
+from .mongodb import database, run_in_transaction
+
+ZERO = Decimal("0")
+
+BALANCE_FIELDS = ("total_income", "total_expenses", "current_balance")
+
+
+def initial_totals(balance: Decimal) -> Dict[str, Decimal]:
+    """Totais de uma conta recém-criada, ainda sem transações."""
+    return {"total_income": ZERO, "total_expenses": ZERO, "current_balance": Decimal(balance)}
+
+
+def _collect_deltas(
+    changes: Iterable[Tuple[Dict[str, Any], int]]
+) -> Dict[ObjectId, Dict[str, Decimal]]:
+    """Soma as variações de receita e despesa por conta."""
+    deltas: Dict[ObjectId, Dict[str, Decimal]] = {}
+    for transaction, sign in changes:
+        value = sign * Decimal(str(transaction["value"]))
+        entry = deltas.setdefault(transaction["account_id"], {field: ZERO for field in BALANCE_FIELDS})
+        if transaction["type"] == "income":
+            entry["total_income"] += value
+            entry["current_balance"] += value
+        else:
+            entry["total_expenses"] += value
+            entry["current_balance"] -= value
+    return deltas
+
+
+async def _apply_deltas(deltas: Dict[ObjectId, Dict[str, Decimal]], session=None) -> None:
+    operations = [
+        UpdateOne({"_id": account_id}, {"$inc": delta})
+        for account_id, delta in deltas.items()
+        if any(delta.values())
+    ]
+    if operations:
+        await database["accounts"].bulk_write(operations, ordered=False, session=session)
+
+
+async def apply_balance_changes(
+    changes: Iterable[Tuple[Dict[str, Any], int]],
+    session=None
+) -> None:
+    """
+    Aplica uma lista de (transação, sinal) aos totais das contas em um único bulk_write.
+    Sinal +1 soma a transação, -1 subtrai.
+    """
+    await _apply_deltas(_collect_deltas(changes), session=session)
+
+
+async def apply_balance_change(
+    before: Optional[Dict[str, Any]] = None,
+    after: Optional[Dict[str, Any]] = None,
+    session=None
+) -> None:
+    """
+    Atualiza os totais para a troca de uma transação `before` por `after`.
+    Use before=None para inserção e after=None para exclusão.
+    """
+    changes = []
+    if before is not None:
+        changes.append((before, -1))
+    if after is not None:
+        changes.append((after, 1))
+    await apply_balance_changes(changes, session=session)
+
+
+# --- RECONCILIAÇÃO ---
+
+def _transaction_totals_pipeline(match: Dict[str, Any]) -> List[Dict[str, Any]]:
+    return [
+        {"$match": match},
+        {"$group": {"_id": {"account_id": "$account_id", "type": "$type"}, "total": {"$sum": "$value"}}},
+    ]
+
+
+async def _transaction_totals(match: Dict[str, Any], session=None) -> Dict[ObjectId, Dict[str, Decimal]]:
+    """Receitas e despesas por conta, calculadas direto das transações."""
+    pipeline = _transaction_totals_pipeline(match)
+    totals: Dict[ObjectId, Dict[str, Decimal]] = {}
+    async for doc in database["transactions"].aggregate(pipeline, session=session):
+        entry = totals.setdefault(doc["_id"].get("account_id"), {"income": ZERO, "expense": ZERO})
+        if doc["_id"].get("type") in entry:
+            # Transações antigas podem ter o valor gravado como double
+            entry[doc["_id"]["type"]] += Decimal(str(doc["total"]))
+    return totals
+
+
+def _expected_totals(account: Dict[str, Any], totals: Dict[str, Decimal]) -> Dict[str, Decimal]:
+    income = totals.get("income", ZERO)
+    expense = totals.get("expense", ZERO)
+    balance = Decimal(str(account.get("balance") or 0))
+    return {"total_income": income, "total_expenses": expense, "current_balance": balance + income - expense}
+
+
+def _drift(account: Dict[str, Any], expected: Dict[str, Decimal]) -> Dict[str, Any]:
+    """Campos cujo valor gravado difere do esperado: {campo: (gravado, esperado)}."""
+    return {
+        field: (account.get(field), value)
+        for field, value in expected.items()
+        if account.get(field) != value
+    }
+
+
+async def reconcile_account(account_id: ObjectId, repair: bool = True) -> Optional[Dict[str, Any]]:
+    """
+    Recalcula os totais de uma conta e corrige a divergência, se houver.
+    Leitura e correção rodam na mesma transação, para que escritas
+    concorrentes não sejam sobrescritas. Retorna a divergência encontrada ou None.
+    """
+    async def check(session):
+        account = await database["accounts"].find_one({"_id": account_id}, session=session)
+        if not account:
+            return None
+        totals = await _transaction_totals({"account_id": account_id}, session=session)
+        expected = _expected_totals(account, totals.get(account_id, {}))
+        drift = _drift(account, expected)
+        if drift and repair:
+            await database["accounts"].update_one({"_id": account_id}, {"$set": expected}, session=session)
+        return drift or None
+
+    return await run_in_transaction(check)
+
+
+async def reconcile_balances(
+    account_id: Optional[ObjectId] = None,
+    only_missing: bool = False,
+    repair: bool = True
+) -> Dict[ObjectId, Dict[str, Any]]:
+    """
+    Compara os totais de todas as contas (ou de uma conta / das contas ainda sem
+    totais) com as transações. Uma agregação única encontra as contas suspeitas;
+    cada uma é reverificada e corrigida isoladamente com reconcile_account.
+    Retorna {account_id: divergência}.
+    """
+    if account_id is not None:
+        drift = await reconcile_account(account_id, repair=repair)
+        return {account_id: drift} if drift else {}
+
+    scope = {"current_balance": {"$exists": False}} if only_missing else {}
+    accounts = await database["accounts"].find(
+        scope, {"balance": 1, **{field: 1 for field in BALANCE_FIELDS}}
+    ).to_list(length=None)
+    if not accounts:
+        return {}
+
+    match = {"account_id": {"$in": [account["_id"] for account in accounts]}} if only_missing else {}
+    totals = await _transaction_totals(match)
+
+    drifts = {}
+    for account in accounts:
+        if not _drift(account, _expected_totals(account, totals.get(account["_id"], {}))):
+            continue
+        drift = await reconcile_account(account["_id"], repair=repair)
+        if drift:
+            drifts[account["_id"]] = drift
+    return drifts
+
+
+def _print_drifts(drifts: Dict[ObjectId, Dict[str, Any]]) -> None:
+    for account_id, drift in drifts.items():
+        fields = ", ".join(f"{field}: {stored} -> {expected}" for field, (stored, expected) in drift.items())
+        print(f"Conta {account_id}: {fields}")
+
+
+if __name__ == "__main__":
+    if len(sys.argv) < 2 or sys.argv[1] != "reconcile":
+        print("Uso: python -m app.db.balances reconcile [--account <account_id>] [--dry-run]")
+        sys.exit(1)
+
+    target_account = None
+    if "--account" in sys.argv:
+        target_account = ObjectId(sys.argv[sys.argv.index("--account") + 1])
+    dry_run = "--dry-run" in sys.argv
+
+    async def main() -> List[ObjectId]:
+        from .mongodb import connect_to_mongo
+        await connect_to_mongo()
+        drifts = await reconcile_balances(target_account, repair=not dry_run)
+        _print_drifts(drifts)
+        return list(drifts)
+
+    divergent = asyncio.run(main())
+    if dry_run:
+        print(f"{len(divergent)} conta(s) com divergência.")
+    else:
+        print(f"{len(divergent)} conta(s) corrigida(s).")
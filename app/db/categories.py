@@ -0,0 +1,82 @@
+# app/db/categories.py
+
+"""
+Manutenção da coleção de categorias.
+
+O nome da categoria é único por usuário (índice `user_id_name_unique`). Bancos
+criados antes desse índice podem ter categorias repetidas, e nesse caso o
+MongoDB recusa criar o índice. O startup não falha: ensure_indexes detecta as
+duplicadas, mantém o índice antigo (não único), avisa e segue. Enquanto isso,
+novas duplicadas ainda podem ser criadas.
+
+Para unificar as duplicadas (com a aplicação parada) e liberar o índice único:
+    python -m app.db.categories dedupe --dry-run   # só lista os grupos
+    python -m app.db.categories dedupe             # unifica
+    python -m app.db.indexes                       # cria o índice único
+
+Em cada grupo (mesmo usuário e mesmo nome) fica a categoria mais antiga. As
+transações e as regras recorrentes das outras passam a apontar para ela, os
+rollups do usuário são reconstruídos e as outras categorias são removidas.
+"""
+
+import asyncio
+import sys
+from typing import Any, Dict, List
+
+from ..core.versions import bump_categories
+from .mongodb import database
+from .rollups import rebuild_rollups
+
+
+async def find_duplicate_categories() -> List[Dict[str, Any]]:
+    """Grupos de categorias com o mesmo usuário e nome: {"user_id", "name", "ids"} (ids em ordem de criação)."""
+    pipeline = [
+        {"$sort": {"_id": 1}},
+        {"$group": {
+            "_id": {"user_id": "$user_id", "name": "$name"},
+            "ids": {"$push": "$_id"},
+        }},
+        {"$match": {"ids.1": {"$exists": True}}},
+        {"$project": {"_id": 0, "user_id": "$_id.user_id", "name": "$_id.name", "ids": 1}},
+    ]
+    return await database["categories"].aggregate(pipeline, allowDiskUse=True).to_list(length=None)
+
+
+async def merge_duplicate_categories(dry_run: bool = False) -> List[Dict[str, Any]]:
+    """Unifica cada grupo de duplicadas na categoria mais antiga. Retorna os grupos encontrados."""
+    groups = await find_duplicate_categories()
+    if dry_run:
+        return groups
+
+    users = set()
+    for group in groups:
+        kept, extras = group["ids"][0], group["ids"][1:]
+        for collection_name in ("transactions", "recurring_rules"):
+            await database[collection_name].update_many(
+                {"category_id": {"$in": extras}}, {"$set": {"category_id": kept}}
+            )
+        await database["categories"].delete_many({"_id": {"$in": extras}})
+        users.add(group["user_id"])
+
+    # Os rollups são agrupados por category_id: recalcula os dos usuários afetados
+    for user_id in users:
+        await rebuild_rollups(user_id)
+        await bump_categories(user_id)
+    return groups
+
+
+if __name__ == "__main__":
+    if len(sys.argv) < 2 or sys.argv[1] != "dedupe":
+        print("Uso: python -m app.db.categories dedupe [--dry-run]")
+        sys.exit(1)
+
+    dry_run = "--dry-run" in sys.argv
+    groups = asyncio.run(merge_duplicate_categories(dry_run))
+    for group in groups:
+        print(f"usuário {group['user_id']}: '{group['name']}' x{len(group['ids'])} (mantida {group['ids'][0]})")
+    if not groups:
+        print("Nenhuma categoria duplicada.")
+    elif dry_run:
+        print(f"{len(groups)} grupo(s) de categorias duplicadas; rode sem --dry-run para unificar.")
+    else:
+        print(f"{len(groups)} grupo(s) de categorias duplicadas unificados.")
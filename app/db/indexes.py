@@ -0,0 +1,420 @@
+# app/db/indexes.py
+
+"""
+Gerenciador de índices do MongoDB.
+
+Declara os índices que cada router precisa, garante que eles existam durante
+o startup da aplicação e oferece um modo de verificação que roda `explain()`
+sobre as queries dos routers, falhando se alguma delas planejar um COLLSCAN.
+
+Uso pela linha de comando:
+    python -m app.db.indexes            # cria os índices
+    python -m app.db.indexes --verify   # cria e verifica os planos de execução
+
+Se o banco tiver categorias com nome repetido para o mesmo usuário, o índice
+único de categorias não é criado (o antigo é mantido) e um aviso é impresso;
+veja app/db/categories.py para unificá-las.
+"""
+
+import asyncio
+import sys
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+from bson import ObjectId
+from pymongo import ASCENDING, DESCENDING, TEXT, IndexModel
+
+from .categories import find_duplicate_categories
+from .mongodb import database
+
+
+# --- 1. DECLARAÇÃO DOS ÍNDICES POR COLEÇÃO ---
+
+INDEXES: Dict[str, List[IndexModel]] = {
+    "users": [
+        # get_current_active_user / authenticate_user / share_account
+        IndexModel([("email", ASCENDING)], name="email_unique", unique=True),
+    ],
+    "accounts": [
+        # list_user_accounts
+        IndexModel([("user_id", ASCENDING)], name="user_id"),
+        # Contas compartilhadas com um usuário
+        IndexModel([("permissions.user_id", ASCENDING)], name="permissions_user_id"),
+    ],
+    "categories": [
+        # list_user_categories / create_category: o nome é único por usuário e o
+        # índice garante isso sem uma busca prévia
+        IndexModel([("user_id", ASCENDING), ("name", ASCENDING)], name="user_id_name_unique", unique=True),
+    ],
+    "transactions": [
+        # list_transactions, dashboard e relatórios ($match em user_id + transaction_date)
+        IndexModel(
+            [("user_id", ASCENDING), ("transaction_date", DESCENDING), ("_id", DESCENDING)],
+            name="user_id_transaction_date",
+        ),
+        # list_transactions filtrando por conta / categoria / tipo
+        IndexModel(
+            [("user_id", ASCENDING), ("account_id", ASCENDING), ("transaction_date", DESCENDING)],
+            name="user_id_account_id_transaction_date",
+        ),
+        IndexModel(
+            [("user_id", ASCENDING), ("category_id", ASCENDING), ("transaction_date", DESCENDING)],
+            name="user_id_category_id_transaction_date",
+        ),
+        IndexModel(
+            [("user_id", ASCENDING), ("type", ASCENDING), ("transaction_date", DESCENDING)],
+            name="user_id_type_transaction_date",
+        ),
+        # delete_account / reconciliação dos saldos (app/db/balances.py)
+        IndexModel([("account_id", ASCENDING), ("type", ASCENDING)], name="account_id_type"),
+        # pay_due_installments: só as transações parceladas entram no índice
+        IndexModel(
+            [("account_id", ASCENDING), ("transaction_date", ASCENDING)],
+            name="installments_account_id_transaction_date",
+            partialFilterExpression={"installment_details.total_installments": {"$exists": True}},
+        ),
+        # search_transactions: o prefixo user_id restringe a busca textual às
+        # transações do usuário (a query precisa de igualdade em user_id)
+        IndexModel(
+            [("user_id", ASCENDING), ("description", TEXT), ("notes", TEXT)],
+            name="user_id_description_notes_text",
+            weights={"description": 3, "notes": 1},
+            default_language="portuguese",
+            # Um campo "language" nas transações não deve trocar o idioma da indexação
+            language_override="text_language",
+        ),
+        # Agendador de recorrências: uma transação por regra e data de ocorrência,
+        # o que torna a materialização idempotente entre reinícios e workers
+        IndexModel(
+            [("recurring_rule_id", ASCENDING), ("transaction_date", ASCENDING)],
+            name="recurring_rule_id_transaction_date_unique",
+            unique=True,
+            partialFilterExpression={"recurring_rule_id": {"$exists": True}},
+        ),
+    ],
+    "recurring_rules": [
+        # materialize_due: regras ativas vencidas, em ordem de vencimento
+        IndexModel([("active", ASCENDING), ("next_run", ASCENDING)], name="active_next_run"),
+        # list_recurring_rules / delete_category (regras que usam a categoria)
+        IndexModel([("user_id", ASCENDING), ("category_id", ASCENDING)], name="user_id_category_id"),
+        # delete_account: regras da conta removida
+        IndexModel([("account_id", ASCENDING)], name="account_id"),
+    ],
+    "monthly_rollups": [
+        # Chave do upsert incremental (uma linha por usuário/conta/mês/tipo/categoria)
+        IndexModel(
+            [
+                ("user_id", ASCENDING), ("period", ASCENDING), ("account_id", ASCENDING),
+                ("type", ASCENDING), ("category_id", ASCENDING), ("category", ASCENDING),
+            ],
+            name="rollup_key",
+            unique=True,
+        ),
+        # Dashboard / relatórios por ano (exclusão por ano)
+        IndexModel([("user_id", ASCENDING), ("year", ASCENDING)], name="user_id_year"),
+    ],
+    "jobs": [
+        # resume_stale_jobs: jobs ativos com o lease expirado
+        IndexModel([("status", ASCENDING), ("lease_until", ASCENDING)], name="status_lease_until"),
+        # start_year_deletion: no máximo um job ativo por usuário/tipo/ano
+        # (o campo `active` só existe enquanto o job não termina)
+        IndexModel(
+            [("user_id", ASCENDING), ("type", ASCENDING), ("year", ASCENDING)],
+            name="active_user_id_type_year_unique",
+            unique=True,
+            partialFilterExpression={"active": True},
+        ),
+    ],
+}
+
+
+# Índices antigos, removidos no startup: substituídos por versões com outras
+# opções (o MongoDB não aceita duas versões com a mesma chave) ou sem uso.
+REPLACED_INDEXES: Dict[str, List[str]] = {
+    "categories": ["user_id_name"],
+    # get_account_summary passou a ler os totais do documento da conta
+    "monthly_rollups": ["account_id_type"],
+    # A busca do job ativo passou a usar o índice único parcial
+    "jobs": ["user_id_type_year_status"],
+}
+
+
+async def _blocked_unique_indexes() -> Dict[str, List[str]]:
+    """
+    Índices únicos que o MongoDB recusaria criar por causa de dados duplicados,
+    com os índices antigos que devem ser mantidos no lugar deles.
+    """
+    duplicates = await find_duplicate_categories()
+    if not duplicates:
+        return {}
+    print(
+        f"AVISO: {len(duplicates)} grupo(s) de categorias com o mesmo nome para o mesmo usuário; "
+        "o índice user_id_name_unique não foi criado. "
+        "Rode `python -m app.db.categories dedupe` e depois `python -m app.db.indexes`.",
+        file=sys.stderr,
+    )
+    return {"categories": ["user_id_name_unique", "user_id_name"]}
+
+
+async def ensure_indexes() -> None:
+    """Cria (de forma idempotente) todos os índices declarados em INDEXES."""
+    blocked = await _blocked_unique_indexes()
+
+    for collection_name, index_names in REPLACED_INDEXES.items():
+        existing = await database[collection_name].index_information()
+        for index_name in index_names:
+            if index_name in existing and index_name not in blocked.get(collection_name, []):
+                await database[collection_name].drop_index(index_name)
+
+    for collection_name, indexes in INDEXES.items():
+        skipped = blocked.get(collection_name, [])
+        indexes = [index for index in indexes if index.document["name"] not in skipped]
+        if indexes:
+            await database[collection_name].create_indexes(indexes)
+
+
+# --- 2. VERIFICAÇÃO DOS PLANOS DE EXECUÇÃO ---
+
+@dataclass
+class QueryPlanCheck:
+    """Uma query representativa de um router, usada para rodar explain()."""
+    name: str
+    collection: str
+    filter: Optional[Dict[str, Any]] = None
+    sort: Optional[List[tuple]] = None
+    pipeline: Optional[List[Dict[str, Any]]] = None
+
+
+def _router_queries() -> List[QueryPlanCheck]:
+    """
+    Monta as queries dos routers com valores de exemplo. Os filtros e pipelines
+    compostos vêm das mesmas funções que os routers e os jobs usam, para que a
+    verificação não se afaste do que eles de fato enviam ao MongoDB.
+    """
+    # Importados aqui: os routers dependem dos módulos de app.db
+    from ..core.pagination import keyset_filter
+    from ..routers.dashboard import _previous_periods, _summary_pipeline
+    from ..routers.report import (
+        _expenses_by_category_pipeline, _rollup_totals_pipeline, _transaction_totals_pipeline
+    )
+    from ..routers.transaction import (
+        TRANSACTION_SORT, _build_transaction_query, _installment_due_filter, _search_pipeline
+    )
+    from .balances import _transaction_totals_pipeline as _balance_totals_pipeline
+    from .jobs import CHUNK_SORT, active_job_key, stale_jobs_filter, year_query
+    from .recurring import DUE_RULES_SORT, due_rules_filter, existing_occurrences_filter
+    from .rollups import empty_rollups_filter
+    from .timeseries import series_match, series_pipeline
+
+    user_id = ObjectId()
+    account_id = ObjectId()
+    category_id = ObjectId()
+    start_date = datetime(2024, 1, 1)
+    end_date = datetime(2024, 2, 1)
+
+    def transaction_query(**filters) -> Dict[str, Any]:
+        return _build_transaction_query(
+            user_id, filters.get("account_id"), filters.get("category_id"), filters.get("type"),
+            filters.get("start_date"), filters.get("end_date"),
+        )
+
+    return [
+        QueryPlanCheck(
+            name="authentication.get_current_active_user",
+            collection="users",
+            filter={"email": "user@example.com"},
+        ),
+        QueryPlanCheck(
+            name="account.list_user_accounts",
+            collection="accounts",
+            filter={"user_id": user_id},
+        ),
+        QueryPlanCheck(
+            name="category.list_user_categories",
+            collection="categories",
+            filter={"user_id": user_id},
+        ),
+        QueryPlanCheck(
+            name="transaction.list_transactions",
+            collection="transactions",
+            filter=transaction_query(start_date=start_date.date(), end_date=end_date.date()),
+            sort=TRANSACTION_SORT,
+        ),
+        QueryPlanCheck(
+            name="transaction.list_transactions[cursor]",
+            collection="transactions",
+            filter={**transaction_query(), **keyset_filter("transaction_date", end_date, ObjectId())},
+            sort=TRANSACTION_SORT,
+        ),
+        QueryPlanCheck(
+            name="transaction.list_transactions[account_id]",
+            collection="transactions",
+            filter=transaction_query(account_id=str(account_id)),
+            sort=TRANSACTION_SORT,
+        ),
+        QueryPlanCheck(
+            name="transaction.list_transactions[category_id]",
+            collection="transactions",
+            filter=transaction_query(category_id=str(category_id)),
+            sort=TRANSACTION_SORT,
+        ),
+        QueryPlanCheck(
+            name="account.delete_account",
+            collection="transactions",
+            filter={"account_id": account_id},
+        ),
+        QueryPlanCheck(
+            name="transaction.search_transactions",
+            collection="transactions",
+            pipeline=_search_pipeline(transaction_query(type="expense"), "mercado", 50),
+        ),
+        QueryPlanCheck(
+            name="transaction.pay_due_installments",
+            collection="transactions",
+            filter={"account_id": {"$in": [account_id]}, **_installment_due_filter(end_date)},
+            sort=[("_id", ASCENDING)],
+        ),
+        QueryPlanCheck(
+            name="balances.reconcile_account",
+            collection="transactions",
+            pipeline=_balance_totals_pipeline({"account_id": account_id}),
+        ),
+        QueryPlanCheck(
+            name="dashboard.get_dashboard_summary",
+            collection="monthly_rollups",
+            pipeline=_summary_pipeline(user_id, _previous_periods(2024, 6, 6)),
+        ),
+        QueryPlanCheck(
+            name="category.delete_category",
+            collection="transactions",
+            filter={"user_id": user_id, "category_id": category_id},
+        ),
+        QueryPlanCheck(
+            name="report.get_expenses_by_category_report",
+            collection="monthly_rollups",
+            pipeline=_expenses_by_category_pipeline(user_id, 2024, 1),
+        ),
+        QueryPlanCheck(
+            name="report.get_income_vs_expenses_report",
+            collection="monthly_rollups",
+            pipeline=_rollup_totals_pipeline(user_id, start_date, datetime(2025, 1, 1)),
+        ),
+        QueryPlanCheck(
+            name="report.get_income_vs_expenses_report[partial]",
+            collection="transactions",
+            pipeline=_transaction_totals_pipeline(user_id, start_date, end_date),
+        ),
+        QueryPlanCheck(
+            name="report.get_time_series_report",
+            collection="transactions",
+            pipeline=series_pipeline(series_match(user_id, account_id), start_date, end_date, "week"),
+        ),
+        QueryPlanCheck(
+            name="jobs.delete_transactions_by_year[chunk]",
+            collection="transactions",
+            filter=year_query(user_id, 2024),
+            sort=CHUNK_SORT,
+        ),
+        QueryPlanCheck(
+            name="jobs.prune_empty_rollups",
+            collection="monthly_rollups",
+            filter=empty_rollups_filter(user_id, 2024),
+        ),
+        QueryPlanCheck(
+            name="jobs.start_year_deletion",
+            collection="jobs",
+            filter=active_job_key(user_id, 2024),
+        ),
+        QueryPlanCheck(
+            name="recurring.materialize_due",
+            collection="recurring_rules",
+            filter=due_rules_filter(end_date),
+            sort=DUE_RULES_SORT,
+        ),
+        QueryPlanCheck(
+            name="recurring.existing_occurrences",
+            collection="transactions",
+            filter=existing_occurrences_filter([{"recurring_rule_id": ObjectId(), "transaction_date": end_date}]),
+        ),
+        QueryPlanCheck(
+            name="recurring.list_recurring_rules",
+            collection="recurring_rules",
+            filter={"user_id": user_id},
+        ),
+        QueryPlanCheck(
+            name="category.delete_category[recurring_rules]",
+            collection="recurring_rules",
+            filter={"user_id": user_id, "category_id": category_id},
+        ),
+        QueryPlanCheck(
+            name="account.delete_account[recurring_rules]",
+            collection="recurring_rules",
+            filter={"account_id": account_id},
+        ),
+        QueryPlanCheck(
+            name="jobs.resume_stale_jobs",
+            collection="jobs",
+            filter=stale_jobs_filter(end_date),
+        ),
+    ]
+
+
+def _find_stages(plan: Any, stage_name: str) -> bool:
+    """Procura recursivamente um estágio com o nome dado na árvore do explain()."""
+    if isinstance(plan, dict):
+        if plan.get("stage") == stage_name:
+            return True
+        return any(_find_stages(value, stage_name) for value in plan.values())
+    if isinstance(plan, list):
+        return any(_find_stages(item, stage_name) for item in plan)
+    return False
+
+
+async def _explain(check: QueryPlanCheck) -> Dict[str, Any]:
+    """Executa explain() para uma query de find ou de aggregate."""
+    if check.pipeline is not None:
+        return await database.command(
+            "aggregate", check.collection, pipeline=check.pipeline, explain=True
+        )
+
+    cursor = database[check.collection].find(check.filter or {})
+    if check.sort:
+        cursor = cursor.sort(check.sort)
+    return await cursor.explain()
+
+
+async def verify_indexes() -> List[str]:
+    """
+    Roda explain() em cada query dos routers.
+    Retorna a lista de queries que ainda planejam um COLLSCAN.
+    """
+    failures = []
+    for check in _router_queries():
+        plan = await _explain(check)
+        if _find_stages(plan, "COLLSCAN"):
+            failures.append(f"{check.name} ({check.collection})")
+    return failures
+
+
+class IndexVerificationError(RuntimeError):
+    """Levantada quando alguma query dos routers faria um COLLSCAN."""
+
+
+async def bootstrap_indexes(verify: bool = False) -> None:
+    """Garante os índices e, opcionalmente, verifica os planos de execução."""
+    await ensure_indexes()
+    if not verify:
+        return
+
+    failures = await verify_indexes()
+    if failures:
+        raise IndexVerificationError(
+            "As seguintes queries planejaram um COLLSCAN: " + ", ".join(failures)
+        )
+
+
+if __name__ == "__main__":
+    verify = "--verify" in sys.argv
+    asyncio.run(bootstrap_indexes(verify=verify))
+    print("Índices criados e verificados com sucesso." if verify else "Índices criados com sucesso.")
@@ -0,0 +1,283 @@
+# app/db/jobs.py
+
+"""
+Jobs em segundo plano persistidos no MongoDB.
+
+Cada job é um documento na coleção `jobs` com o seu estado e progresso. O
+worker que executa o job mantém um lease (`owner` + `lease_until`) renovado a
+cada lote; se o processo morrer, o lease expira e o job é retomado por
+`resume_stale_jobs`, chamado no startup e na consulta de status.
+
+Job disponível:
+- delete_transactions_by_year: apaga as transações de um ano em lotes,
+  com pausa entre eles. Cada lote apaga as transações, ajusta rollups e
+  saldos e registra o progresso numa única transação, então uma interrupção
+  nunca deixa um lote pela metade. Como os lotes sempre pegam as transações
+  mais recentes que restam no ano, retomar é simplesmente continuar o laço.
+
+Um índice único parcial sobre os jobs ativos (`active: true`, limpo em
+`_finish`) garante no máximo um job ativo por usuário/tipo/ano, mesmo com
+chamadas concorrentes.
+"""
+
+import asyncio
+import os
+import socket
+from datetime import datetime, timedelta, timezone
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+from bson import ObjectId
+from pymongo import ReturnDocument
+from pymongo.errors import DuplicateKeyError
+
+from ..core.config import settings
+from ..core.versions import bump_transactions
+from .balances import apply_balance_changes
+from .mongodb import database, run_in_transaction
+from .rollups import apply_rollup_changes, prune_empty_rollups
+from .timeseries import invalidate_transactions
+
+JOB_COLLECTION = "jobs"
+
+ACTIVE_STATUSES = ("pending", "running")
+
+# Identifica este processo como dono dos jobs que ele executa
+WORKER_ID = f"{socket.gethostname()}:{os.getpid()}:{ObjectId()}"
+
+# Tasks em execução neste processo, por job (o asyncio só guarda referências fracas)
+_tasks: Dict[ObjectId, asyncio.Task] = {}
+
+
+class LeaseLostError(Exception):
+    """Levantada quando outro worker assumiu o job (o lease deste expirou)."""
+
+
+def _utcnow() -> datetime:
+    return datetime.now(timezone.utc).replace(tzinfo=None)
+
+
+def _lease_until() -> datetime:
+    return _utcnow() + timedelta(seconds=settings.JOB_LEASE_SECONDS)
+
+
+# --- CRIAÇÃO E CONSULTA ---
+
+# Os lotes pegam sempre as transações mais recentes que restam no ano
+CHUNK_SORT = [("transaction_date", -1), ("_id", -1)]
+
+
+def year_query(user_id: ObjectId, year: int) -> Dict[str, Any]:
+    return {
+        "user_id": user_id,
+        "transaction_date": {"$gte": datetime(year, 1, 1), "$lt": datetime(year + 1, 1, 1)}
+    }
+
+
+def active_job_key(user_id: ObjectId, year: int) -> Dict[str, Any]:
+    """Filtro do job de exclusão ativo do ano (coberto pelo índice único parcial)."""
+    return {"user_id": user_id, "type": "delete_transactions_by_year", "year": year, "active": True}
+
+
+def stale_jobs_filter(now: datetime) -> Dict[str, Any]:
+    """Jobs ativos sem dono ou com o lease expirado em `now`."""
+    return {
+        "status": {"$in": list(ACTIVE_STATUSES)},
+        "$or": [{"lease_until": None}, {"lease_until": {"$lte": now}}],
+    }
+
+
+async def start_year_deletion(user_id: ObjectId, year: int) -> Dict[str, Any]:
+    """
+    Agenda a exclusão das transações de um ano e devolve o documento do job.
+    Se já houver uma exclusão ativa do mesmo ano para o usuário, devolve essa.
+    """
+    active_key = active_job_key(user_id, year)
+    while True:
+        existing = await database[JOB_COLLECTION].find_one(active_key)
+        if existing:
+            return existing
+        try:
+            return await _create_year_deletion(user_id, year)
+        except DuplicateKeyError:
+            # Outra chamada criou o job entre a busca e o insert: devolve o dela
+            continue
+
+
+async def _create_year_deletion(user_id: ObjectId, year: int) -> Dict[str, Any]:
+    now = _utcnow()
+    job = {
+        "_id": ObjectId(),
+        "type": "delete_transactions_by_year",
+        "user_id": user_id,
+        "year": year,
+        "status": "pending",
+        "active": True,
+        "total": await database["transactions"].count_documents(year_query(user_id, year)),
+        "deleted_count": 0,
+        "error": None,
+        "owner": None,
+        "lease_until": None,
+        "created_at": now,
+        "updated_at": now,
+        "finished_at": None,
+    }
+    await database[JOB_COLLECTION].insert_one(job)
+    _spawn(job["_id"])
+    return job
+
+
+async def get_job(job_id: ObjectId, user_id: ObjectId) -> Optional[Dict[str, Any]]:
+    """Busca um job do usuário; retoma-o se estiver parado com o lease expirado."""
+    job = await database[JOB_COLLECTION].find_one({"_id": job_id, "user_id": user_id})
+    if job and job["status"] in ACTIVE_STATUSES and _is_stale(job):
+        _spawn(job_id)
+    return job
+
+
+def _is_stale(job: Dict[str, Any]) -> bool:
+    return job.get("lease_until") is None or job["lease_until"] <= _utcnow()
+
+
+# --- EXECUÇÃO ---
+
+def _spawn(job_id: ObjectId) -> None:
+    if job_id in _tasks:
+        return
+    task = asyncio.create_task(_run(job_id))
+    _tasks[job_id] = task
+    task.add_done_callback(lambda _: _tasks.pop(job_id, None))
+
+
+async def _claim(job_id: ObjectId) -> Optional[Dict[str, Any]]:
+    """Assume o job se ele estiver ativo e sem dono válido (ou já for deste worker)."""
+    return await database[JOB_COLLECTION].find_one_and_update(
+        {
+            "_id": job_id,
+            "status": {"$in": list(ACTIVE_STATUSES)},
+            "$or": [
+                {"owner": WORKER_ID},
+                {"lease_until": None},
+                {"lease_until": {"$lte": _utcnow()}},
+            ],
+        },
+        {"$set": {"status": "running", "owner": WORKER_ID, "lease_until": _lease_until(), "updated_at": _utcnow()}},
+        return_document=ReturnDocument.AFTER
+    )
+
+
+async def _finish(job_id: ObjectId, status: str, error: Optional[str] = None) -> None:
+    now = _utcnow()
+    await database[JOB_COLLECTION].update_one(
+        {"_id": job_id, "owner": WORKER_ID},
+        {
+            "$set": {
+                "status": status, "error": error, "owner": None, "lease_until": None,
+                "updated_at": now, "finished_at": now,
+            },
+            # Libera a chave do índice de jobs ativos para um novo job do mesmo ano
+            "$unset": {"active": ""},
+        }
+    )
+
+
+async def _run(job_id: ObjectId) -> None:
+    job = await _claim(job_id)
+    if job is None:
+        return
+    try:
+        await JOB_RUNNERS[job["type"]](job)
+    except LeaseLostError:
+        return
+    except asyncio.CancelledError:
+        # Desligamento: libera o lease para que outro worker retome imediatamente
+        await database[JOB_COLLECTION].update_one(
+            {"_id": job_id, "owner": WORKER_ID}, {"$set": {"owner": None, "lease_until": None}}
+        )
+        raise
+    except Exception as exc:
+        await _finish(job_id, "failed", error=str(exc))
+        return
+    await _finish(job_id, "completed")
+
+
+async def _delete_year_chunk(job: Dict[str, Any], session) -> Optional[List[Dict[str, Any]]]:
+    """
+    Apaga um lote de transações do ano, ajusta os agregados e registra o progresso.
+    Com transações multi-documento o lote é lido na sessão e apagado com um único
+    delete_many: uma exclusão concorrente da mesma linha gera conflito de escrita
+    e o driver repete a transação, então os documentos lidos são exatamente os
+    apagados. Sem transações, cada linha é apagada com find_one_and_delete e os
+    agregados só recebem as que este lote de fato apagou (um DELETE
+    /transactions/{id} concorrente pode remover uma linha entre a leitura e a
+    exclusão). Retorna as transações apagadas, ou None quando não resta nenhuma no ano.
+    """
+    # Sem sessão, o documento completo vem do próprio find_one_and_delete
+    projection = None if session is not None else {"_id": 1}
+    candidates = await database["transactions"].find(
+        year_query(job["user_id"], job["year"]), projection, session=session
+    ).sort(CHUNK_SORT).limit(settings.JOB_CHUNK_SIZE).to_list(length=None)
+    if not candidates:
+        return None
+
+    if session is not None:
+        await database["transactions"].delete_many(
+            {"_id": {"$in": [doc["_id"] for doc in candidates]}}, session=session
+        )
+        chunk = candidates
+    else:
+        chunk = []
+        for candidate in candidates:
+            deleted = await database["transactions"].find_one_and_delete({"_id": candidate["_id"]})
+            if deleted is not None:
+                chunk.append(deleted)
+
+    await apply_rollup_changes(((doc, -1) for doc in chunk), session=session)
+    await apply_balance_changes(((doc, -1) for doc in chunk), session=session)
+    await bump_transactions(chunk, session=session)
+
+    progress = await database[JOB_COLLECTION].update_one(
+        {"_id": job["_id"], "owner": WORKER_ID},
+        {
+            "$inc": {"deleted_count": len(chunk)},
+            "$set": {"lease_until": _lease_until(), "updated_at": _utcnow()},
+        },
+        session=session
+    )
+    if not progress.matched_count:
+        raise LeaseLostError()
+    return chunk
+
+
+async def _run_year_deletion(job: Dict[str, Any]) -> None:
+    while True:
+        chunk = await run_in_transaction(lambda session: _delete_year_chunk(job, session))
+        if chunk is None:
+            break
+        invalidate_transactions(chunk)
+        await asyncio.sleep(settings.JOB_CHUNK_PAUSE_SECONDS)
+
+    # Os lotes só decrementam os rollups; as linhas do ano que zeraram saem no fim
+    await prune_empty_rollups(job["user_id"], job["year"])
+
+
+JOB_RUNNERS: Dict[str, Callable[[Dict[str, Any]], Awaitable[None]]] = {
+    "delete_transactions_by_year": _run_year_deletion,
+}
+
+
+# --- CICLO DE VIDA ---
+
+async def resume_stale_jobs() -> int:
+    """Retoma os jobs ativos cujo lease expirou (ex.: worker reiniciado). Retorna quantos."""
+    stale = await database[JOB_COLLECTION].find(stale_jobs_filter(_utcnow()), {"_id": 1}).to_list(length=None)
+    for job in stale:
+        _spawn(job["_id"])
+    return len(stale)
+
+
+async def stop_jobs() -> None:
+    """Interrompe os jobs deste worker no desligamento; eles são retomados depois."""
+    tasks = list(_tasks.values())
+    for task in tasks:
+        task.cancel()
+    await asyncio.gather(*tasks, return_exceptions=True)
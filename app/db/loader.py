@@ -0,0 +1,98 @@
+# app/db/loader.py
+
+"""
+DataLoader: agrupa buscas de documentos por chave feitas em paralelo.
+
+Sob carga, várias requisições em andamento pedem o mesmo documento
+(a conta na verificação de permissão, a categoria na criação de transações,
+o usuário do token). Em vez de um find_one por chamada, o loader acumula
+as chaves pedidas durante uma volta do event loop e faz uma única busca com
+$in, sem chaves repetidas, entregando a cada chamador o seu documento.
+
+Não há cache entre voltas: cada lote reflete o estado atual do banco.
+"""
+
+import asyncio
+import weakref
+from typing import Any, Dict, List, Optional
+
+from ..core.metrics import Histogram, registry
+from .mongodb import database
+
+# Limite de chaves por consulta $in
+MAX_BATCH_SIZE = 1000
+
+dataloader_batch_keys = registry.register(Histogram(
+    "app_dataloader_batch_keys",
+    "Chaves distintas por consulta agrupada do DataLoader.",
+    ("collection",),
+    buckets=(1, 2, 5, 10, 25, 50, 100, 250, 500, 1000),
+))
+
+
+class DataLoader:
+    """
+    Carrega documentos de uma coleção pelo campo `key_field` (por padrão o _id).
+    O lote pendente é mantido por event loop, então o loader pode ser
+    compartilhado por módulos sem misturar loops diferentes (ex.: testes).
+    """
+
+    def __init__(self, collection_name: str, key_field: str = "_id"):
+        self.collection_name = collection_name
+        self.key_field = key_field
+        self._pending: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, Dict[Any, asyncio.Future]]" = (
+            weakref.WeakKeyDictionary()
+        )
+
+    async def load(self, key: Any) -> Optional[Dict[str, Any]]:
+        """Retorna o documento com a chave informada, ou None se não existir."""
+        loop = asyncio.get_running_loop()
+        pending = self._pending.get(loop)
+        if pending is None:
+            # Primeira chave desta volta: o lote é despachado no próximo ciclo do loop
+            pending = self._pending[loop] = {}
+            loop.call_soon(self._dispatch, loop)
+
+        future = pending.get(key)
+        if future is None:
+            future = pending[key] = loop.create_future()
+
+        # shield: o cancelamento de um chamador não cancela o resultado dos demais
+        document = await asyncio.shield(future)
+        # Cópia rasa, para que um chamador não altere o documento entregue aos outros
+        return dict(document) if document is not None else None
+
+    async def load_many(self, keys: List[Any]) -> List[Optional[Dict[str, Any]]]:
+        return list(await asyncio.gather(*(self.load(key) for key in keys)))
+
+    def _dispatch(self, loop: asyncio.AbstractEventLoop) -> None:
+        pending = self._pending.pop(loop, None)
+        if not pending:
+            return
+        keys = list(pending)
+        for start in range(0, len(keys), MAX_BATCH_SIZE):
+            batch = {key: pending[key] for key in keys[start:start + MAX_BATCH_SIZE]}
+            loop.create_task(self._fetch(batch))
+
+    async def _fetch(self, batch: Dict[Any, asyncio.Future]) -> None:
+        dataloader_batch_keys.observe(len(batch), self.collection_name)
+        try:
+            documents = {}
+            cursor = database[self.collection_name].find({self.key_field: {"$in": list(batch)}})
+            async for document in cursor:
+                documents[document[self.key_field]] = document
+        except Exception as exc:
+            for future in batch.values():
+                if not future.done():
+                    future.set_exception(exc)
+            return
+
+        for key, future in batch.items():
+            if not future.done():
+                future.set_result(documents.get(key))
+
+
+account_loader = DataLoader("accounts")
+category_loader = DataLoader("categories")
+user_by_email_loader = DataLoader("users", key_field="email")
+change_version_loader = DataLoader("change_versions")
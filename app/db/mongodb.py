@@ -1,7 +1,11 @@
 # app/db/mongodb.py
 
+import asyncio
+from typing import Any, Awaitable, Callable
 import motor.motor_asyncio
+from pymongo import ReadPreference
 from ..core.config import settings
+from ..core.metrics import MongoCommandListener
 from decimal import Decimal
 from bson.decimal128 import Decimal128
 from bson.codec_options import TypeCodec, TypeRegistry, CodecOptions
@@ -33,14 +37,96 @@ type_registry = TypeRegistry([decimal_codec])
 codec_options = CodecOptions(type_registry=type_registry)
 
 
-# --- A MUDANÇA ESTÁ AQUI ---
+# --- CONFIGURAÇÃO DO CLIENTE ---
 
-# 1. Crie o cliente de forma simples, SEM as opções de codec
-client = motor.motor_asyncio.AsyncIOMotorClient(settings.MONGO_URL)
+READ_PREFERENCES = {
+    "primary": ReadPreference.PRIMARY,
+    "primaryPreferred": ReadPreference.PRIMARY_PREFERRED,
+    "secondary": ReadPreference.SECONDARY,
+    "secondaryPreferred": ReadPreference.SECONDARY_PREFERRED,
+    "nearest": ReadPreference.NEAREST,
+}
+
+
+def _client_options() -> dict:
+    """Opções de pool e compressão lidas das configurações."""
+    options = {
+        "maxPoolSize": settings.MONGO_MAX_POOL_SIZE,
+        "minPoolSize": settings.MONGO_MIN_POOL_SIZE,
+    }
+    if settings.MONGO_MAX_IDLE_TIME_MS is not None:
+        options["maxIdleTimeMS"] = settings.MONGO_MAX_IDLE_TIME_MS
+    if settings.MONGO_WAIT_QUEUE_TIMEOUT_MS is not None:
+        options["waitQueueTimeoutMS"] = settings.MONGO_WAIT_QUEUE_TIMEOUT_MS
+    if settings.MONGO_COMPRESSORS:
+        options["compressors"] = settings.MONGO_COMPRESSORS
+    return options
+
+
+# 1. Crie o cliente de forma simples, SEM as opções de codec.
+#    O listener registra a duração de cada comando para o endpoint /metrics.
+#    O Motor só abre conexões no primeiro uso; a abertura, o aquecimento e o
+#    fechamento acontecem no lifespan da aplicação (connect_to_mongo / close_mongo_connection).
+client = motor.motor_asyncio.AsyncIOMotorClient(
+    settings.MONGO_URL,
+    event_listeners=[MongoCommandListener()],
+    **_client_options()
+)
 
 # 2. Selecione o banco de dados e APLIQUE AS OPÇÕES DE CODEC AQUI
 #    Este método é mais estável e compatível entre versões.
 database = client.get_database(
     settings.DATABASE_NAME,
     codec_options=codec_options
-)
\ No newline at end of file
+)
+
+# 3. Banco usado pelas leituras de relatório e dashboard, que podem ir para
+#    secundários sem afetar a consistência das escritas.
+report_database = client.get_database(
+    settings.DATABASE_NAME,
+    codec_options=codec_options,
+    read_preference=READ_PREFERENCES[settings.MONGO_REPORT_READ_PREFERENCE]
+)
+
+
+# Se as escritas usam transações multi-documento (definido em connect_to_mongo)
+_transactions_enabled = bool(settings.MONGO_TRANSACTIONS)
+
+
+async def connect_to_mongo() -> None:
+    """
+    Abre e aquece o pool: confirma que o servidor responde e estabelece
+    MONGO_MIN_POOL_SIZE conexões antes de a aplicação receber tráfego.
+    Também detecta se o servidor aceita transações multi-documento.
+    """
+    global _transactions_enabled
+    warm_connections = max(settings.MONGO_MIN_POOL_SIZE, 1)
+    await asyncio.gather(*(client.admin.command("ping") for _ in range(warm_connections)))
+
+    if settings.MONGO_TRANSACTIONS is None:
+        hello = await client.admin.command("hello")
+        # Transações exigem um membro de replica set ou um mongos
+        _transactions_enabled = "setName" in hello or hello.get("msg") == "isdbgrid"
+
+
+async def run_in_transaction(callback: Callable[[Any], Awaitable[Any]]) -> Any:
+    """
+    Executa `callback(session)` dentro de uma transação multi-documento,
+    com as retentativas automáticas do driver para erros transitórios.
+    Sem suporte a transações, chama `callback(None)`: cada escrita continua
+    atômica individualmente.
+    """
+    if not _transactions_enabled:
+        return await callback(None)
+    async with await client.start_session() as session:
+        return await session.with_transaction(callback)
+
+
+def transactions_enabled() -> bool:
+    """Se as escritas estão usando transações multi-documento (após connect_to_mongo)."""
+    return _transactions_enabled
+
+
+def close_mongo_connection() -> None:
+    """Fecha todas as conexões do pool."""
+    client.close()
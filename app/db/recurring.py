@@ -0,0 +1,324 @@
+# app/db/recurring.py
+
+"""
+Transações recorrentes e o agendador que as materializa.
+
+Uma regra (coleção `recurring_rules`) descreve uma transação que se repete:
+mensal, semanal ou a cada N dias, a partir de `start_date` e, opcionalmente,
+até `end_date`. A N-ésima ocorrência é sempre calculada a partir da data
+inicial, então não há desvio acumulado (uma regra do dia 31 cai em 28/29 de
+fevereiro e volta ao dia 31 em março). A regra guarda quantas ocorrências já
+foram percorridas (`occurrences`) e a data da próxima (`next_run`, None quando
+a regra terminou).
+
+O agendador roda em segundo plano no processo da aplicação. A cada varredura
+percorre as regras vencidas de todos os usuários pelo índice (active, next_run),
+gera as ocorrências até o momento atual e as grava em lotes de insert_many,
+junto com os rollups e os saldos; depois avança as regras do lote num único
+bulk_write.
+
+Idempotência: cada transação gerada leva `recurring_rule_id`, e o par
+(recurring_rule_id, transaction_date) é único por um índice parcial. Se o
+processo cair entre o insert e o avanço da regra, a varredura seguinte gera as
+mesmas ocorrências: as que já existem são descartadas por uma busca prévia
+no mesmo índice (assim o lote inserido normalmente não tem duplicadas, o que
+numa transação abortaria o insert_many inteiro), e o índice rejeita as que
+outro worker gravar no meio tempo. O avanço é
+condicional ao `occurrences` lido, então vários workers podem rodar o
+agendador ao mesmo tempo.
+
+Para rodar uma varredura manualmente:
+    python -m app.db.recurring
+"""
+
+import asyncio
+import calendar
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, List, Optional
+
+from bson import ObjectId
+from pymongo import UpdateOne
+
+from ..core.config import settings
+from ..core.metrics import Counter, registry
+from ..core.permissions import has_access
+from .loader import account_loader, category_loader
+from .mongodb import database
+from .repository import as_stored, insert_transaction_batch, recurring_rule_repository
+from .timeseries import invalidate_transactions
+
+RULE_COLLECTION = "recurring_rules"
+
+# Regras vencidas, das mais atrasadas para as mais recentes
+DUE_RULES_SORT = [("next_run", 1)]
+
+# Código do MongoDB para violação de índice único
+DUPLICATE_KEY_CODE = "E11000"
+
+recurring_occurrences = registry.register(Counter(
+    "app_recurring_occurrences_total",
+    "Ocorrências de transações recorrentes processadas pelo agendador.",
+    ("result",),
+))
+
+recurring_sweeps = registry.register(Counter(
+    "app_recurring_sweeps_total",
+    "Varreduras do agendador de transações recorrentes.",
+    ("status",),
+))
+
+# Task do agendador deste processo (o asyncio só guarda referências fracas)
+_scheduler_task: Optional[asyncio.Task] = None
+
+
+def _utcnow() -> datetime:
+    return datetime.now(timezone.utc).replace(tzinfo=None)
+
+
+# --- 1. CÁLCULO DAS OCORRÊNCIAS ---
+
+def _add_months(value: datetime, months: int) -> datetime:
+    """Soma meses mantendo o dia, limitado ao último dia do mês de destino."""
+    month_index = value.month - 1 + months
+    year, month = value.year + month_index // 12, month_index % 12 + 1
+    return value.replace(year=year, month=month, day=min(value.day, calendar.monthrange(year, month)[1]))
+
+
+def occurrence_date(rule: Dict[str, Any], index: int) -> datetime:
+    """Data da ocorrência de número `index` (começando em 0) da regra."""
+    start = rule["start_date"]
+    if rule["frequency"] == "monthly":
+        return _add_months(start, index * rule["interval"])
+    if rule["frequency"] == "weekly":
+        return start + timedelta(weeks=index * rule["interval"])
+    return start + timedelta(days=index * rule["interval"])
+
+
+def next_run_after(rule: Dict[str, Any], occurrences: int) -> Optional[datetime]:
+    """Data da ocorrência seguinte às `occurrences` já percorridas, ou None se passar do fim."""
+    date = occurrence_date(rule, occurrences)
+    if rule.get("end_date") is not None and date > rule["end_date"]:
+        return None
+    return date
+
+
+def occurrence_document(rule: Dict[str, Any], date: datetime) -> Dict[str, Any]:
+    """Monta a transação de uma ocorrência, no mesmo formato das criadas pela API."""
+    return {
+        "_id": ObjectId(),
+        "description": rule["description"],
+        "value": rule["value"],
+        "transaction_date": date,
+        "category_id": rule["category_id"],
+        "notes": rule.get("notes"),
+        "type": rule["type"],
+        "account_id": rule["account_id"],
+        "status": rule["status"],
+        "expense_type": rule.get("expense_type"),
+        "installment_details": None,
+        "user_id": rule["user_id"],
+        "recurring_rule_id": rule["_id"],
+    }
+
+
+# --- 2. CRIAÇÃO E EDIÇÃO DAS REGRAS ---
+
+async def create_rule(rule: Dict[str, Any]) -> Dict[str, Any]:
+    """Grava uma nova regra, já com a data da primeira ocorrência."""
+    rule = as_stored(rule)
+    now = _utcnow()
+    rule.update({
+        "active": True,
+        "occurrences": 0,
+        "next_run": next_run_after(rule, 0),
+        "created_at": now,
+        "updated_at": now,
+    })
+    return await recurring_rule_repository.insert(rule)
+
+
+async def update_rule(
+    rule_id: ObjectId, user_id: ObjectId, update_data: Dict[str, Any]
+) -> Optional[Dict[str, Any]]:
+    """
+    Atualiza uma regra do usuário e recalcula a próxima ocorrência quando o
+    fim ou o estado mudam. Retomar uma regra pausada pula as ocorrências do
+    período da pausa. Retorna None se a regra não existir.
+    """
+    update_data = as_stored(update_data)
+    while True:
+        rule = await database[RULE_COLLECTION].find_one({"_id": rule_id, "user_id": user_id})
+        if rule is None:
+            return None
+
+        updated = {**rule, **update_data}
+        changes = dict(update_data)
+        occurrences = rule["occurrences"]
+        if update_data.get("active") and not rule["active"]:
+            now = _utcnow()
+            while (date := next_run_after(updated, occurrences)) is not None and date < now:
+                occurrences += 1
+            changes["occurrences"] = occurrences
+        if "end_date" in update_data or "occurrences" in changes:
+            changes["next_run"] = next_run_after(updated, occurrences)
+        changes["updated_at"] = _utcnow()
+
+        # Condicional ao contador lido: se o agendador avançou a regra no meio, recalcula
+        result = await recurring_rule_repository.update(
+            {"_id": rule_id, "user_id": user_id, "occurrences": rule["occurrences"]},
+            {"$set": changes}
+        )
+        if result is not None:
+            return result
+
+
+# --- 3. MATERIALIZAÇÃO ---
+
+def _occurrence_key(transaction: Dict[str, Any]) -> tuple:
+    return transaction["recurring_rule_id"], transaction["transaction_date"]
+
+
+def due_rules_filter(now: datetime) -> Dict[str, Any]:
+    return {"active": True, "next_run": {"$lte": now}}
+
+
+def existing_occurrences_filter(occurrences: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """Transações já gravadas que podem coincidir com as ocorrências (casadas depois por chave)."""
+    return {
+        "recurring_rule_id": {"$in": list({doc["recurring_rule_id"] for doc in occurrences})},
+        "transaction_date": {"$in": list({doc["transaction_date"] for doc in occurrences})},
+    }
+
+
+async def _existing_occurrences(pending: List[tuple]) -> set:
+    """Chaves (regra, data) das ocorrências de `pending` que já estão gravadas, numa única busca."""
+    if not pending:
+        return set()
+    cursor = database["transactions"].find(
+        existing_occurrences_filter([doc for _, doc in pending]),
+        {"_id": 0, "recurring_rule_id": 1, "transaction_date": 1}
+    )
+    return {_occurrence_key(doc) async for doc in cursor}
+
+
+async def _materialize_page(rules: List[Dict[str, Any]], now: datetime, stats: Dict[str, int]) -> None:
+    """Gera as ocorrências vencidas de um lote de regras e avança as regras."""
+    accounts = await account_loader.load_many([rule["account_id"] for rule in rules])
+    categories = await category_loader.load_many([rule["category_id"] for rule in rules])
+
+    pending = []  # (posição, transação)
+    owners = []   # regra de cada posição em `pending`
+    advances: Dict[ObjectId, UpdateOne] = {}
+    for rule, account, category in zip(rules, accounts, categories):
+        expected = {"_id": rule["_id"], "occurrences": rule["occurrences"]}
+        # Conta removida, permissão revogada ou categoria removida: a regra é desativada
+        if (
+            account is None or not has_access(account, rule["user_id"], "edit")
+            or category is None or category["user_id"] != rule["user_id"]
+        ):
+            advances[rule["_id"]] = UpdateOne(expected, {"$set": {"active": False, "updated_at": now}})
+            stats["deactivated"] += 1
+            continue
+
+        occurrences, date = rule["occurrences"], rule["next_run"]
+        generated = 0
+        while date is not None and date <= now and generated < settings.RECURRING_MAX_CATCH_UP:
+            pending.append((len(pending), occurrence_document(rule, date)))
+            owners.append(rule["_id"])
+            occurrences += 1
+            generated += 1
+            date = next_run_after(rule, occurrences)
+        advances[rule["_id"]] = UpdateOne(
+            expected, {"$set": {"occurrences": occurrences, "next_run": date, "updated_at": now}}
+        )
+
+    # Descarta as ocorrências que já existem (varredura interrompida ou outro worker)
+    existing = await _existing_occurrences(pending)
+    stats["duplicates"] += sum(1 for _, doc in pending if _occurrence_key(doc) in existing)
+    pending = [(position, doc) for position, doc in pending if _occurrence_key(doc) not in existing]
+
+    inserted = []
+    batch_size = settings.RECURRING_INSERT_BATCH_SIZE
+    for start in range(0, len(pending), batch_size):
+        batch_inserted, failed = await insert_transaction_batch(pending[start:start + batch_size])
+        inserted.extend(batch_inserted)
+        for position, detail in failed.items():
+            if DUPLICATE_KEY_CODE in detail:
+                # Ocorrência já gravada por uma varredura interrompida ou por outro worker
+                stats["duplicates"] += 1
+            else:
+                # A regra não avança e a ocorrência é tentada de novo na próxima varredura
+                advances.pop(owners[position], None)
+                stats["failed"] += 1
+    stats["inserted"] += len(inserted)
+    invalidate_transactions(inserted)
+
+    if advances:
+        await database[RULE_COLLECTION].bulk_write(list(advances.values()), ordered=False)
+    stats["rules"] += len(rules)
+
+
+async def materialize_due(now: Optional[datetime] = None) -> Dict[str, int]:
+    """
+    Materializa as ocorrências vencidas até `now` (padrão: agora) de todas as
+    regras ativas. Retorna as contagens da varredura.
+    """
+    now = as_stored(now or _utcnow())
+    stats = {"rules": 0, "inserted": 0, "duplicates": 0, "failed": 0, "deactivated": 0}
+
+    # As regras avançadas saem do filtro (next_run > now ou None), então o
+    # cursor não as encontra de novo durante a varredura
+    cursor = database[RULE_COLLECTION].find(
+        due_rules_filter(now)
+    ).sort(DUE_RULES_SORT).batch_size(settings.RECURRING_INSERT_BATCH_SIZE)
+
+    page = []
+    async for rule in cursor:
+        page.append(rule)
+        if len(page) >= settings.RECURRING_INSERT_BATCH_SIZE:
+            await _materialize_page(page, now, stats)
+            page = []
+    if page:
+        await _materialize_page(page, now, stats)
+
+    recurring_occurrences.inc("inserted", amount=stats["inserted"])
+    recurring_occurrences.inc("duplicate", amount=stats["duplicates"])
+    recurring_occurrences.inc("failed", amount=stats["failed"])
+    return stats
+
+
+# --- 4. CICLO DE VIDA DO AGENDADOR ---
+
+async def _scheduler_loop() -> None:
+    while True:
+        try:
+            await materialize_due()
+            recurring_sweeps.inc("ok")
+        except asyncio.CancelledError:
+            raise
+        except Exception:
+            # Uma falha (ex.: primário indisponível) não derruba o agendador;
+            # as regras continuam vencidas e entram na próxima varredura
+            recurring_sweeps.inc("error")
+        await asyncio.sleep(settings.RECURRING_SCHEDULER_INTERVAL_SECONDS)
+
+
+def start_scheduler() -> None:
+    """Inicia o agendador em segundo plano, se habilitado nas configurações."""
+    global _scheduler_task
+    if settings.RECURRING_SCHEDULER_ENABLED and _scheduler_task is None:
+        _scheduler_task = asyncio.create_task(_scheduler_loop())
+
+
+async def stop_scheduler() -> None:
+    """Interrompe o agendador; uma varredura pela metade é retomada na próxima execução."""
+    global _scheduler_task
+    if _scheduler_task is None:
+        return
+    _scheduler_task.cancel()
+    await asyncio.gather(_scheduler_task, return_exceptions=True)
+    _scheduler_task = None
+
+
+if __name__ == "__main__":
+    print(asyncio.run(materialize_due()))
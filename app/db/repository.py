@@ -0,0 +1,127 @@
+# app/db/repository.py
+
+"""
+Camada de repositório para as escritas nas coleções principais.
+
+As rotas de criação montam o documento completo no servidor; depois do
+insert não há nada a ler de volta. O repositório define o _id localmente,
+normaliza o documento para a forma como o MongoDB o armazena (e o devolveria
+numa leitura) e o retorna direto. Unicidade (e-mail, nome de categoria) é
+garantida pelos índices únicos: a violação vira DuplicateDocumentError, sem
+uma busca prévia.
+"""
+
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional, Tuple
+
+from bson import ObjectId
+from pymongo import ReturnDocument
+from pymongo.errors import BulkWriteError, DuplicateKeyError
+
+from ..core.versions import bump_transactions
+from .balances import apply_balance_changes
+from .mongodb import database, run_in_transaction
+from .rollups import apply_rollup_changes
+
+
+class DuplicateDocumentError(Exception):
+    """Levantada quando uma escrita viola um índice único."""
+
+
+def as_stored(value: Any) -> Any:
+    """
+    Converte um valor para a forma que o MongoDB devolveria após gravá-lo:
+    datas com fuso viram UTC sem fuso e a precisão cai para milissegundos.
+    """
+    if isinstance(value, datetime):
+        if value.tzinfo is not None:
+            value = value.astimezone(timezone.utc).replace(tzinfo=None)
+        return value.replace(microsecond=value.microsecond // 1000 * 1000)
+    if isinstance(value, dict):
+        return {key: as_stored(item) for key, item in value.items()}
+    if isinstance(value, list):
+        return [as_stored(item) for item in value]
+    return value
+
+
+class Repository:
+    """Escritas em uma coleção, sem leituras de confirmação."""
+
+    def __init__(self, collection_name: str):
+        self.collection_name = collection_name
+
+    @property
+    def collection(self):
+        return database[self.collection_name]
+
+    async def insert(self, document: Dict[str, Any], session=None) -> Dict[str, Any]:
+        """Insere o documento e o retorna exatamente como ficou gravado."""
+        document = as_stored(document)
+        document.setdefault("_id", ObjectId())
+        try:
+            await self.collection.insert_one(document, session=session)
+        except DuplicateKeyError as exc:
+            raise DuplicateDocumentError(str(exc)) from exc
+        return document
+
+    async def update(
+        self, filter: Dict[str, Any], update: Any, session=None
+    ) -> Optional[Dict[str, Any]]:
+        """
+        Aplica a atualização e retorna o documento resultante numa única ida ao
+        banco. Retorna None se nenhum documento corresponder ao filtro.
+        """
+        try:
+            return await self.collection.find_one_and_update(
+                filter, update, return_document=ReturnDocument.AFTER, session=session
+            )
+        except DuplicateKeyError as exc:
+            raise DuplicateDocumentError(str(exc)) from exc
+
+
+user_repository = Repository("users")
+account_repository = Repository("accounts")
+category_repository = Repository("categories")
+transaction_repository = Repository("transactions")
+recurring_rule_repository = Repository("recurring_rules")
+
+
+async def insert_transaction_batch(
+    batch: List[Tuple[int, Dict[str, Any]]]
+) -> Tuple[List[Dict[str, Any]], Dict[int, str]]:
+    """
+    Insere um lote de (índice, documento) de transações junto com os rollups,
+    os saldos e as versões de alteração (ETags). Retorna (documentos inseridos, erro por índice).
+    Numa transação, um erro de escrita desfaz o lote inteiro: os itens com erro
+    são separados e o restante é gravado de novo.
+    """
+    errors: Dict[int, str] = {}
+    while batch:
+        async def write(session):
+            failed = {}
+            try:
+                await database["transactions"].insert_many(
+                    [doc for _, doc in batch], ordered=False, session=session
+                )
+            except BulkWriteError as exc:
+                if session is not None:
+                    raise
+                failed = {error["index"]: error["errmsg"] for error in exc.details.get("writeErrors", [])}
+
+            inserted = [doc for position, (_, doc) in enumerate(batch) if position not in failed]
+            await apply_rollup_changes(((doc, 1) for doc in inserted), session=session)
+            await apply_balance_changes(((doc, 1) for doc in inserted), session=session)
+            await bump_transactions(inserted, session=session)
+            return inserted, failed
+
+        try:
+            inserted, failed = await run_in_transaction(write)
+        except BulkWriteError as exc:
+            failed = {error["index"]: error["errmsg"] for error in exc.details.get("writeErrors", [])}
+            errors.update((batch[position][0], detail) for position, detail in failed.items())
+            batch = [item for position, item in enumerate(batch) if position not in failed]
+            continue
+
+        errors.update((batch[position][0], detail) for position, detail in failed.items())
+        return inserted, errors
+    return [], errors
@@ -0,0 +1,160 @@
+# app/db/rollups.py
+
+"""
+Coleção de consolidação mensal (rollup) das transações.
+
+Cada documento guarda o total e a quantidade de transações de uma combinação
+usuário / conta / ano-mês / tipo / categoria. A coleção é atualizada com $inc a
+cada escrita no router de transações, de modo que o dashboard e os relatórios
+leem alguns documentos por mês em vez de reagregar todas as transações.
+
+Para reconstruir a coleção a partir das transações (backfill):
+    python -m app.db.rollups rebuild [--user <user_id>]
+"""
+
+import asyncio
+import sys
+from decimal import Decimal
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from bson import ObjectId
+from pymongo import UpdateOne
+
+from .mongodb import database
+
+ROLLUP_COLLECTION = "monthly_rollups"
+
+# Campos que identificam um documento de rollup (a "chave" do upsert)
+KEY_FIELDS = ("user_id", "account_id", "period", "year", "month", "type", "category_id", "category")
+
+
+def period_of(year: int, month: int) -> int:
+    """Representa ano/mês como um inteiro ordenável (ex.: 202401)."""
+    return year * 100 + month
+
+
+def rollup_key(transaction: Dict[str, Any]) -> Dict[str, Any]:
+    """Monta a chave de rollup de uma transação."""
+    date = transaction["transaction_date"]
+    return {
+        "user_id": transaction["user_id"],
+        "account_id": transaction.get("account_id"),
+        "period": period_of(date.year, date.month),
+        "year": date.year,
+        "month": date.month,
+        "type": transaction["type"],
+        "category_id": transaction.get("category_id"),
+        # Nome legado da categoria (transações antigas não têm category_id)
+        "category": transaction.get("category"),
+    }
+
+
+def _collect_deltas(
+    changes: Iterable[Tuple[Dict[str, Any], int]]
+) -> List[Tuple[Dict[str, Any], Decimal, int]]:
+    """Soma as variações (valor e quantidade) por chave de rollup."""
+    deltas: Dict[tuple, list] = {}
+    for transaction, sign in changes:
+        key = rollup_key(transaction)
+        entry = deltas.setdefault(tuple(key[f] for f in KEY_FIELDS), [key, Decimal("0"), 0])
+        # str(): transações antigas gravadas como double não trazem o ruído binário
+        # do float para o rollup (o mesmo cálculo dos saldos em balances.py)
+        entry[1] += sign * Decimal(str(transaction["value"]))
+        entry[2] += sign
+
+    return [(key, total, count) for key, total, count in deltas.values() if total or count]
+
+
+async def apply_rollup_changes(
+    changes: Iterable[Tuple[Dict[str, Any], int]],
+    session=None
+) -> None:
+    """
+    Aplica uma lista de (transação, sinal) aos rollups em um único bulk_write.
+    Sinal +1 soma a transação, -1 subtrai.
+    """
+    operations = [
+        UpdateOne(key, {"$inc": {"total": total, "count": count}}, upsert=True)
+        for key, total, count in _collect_deltas(changes)
+    ]
+    if operations:
+        await database[ROLLUP_COLLECTION].bulk_write(operations, ordered=False, session=session)
+
+
+async def apply_rollup_change(
+    before: Optional[Dict[str, Any]] = None,
+    after: Optional[Dict[str, Any]] = None,
+    session=None
+) -> None:
+    """
+    Atualiza os rollups para a troca de uma transação `before` por `after`.
+    Use before=None para inserção e after=None para exclusão.
+    """
+    changes = []
+    if before is not None:
+        changes.append((before, -1))
+    if after is not None:
+        changes.append((after, 1))
+    await apply_rollup_changes(changes, session=session)
+
+
+def empty_rollups_filter(user_id: ObjectId, year: int) -> Dict[str, Any]:
+    return {"user_id": user_id, "year": year, "count": {"$lte": 0}}
+
+
+async def prune_empty_rollups(user_id: ObjectId, year: int, session=None) -> None:
+    """Remove os rollups de um ano que ficaram sem transações (usado pela exclusão por ano)."""
+    await database[ROLLUP_COLLECTION].delete_many(empty_rollups_filter(user_id, year), session=session)
+
+
+async def rebuild_rollups(user_id: Optional[ObjectId] = None) -> None:
+    """Reconstrói os rollups a partir da coleção de transações."""
+    scope = {"user_id": user_id} if user_id is not None else {}
+    await database[ROLLUP_COLLECTION].delete_many(scope)
+
+    year = {"$year": "$transaction_date"}
+    month = {"$month": "$transaction_date"}
+    pipeline = [
+        {"$match": scope},
+        {"$group": {
+            "_id": {
+                "user_id": "$user_id",
+                "account_id": "$account_id",
+                "year": year,
+                "month": month,
+                "type": "$type",
+                "category_id": "$category_id",
+                "category": "$category",
+            },
+            "total": {"$sum": "$value"},
+            "count": {"$sum": 1},
+        }},
+        {"$project": {
+            "_id": 0,
+            "user_id": "$_id.user_id",
+            "account_id": {"$ifNull": ["$_id.account_id", None]},
+            "period": {"$add": [{"$multiply": ["$_id.year", 100]}, "$_id.month"]},
+            "year": "$_id.year",
+            "month": "$_id.month",
+            "type": "$_id.type",
+            "category_id": {"$ifNull": ["$_id.category_id", None]},
+            "category": {"$ifNull": ["$_id.category", None]},
+            "total": "$total",
+            "count": "$count",
+        }},
+        {"$merge": {"into": ROLLUP_COLLECTION, "whenMatched": "replace", "whenNotMatched": "insert"}},
+    ]
+    await database["transactions"].aggregate(pipeline).to_list(length=None)
+
+
+if __name__ == "__main__":
+    if len(sys.argv) < 2 or sys.argv[1] != "rebuild":
+        print("Uso: python -m app.db.rollups rebuild [--user <user_id>]")
+        sys.exit(1)
+
+    target_user = None
+    if "--user" in sys.argv:
+        target_user = ObjectId(sys.argv[sys.argv.index("--user") + 1])
+
+    asyncio.run(rebuild_rollups(target_user))
+    print("Rollups reconstruídos com sucesso.")
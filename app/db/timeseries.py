@@ -0,0 +1,268 @@
+# app/db/timeseries.py
+
+"""
+Motor de séries temporais de receitas e despesas.
+
+Agrupa as transações em intervalos de dia, semana (começando na segunda),
+mês, trimestre ou ano com $dateTrunc, preenche com zero os intervalos sem
+movimento e aceita filtro opcional por conta e categoria.
+
+Intervalos já fechados (que terminaram antes do momento atual) não mudam
+mais, a não ser por escritas com datas retroativas. Eles ficam em cache por
+usuário; as escritas de transações invalidam somente os intervalos que
+contêm as datas alteradas. Essa invalidação só alcança o worker que fez a
+escrita; nos demais, o cache de um usuário guarda o contador
+`history:<id>` (app/core/versions.py) lido ao montá-lo e é descartado
+quando o contador muda, o que acontece a cada escrita com data retroativa.
+Os intervalos que vão para o cache são lidos do
+primário: um secundário atrasado gravaria no cache um total antigo que a
+invalidação (já feita) não apagaria mais. O período aberto e as pontas
+parciais, que não são guardados, continuam lendo de report_database. Assim, consultas repetidas de vários anos só vão
+ao MongoDB para o período ainda aberto.
+"""
+
+import asyncio
+from datetime import datetime, timedelta, timezone
+from decimal import Decimal
+from threading import Lock
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from bson import ObjectId
+
+from ..core.cache import TTLCache
+from ..core.config import settings
+from ..core.versions import history_version, read_version
+from .mongodb import database, report_database
+
+GRANULARITIES = ("day", "week", "month", "quarter", "year")
+
+# Limite de intervalos por consulta (ex.: ~2,7 anos em granularidade diária)
+MAX_BUCKETS = 1000
+
+ZERO = Decimal("0")
+
+Totals = Dict[str, Decimal]
+
+
+class TooManyBucketsError(ValueError):
+    """Levantada quando o intervalo pedido gera intervalos demais para a granularidade."""
+
+
+# --- 1. CÁLCULO DOS INTERVALOS (equivalente em Python ao $dateTrunc) ---
+
+def bucket_start(value: datetime, granularity: str) -> datetime:
+    """Início do intervalo que contém `value`, como o $dateTrunc calcularia em UTC."""
+    day = datetime(value.year, value.month, value.day)
+    if granularity == "day":
+        return day
+    if granularity == "week":
+        return day - timedelta(days=day.weekday())
+    if granularity == "month":
+        return datetime(value.year, value.month, 1)
+    if granularity == "quarter":
+        return datetime(value.year, (value.month - 1) // 3 * 3 + 1, 1)
+    if granularity == "year":
+        return datetime(value.year, 1, 1)
+    raise ValueError(f"Granularidade inválida: {granularity}")
+
+
+def next_bucket(start: datetime, granularity: str) -> datetime:
+    """Início do intervalo seguinte a `start` (que já deve ser um início de intervalo)."""
+    if granularity == "day":
+        return start + timedelta(days=1)
+    if granularity == "week":
+        return start + timedelta(weeks=1)
+    if granularity == "year":
+        return datetime(start.year + 1, 1, 1)
+    months = 1 if granularity == "month" else 3
+    month_index = start.month - 1 + months
+    return datetime(start.year + month_index // 12, month_index % 12 + 1, 1)
+
+
+def buckets_between(start: datetime, end: datetime, granularity: str) -> List[datetime]:
+    """Inícios dos intervalos que cobrem [start, end)."""
+    buckets = []
+    current = bucket_start(start, granularity)
+    while current < end:
+        buckets.append(current)
+        if len(buckets) > MAX_BUCKETS:
+            raise TooManyBucketsError(
+                f"O período gera mais de {MAX_BUCKETS} intervalos para a granularidade '{granularity}'."
+            )
+        current = next_bucket(current, granularity)
+    return buckets
+
+
+def _utcnow() -> datetime:
+    # As datas são gravadas em UTC sem fuso
+    return datetime.now(timezone.utc).replace(tzinfo=None)
+
+
+# --- 2. CACHE DOS INTERVALOS FECHADOS ---
+
+class _UserSeries:
+    """Intervalos em cache de um usuário: (granularidade, início) -> {filtro: totais}."""
+
+    def __init__(self, history: int):
+        self.version = 0
+        # Contador history:<id> do banco quando o cache do usuário foi montado
+        self.history = history
+        self.buckets: Dict[Tuple[str, datetime], Dict[tuple, Totals]] = {}
+
+
+class TimeSeriesCache:
+    """
+    Cache por usuário dos totais de intervalos fechados.
+    Cada invalidação incrementa a versão do usuário; resultados lidos do banco
+    antes de uma escrita concorrente não são gravados no cache. Um contador
+    history:<id> diferente do guardado descarta o cache inteiro do usuário.
+    """
+
+    def __init__(self, maxsize: int, ttl: float):
+        self._users = TTLCache(maxsize=maxsize, ttl=ttl)
+        self._lock = Lock()
+
+    def snapshot(self, user_id: ObjectId, history: int) -> Tuple[_UserSeries, int]:
+        with self._lock:
+            series = self._users.get(user_id)
+            if series is None or series.history != history:
+                series = _UserSeries(history)
+                self._users.set(user_id, series)
+            return series, series.version
+
+    def get(self, series: _UserSeries, granularity: str, start: datetime, filter_key: tuple) -> Optional[Totals]:
+        return series.buckets.get((granularity, start), {}).get(filter_key)
+
+    def put(self, series: _UserSeries, version: int, granularity: str, start: datetime,
+            filter_key: tuple, totals: Totals) -> None:
+        with self._lock:
+            if series.version == version:
+                series.buckets.setdefault((granularity, start), {})[filter_key] = totals
+
+    def invalidate(self, user_id: ObjectId, dates: Iterable[datetime]) -> None:
+        """Descarta, em todas as granularidades, os intervalos que contêm as datas informadas."""
+        with self._lock:
+            series = self._users.get(user_id)
+            if series is None:
+                return
+            series.version += 1
+            for value in dates:
+                for granularity in GRANULARITIES:
+                    series.buckets.pop((granularity, bucket_start(value, granularity)), None)
+
+    def invalidate_user(self, user_id: ObjectId) -> None:
+        self._users.invalidate(user_id)
+
+    def stats(self) -> dict:
+        return self._users.stats()
+
+
+timeseries_cache = TimeSeriesCache(
+    maxsize=settings.TIMESERIES_CACHE_MAXSIZE,
+    ttl=settings.TIMESERIES_CACHE_TTL_SECONDS
+)
+
+
+def invalidate_transactions(transactions: Iterable[Dict[str, Any]]) -> None:
+    """Invalida os intervalos afetados por transações gravadas, alteradas ou removidas."""
+    dates_by_user: Dict[ObjectId, List[datetime]] = {}
+    for transaction in transactions:
+        dates_by_user.setdefault(transaction["user_id"], []).append(transaction["transaction_date"])
+    for user_id, dates in dates_by_user.items():
+        timeseries_cache.invalidate(user_id, dates)
+
+
+# --- 3. CONSULTA ---
+
+def series_match(
+    user_id: ObjectId, account_id: Optional[ObjectId] = None, category_id: Optional[ObjectId] = None
+) -> Dict[str, Any]:
+    """Filtro das transações da série (usuário e, opcionalmente, conta e categoria)."""
+    match: Dict[str, Any] = {"user_id": user_id}
+    if account_id is not None:
+        match["account_id"] = account_id
+    if category_id is not None:
+        match["category_id"] = category_id
+    return match
+
+
+def series_pipeline(match: Dict[str, Any], start: datetime, end: datetime, granularity: str) -> List[Dict[str, Any]]:
+    """Agregação dos totais por intervalo e tipo das transações em [start, end)."""
+    trunc = {"date": "$transaction_date", "unit": granularity}
+    if granularity == "week":
+        trunc["startOfWeek"] = "monday"
+    return [
+        {"$match": {**match, "transaction_date": {"$gte": start, "$lt": end}}},
+        {"$group": {"_id": {"bucket": {"$dateTrunc": trunc}, "type": "$type"}, "total": {"$sum": "$value"}}},
+    ]
+
+
+async def _aggregate(
+    match: Dict[str, Any], start: datetime, end: datetime, granularity: str, source=report_database
+) -> Dict[datetime, Totals]:
+    """Totais por intervalo e tipo das transações em [start, end), lidos de `source`."""
+    pipeline = series_pipeline(match, start, end, granularity)
+    totals: Dict[datetime, Totals] = {}
+    async for doc in source["transactions"].aggregate(pipeline):
+        entry = totals.setdefault(doc["_id"]["bucket"], {"income": ZERO, "expense": ZERO})
+        if doc["_id"]["type"] in entry:
+            # Transações antigas podem ter o valor gravado como double
+            entry[doc["_id"]["type"]] += Decimal(str(doc["total"]))
+    return totals
+
+
+async def income_expense_series(
+    user_id: ObjectId,
+    start: datetime,
+    end: datetime,
+    granularity: str,
+    account_id: Optional[ObjectId] = None,
+    category_id: Optional[ObjectId] = None
+) -> List[Tuple[datetime, Totals]]:
+    """
+    Série de receitas e despesas em [start, end), um ponto por intervalo
+    (inclusive os sem movimento). Os intervalos das pontas podem ser parciais.
+    """
+    buckets = buckets_between(start, end, granularity)
+    filter_key = (account_id, category_id)
+    now = _utcnow()
+    # O contador é lido antes dos totais: uma escrita retroativa no meio muda o
+    # contador e o que for gravado agora é descartado na próxima consulta
+    series, version = timeseries_cache.snapshot(user_id, await read_version(history_version(user_id)))
+
+    results: Dict[datetime, Totals] = {}
+    cacheable = set()
+    runs: List[list] = []  # [primeiro, último, vai para o cache]
+    for bucket in buckets:
+        bucket_end = next_bucket(bucket, granularity)
+        # Só entra no cache um intervalo inteiro (não cortado pelas pontas) e já encerrado
+        closed = start <= bucket and bucket_end <= end and bucket_end <= now
+        if closed:
+            cacheable.add(bucket)
+            cached = timeseries_cache.get(series, granularity, bucket, filter_key)
+            if cached is not None:
+                results[bucket] = cached
+                continue
+        # Intervalos faltantes consecutivos (e do mesmo tipo) viram uma única agregação
+        if runs and next_bucket(runs[-1][1], granularity) == bucket and runs[-1][2] == closed:
+            runs[-1][1] = bucket
+        else:
+            runs.append([bucket, bucket, closed])
+
+    match = series_match(user_id, account_id, category_id)
+    fetched = await asyncio.gather(*(
+        _aggregate(
+            match, max(first, start), min(next_bucket(last, granularity), end), granularity,
+            source=database if closed else report_database,
+        )
+        for first, last, closed in runs
+    ))
+    for (first, last, _), totals in zip(runs, fetched):
+        bucket = first
+        while bucket <= last:
+            results[bucket] = totals.get(bucket, {"income": ZERO, "expense": ZERO})
+            if bucket in cacheable:
+                timeseries_cache.put(series, version, granularity, bucket, filter_key, results[bucket])
+            bucket = next_bucket(bucket, granularity)
+
+    return [(bucket, results[bucket]) for bucket in buckets]
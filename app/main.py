@@ -1,15 +1,51 @@
 # app/main.py
+from contextlib import asynccontextmanager
+
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware # <--- 1. IMPORTE O MIDDLEWARE
+from fastapi.responses import PlainTextResponse
 
 # Importa todos os seus routers
-from .routers import transaction, user, authentication, dashboard, account, report, category
+from .routers import transaction, user, authentication, dashboard, account, report, category, recurring
+from .core.config import settings
+from .core.category_names import category_names
+from .core.metrics import MetricsMiddleware, register_cache_metrics, registry
+from .core.permissions import account_access
+from .core.security import token_cache
+from .db.balances import reconcile_balances
+from .db.indexes import bootstrap_indexes
+from .db.jobs import resume_stale_jobs, stop_jobs
+from .db.mongodb import close_mongo_connection, connect_to_mongo
+from .db.recurring import start_scheduler, stop_scheduler
+from .db.timeseries import timeseries_cache
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """
+    Abre e aquece o pool do MongoDB e garante os índices antes de a aplicação
+    aceitar requisições; fecha as conexões no desligamento.
+    Contas criadas antes dos totais correntes recebem os totais calculados e
+    jobs em segundo plano interrompidos por um reinício são retomados.
+    O agendador das transações recorrentes roda enquanto a aplicação estiver no ar.
+    """
+    await connect_to_mongo()
+    await bootstrap_indexes(verify=settings.VERIFY_INDEXES)
+    await reconcile_balances(only_missing=True)
+    await resume_stale_jobs()
+    start_scheduler()
+    yield
+    await stop_scheduler()
+    await stop_jobs()
+    close_mongo_connection()
+
 
 # Cria a instância da aplicação FastAPI
 app = FastAPI(
     title="Financial App API",
     description="API para o seu aplicativo de controle financeiro.",
-    version="0.1.0"
+    version="0.1.0",
+    lifespan=lifespan
 )
 
 # --- 2. CONFIGURAÇÃO DO CORS ---
@@ -30,9 +66,28 @@ app.add_middleware(
     allow_credentials=True, # Permite cookies e cabeçalhos de autorização
     allow_methods=["*"],    # Permite todos os métodos (GET, POST, etc.)
     allow_headers=["*"],    # Permite todos os cabeçalhos
+    # Permite ao frontend ler o cursor da próxima página e o ETag das leituras
+    expose_headers=["X-Next-Cursor", "ETag"],
 )
 # --- FIM DA CONFIGURAÇÃO DO CORS ---
 
+# --- MÉTRICAS (latência por rota, requisições em andamento, comandos do MongoDB) ---
+app.add_middleware(MetricsMiddleware)
+
+register_cache_metrics({
+    "user": authentication.user_cache.stats,
+    "token": token_cache.stats,
+    "account_access": account_access.stats,
+    "timeseries": timeseries_cache.stats,
+    "category_names": category_names.stats,
+})
+
+
+@app.get("/metrics", include_in_schema=False)
+async def metrics():
+    """Expõe as métricas no formato de texto do Prometheus."""
+    return PlainTextResponse(registry.render(), media_type="text/plain; version=0.0.4")
+
 
 # Rota raiz para um teste rápido
 @app.get("/", tags=["Root"])
@@ -46,4 +101,5 @@ app.include_router(authentication.router)
 app.include_router(dashboard.router)
 app.include_router(account.router)
 app.include_router(report.router)
-app.include_router(category.router)
\ No newline at end of file
+app.include_router(category.router)
+app.include_router(recurring.router)
\ No newline at end of file
@@ -43,6 +43,10 @@ class AccountInDB(AccountBase):
     id: PyObjectId = Field(default_factory=PyObjectId, alias="_id")
     user_id: PyObjectId
     permissions: Optional[List[SharePermission]] = [] # Campo de permissões adicionado
+    # Totais correntes, mantidos a cada escrita de transação (ver app/db/balances.py)
+    total_income: Decimal = Decimal("0")
+    total_expenses: Decimal = Decimal("0")
+    current_balance: Optional[Decimal] = None
 
     class Config:
         from_attributes = True
@@ -2,8 +2,10 @@
 from pydantic import BaseModel
 from decimal import Decimal
 from typing import Optional
+from .pyobjectid import PyObjectId
 
 class TopCategory(BaseModel):
+    category_id: Optional[PyObjectId] = None
     category: str
     total_value: Decimal
 
@@ -11,4 +13,9 @@ class DashboardSummary(BaseModel):
     total_income: Decimal
     total_expenses: Decimal
     balance: Decimal
-    top_expense_category: Optional[TopCategory] = None
\ No newline at end of file
+    top_expense_category: Optional[TopCategory] = None
+
+class MonthlyDashboardSummary(DashboardSummary):
+    """Resumo de um mês específico, usado no modo months=N do dashboard."""
+    year: int
+    month: int
\ No newline at end of file
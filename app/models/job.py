@@ -0,0 +1,40 @@
+# app/models/job.py
+from pydantic import BaseModel, Field, computed_field
+from typing import Literal, Optional
+from datetime import datetime
+from .pyobjectid import PyObjectId
+from bson import ObjectId
+
+class JobStatus(BaseModel):
+    """Estado de um job em segundo plano (ver app/db/jobs.py)."""
+    id: PyObjectId = Field(alias="_id")
+    type: str
+    status: Literal["pending", "running", "completed", "failed"]
+    year: Optional[int] = None
+    # Estimativa feita ao criar o job; escritas concorrentes podem mudar o total real
+    total: int = 0
+    deleted_count: int = 0
+    error: Optional[str] = None
+    created_at: datetime
+    updated_at: datetime
+    finished_at: Optional[datetime] = None
+
+    @computed_field
+    @property
+    def progress(self) -> float:
+        """Fração concluída, entre 0 e 1."""
+        if self.status == "completed":
+            return 1.0
+        if not self.total:
+            return 0.0
+        return min(self.deleted_count / self.total, 1.0)
+
+    class Config:
+        from_attributes = True
+        validate_by_name = True
+        json_encoders = {ObjectId: str}
+
+class JobAccepted(BaseModel):
+    """Resposta das rotas que agendam um job."""
+    message: str
+    job: JobStatus
@@ -0,0 +1,50 @@
+# app/models/recurring.py
+from pydantic import BaseModel, Field
+from typing import Optional, Literal
+from decimal import Decimal
+from datetime import datetime
+from .pyobjectid import PyObjectId
+from bson import ObjectId
+
+class RecurringRuleBase(BaseModel):
+    description: str
+    value: Decimal = Field(gt=0)
+    type: Literal["income", "expense"]
+    account_id: PyObjectId
+    category_id: PyObjectId
+    status: Literal["pending", "paid", "received"] = "pending"
+    expense_type: Optional[Literal["fixed", "variable"]] = "fixed"
+    notes: Optional[str] = None
+    # monthly: a cada `interval` meses no mesmo dia da data inicial (limitado ao fim do mês)
+    # weekly: a cada `interval` semanas; custom: a cada `interval` dias
+    frequency: Literal["monthly", "weekly", "custom"]
+    interval: int = Field(default=1, ge=1)
+    start_date: datetime
+    end_date: Optional[datetime] = None
+
+class RecurringRuleCreate(RecurringRuleBase):
+    pass
+
+class RecurringRuleUpdate(BaseModel):
+    """Campos editáveis de uma regra. Para mudar a periodicidade, crie uma nova regra."""
+    description: Optional[str] = None
+    value: Optional[Decimal] = Field(default=None, gt=0)
+    category_id: Optional[PyObjectId] = None
+    status: Optional[Literal["pending", "paid", "received"]] = None
+    expense_type: Optional[Literal["fixed", "variable"]] = None
+    notes: Optional[str] = None
+    end_date: Optional[datetime] = None
+    active: Optional[bool] = None
+
+class RecurringRuleInDB(RecurringRuleBase):
+    id: PyObjectId = Field(default_factory=PyObjectId, alias="_id")
+    user_id: PyObjectId
+    active: bool = True
+    # Quantidade de ocorrências já geradas e data da próxima (None quando a regra terminou)
+    occurrences: int = 0
+    next_run: Optional[datetime] = None
+
+    class Config:
+        from_attributes = True
+        validate_by_name = True
+        json_encoders = {ObjectId: str}
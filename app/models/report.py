@@ -1,9 +1,12 @@
 # app/models/report.py
 from pydantic import BaseModel
 from decimal import Decimal
-from typing import List
+from datetime import datetime
+from typing import List, Optional
+from .pyobjectid import PyObjectId
 
 class CategoryExpense(BaseModel):
+    category_id: Optional[PyObjectId] = None
     category: str
     total_value: Decimal
 
@@ -15,4 +18,10 @@ class MonthlySummary(BaseModel):
     year: int
     month: int
     total_income: Decimal
-    total_expenses: Decimal
\ No newline at end of file
+    total_expenses: Decimal
+
+class TimeSeriesPoint(BaseModel):
+    """Totais de um intervalo (dia, semana, mês, trimestre ou ano) da série temporal."""
+    period_start: datetime
+    total_income: Decimal
+    total_expenses: Decimal
@@ -1,6 +1,12 @@
 # app/models/token.py
 from pydantic import BaseModel
+from typing import Optional
 
 class Token(BaseModel):
     access_token: str
-    token_type: str
\ No newline at end of file
+    refresh_token: Optional[str] = None
+    token_type: str
+
+class AccessTokenResponse(BaseModel):
+    access_token: str
+    token_type: str = "bearer"
\ No newline at end of file
@@ -1,6 +1,6 @@
 # app/models/transaction.py
 from pydantic import BaseModel, Field
-from typing import Optional, Literal
+from typing import Optional, Literal, List
 from decimal import Decimal
 from datetime import datetime
 from .pyobjectid import PyObjectId
@@ -44,8 +44,48 @@ class TransactionInDB(TransactionBase):
     status: Literal["pending", "paid", "received"]
     expense_type: Optional[Literal["fixed", "variable"]]
     installment_details: Optional[InstallmentDetails]
+    # Regra que gerou a transação (app/db/recurring.py); None nas transações manuais
+    recurring_rule_id: Optional[PyObjectId] = None
 
     class Config:
         from_attributes = True
         validate_by_name = True
-        json_encoders = {ObjectId: str}
\ No newline at end of file
+        json_encoders = {ObjectId: str}
+
+class TransactionPartial(BaseModel):
+    """
+    Transação com apenas os campos pedidos em `fields=` (sparse fieldset).
+    O _id está sempre presente; os demais campos aparecem somente se solicitados.
+    """
+    id: PyObjectId = Field(alias="_id")
+    user_id: Optional[PyObjectId] = None
+    account_id: Optional[PyObjectId] = None
+    category_id: Optional[PyObjectId] = None
+    type: Optional[Literal["income", "expense"]] = None
+    description: Optional[str] = None
+    value: Optional[Decimal] = None
+    transaction_date: Optional[datetime] = None
+    notes: Optional[str] = None
+    status: Optional[Literal["pending", "paid", "received"]] = None
+    expense_type: Optional[Literal["fixed", "variable"]] = None
+    installment_details: Optional[InstallmentDetails] = None
+    recurring_rule_id: Optional[PyObjectId] = None
+
+    class Config:
+        validate_by_name = True
+        json_encoders = {ObjectId: str}
+
+class BulkItemError(BaseModel):
+    """Falha de um item específico da importação em massa."""
+    index: int
+    detail: str
+
+class BulkTransactionResult(BaseModel):
+    inserted_count: int
+    inserted_ids: List[PyObjectId]
+    errors: List[BulkItemError]
+
+class InstallmentPaymentResult(BaseModel):
+    """Resultado do pagamento em massa das parcelas vencidas."""
+    due_count: int
+    paid_count: int
@@ -1,5 +1,5 @@
 # app/routers/account.py
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Request, Response, status
 from typing import Annotated, List
 from bson import ObjectId
 from decimal import Decimal
@@ -8,7 +8,13 @@ from ..models.user import UserInDB
 # Importe os modelos de criação e atualização que já temos
 from ..models.account import AccountInDB, ShareRequest, AccountCreate, AccountUpdate
 from ..models.account_sumary import AccountSummary
+from ..db.balances import initial_totals, reconcile_account
+from ..db.loader import account_loader, user_by_email_loader
 from ..db.mongodb import database
+from ..db.repository import account_repository
+from ..core.serialization import documents_response
+from ..core.permissions import account_access, accounts_with_access, get_account_access_level
+from ..core.versions import account_version, bump_account, conditional_etag, user_version
 from ..routers.authentication import get_current_active_user
 
 router = APIRouter(
@@ -27,9 +33,11 @@ async def create_account(
     account_dict["user_id"] = current_user.id
     # Garante que o saldo inicial seja um Decimal
     account_dict["balance"] = Decimal(account_data.balance)
+    account_dict.update(initial_totals(account_dict["balance"]))
     
-    result = await database["accounts"].insert_one(account_dict)
-    created_account = await database["accounts"].find_one({"_id": result.inserted_id})
+    created_account = await account_repository.insert(account_dict)
+    await account_access.invalidate_user(current_user.id)
+    await bump_account(created_account)
     
     return created_account
 
@@ -37,12 +45,21 @@ async def create_account(
 # Esta rota já existia, mas a mantemos aqui na ordem lógica.
 @router.get("/", response_model=List[AccountInDB])
 async def list_user_accounts(
+    request: Request,
     current_user: Annotated[UserInDB, Depends(get_current_active_user)]
 ):
-    """Lista todas as contas que o usuário possui (não inclui contas compartilhadas com ele)."""
+    """
+    Lista todas as contas que o usuário possui (não inclui contas compartilhadas com ele).
+    O ETag cobre as versões das contas, pois transações de usuários com quem
+    a conta é compartilhada também mudam os totais.
+    """
+    owned = sorted(await accounts_with_access(current_user.id, "owner"))
+    etag = await conditional_etag(
+        request, user_version(current_user.id), *(account_version(account_id) for account_id in owned)
+    )
     cursor = database["accounts"].find({"user_id": current_user.id})
     accounts = await cursor.to_list(length=100)
-    return accounts
+    return documents_response(accounts, AccountInDB, headers={"ETag": etag})
 
 # --- ROTA 3: ATUALIZAR UMA CONTA ---
 @router.put("/{id}", response_model=AccountInDB)
@@ -57,20 +74,18 @@ async def update_account(
     except Exception:
         raise HTTPException(status_code=400, detail="ID de conta inválido")
 
-    # Apenas o dono da conta pode atualizá-la
-    account_doc = await database["accounts"].find_one({"_id": account_id, "user_id": current_user.id})
-    if not account_doc:
-        raise HTTPException(status_code=404, detail="Conta não encontrada ou acesso não permitido")
-
     update_data = account_data.dict(exclude_unset=True)
     if not update_data:
         raise HTTPException(status_code=400, detail="Nenhum dado para atualizar")
 
-    updated_account = await database["accounts"].find_one_and_update(
-        {"_id": account_id},
-        {"$set": update_data},
-        return_document=True # pymongo.ReturnDocument.AFTER
+    # Apenas o dono da conta pode atualizá-la: o filtro por user_id faz a verificação na própria escrita
+    updated_account = await account_repository.update(
+        {"_id": account_id, "user_id": current_user.id},
+        {"$set": update_data}
     )
+    if not updated_account:
+        raise HTTPException(status_code=404, detail="Conta não encontrada ou acesso não permitido")
+    await bump_account(updated_account)
     return updated_account
 
 # --- ROTA 4: DELETAR UMA CONTA ---
@@ -79,7 +94,7 @@ async def delete_account(
     id: str,
     current_user: Annotated[UserInDB, Depends(get_current_active_user)]
 ):
-    """Deleta uma conta, mas apenas se não houver transações associadas a ela."""
+    """Deleta uma conta (e as suas regras recorrentes), mas apenas se não houver transações associadas a ela."""
     try:
         account_id = ObjectId(id)
     except Exception:
@@ -99,6 +114,10 @@ async def delete_account(
         )
 
     await database["accounts"].delete_one({"_id": account_id})
+    # As regras recorrentes da conta deixariam de gerar transações de qualquer forma
+    await database["recurring_rules"].delete_many({"account_id": account_id})
+    await account_access.invalidate_account(account_doc)
+    await bump_account(account_doc)
     return
 
 # --- ROTAS EXISTENTES (Resumo e Compartilhamento) ---
@@ -107,6 +126,8 @@ async def delete_account(
 @router.get("/{id}/summary", response_model=AccountSummary)
 async def get_account_summary(
     id: str,
+    request: Request,
+    response: Response,
     current_user: Annotated[UserInDB, Depends(get_current_active_user)]
 ):
     # ... (código existente da função, sem alterações)
@@ -114,32 +135,28 @@ async def get_account_summary(
         account_id = ObjectId(id)
     except Exception:
         raise HTTPException(status_code=400, detail="ID de conta inválido")
-    account_doc = await database["accounts"].find_one({"_id": account_id})
+    level = await get_account_access_level(
+        account_id, current_user.id, not_found_detail=f"Conta com id {id} não encontrada"
+    )
+    if level is None:
+        raise HTTPException(status_code=403, detail="Acesso não autorizado a esta conta")
+    response.headers["ETag"] = await conditional_etag(request, account_version(account_id))
+    account_doc = await account_loader.load(account_id)
     if not account_doc:
         raise HTTPException(status_code=404, detail=f"Conta com id {id} não encontrada")
-    is_owner = account_doc["user_id"] == current_user.id
-    shared_users = account_doc.get("permissions", [])
-    has_permission = any(perm["user_id"] == current_user.id for perm in shared_users)
-    if not is_owner and not has_permission:
-        raise HTTPException(status_code=403, detail="Acesso não autorizado a esta conta")
+    if "current_balance" not in account_doc:
+        # Conta anterior aos totais correntes: calcula uma vez a partir das transações
+        await reconcile_account(account_id)
+        account_doc = await account_loader.load(account_id)
+    # Os totais ficam no próprio documento da conta, mantidos a cada escrita de transação
     account = AccountInDB(**account_doc)
-    pipeline = [
-        {"$match": { "account_id": account.id }},
-        {"$group": {"_id": "$type", "total": {"$sum": "$value"}}}
-    ]
-    totals_cursor = database["transactions"].aggregate(pipeline)
-    totals = {"income": Decimal("0.0"), "expense": Decimal("0.0")}
-    async for doc in totals_cursor:
-        if doc["_id"] in totals:
-            totals[doc["_id"]] = doc["total"]
-    current_balance = (account.balance + totals["income"]) - totals["expense"]
     return AccountSummary(
         name=account.name,
         type=account.type,
         balance=account.balance,
-        total_income=totals["income"],
-        total_expenses=totals["expense"],
-        current_balance=current_balance
+        total_income=account.total_income,
+        total_expenses=account.total_expenses,
+        current_balance=account.current_balance
     )
 
 
@@ -154,24 +171,29 @@ async def share_account(
         account_id = ObjectId(id)
     except Exception:
         raise HTTPException(status_code=400, detail="ID de conta inválido")
-    account_doc = await database["accounts"].find_one({"_id": account_id})
-    if not account_doc:
-        raise HTTPException(status_code=404, detail="Conta não encontrada")
-    if account_doc["user_id"] != current_user.id:
+    level = await get_account_access_level(
+        account_id, current_user.id, not_found_detail="Conta não encontrada"
+    )
+    if level != "owner":
         raise HTTPException(status_code=403, detail="Apenas o dono pode compartilhar a conta")
-    user_to_share_with = await database["users"].find_one({"email": share_request.user_email})
+    user_to_share_with = await user_by_email_loader.load(share_request.user_email)
     if not user_to_share_with:
         raise HTTPException(status_code=404, detail=f"Usuário com e-mail {share_request.user_email} não encontrado")
     new_permission = {
         "user_id": user_to_share_with["_id"],
         "permission_level": share_request.permission_level.value
     }
+    # Substitui a permissão anterior do usuário (se houver) numa única atualização atômica
     await database["accounts"].update_one(
         {"_id": account_id},
-        {"$pull": {"permissions": {"user_id": user_to_share_with["_id"]}}}
-    )
-    await database["accounts"].update_one(
-        {"_id": account_id},
-        {"$push": {"permissions": new_permission}}
+        [{"$set": {"permissions": {"$concatArrays": [
+            {"$filter": {
+                "input": {"$ifNull": ["$permissions", []]},
+                "cond": {"$ne": ["$$this.user_id", user_to_share_with["_id"]]}
+            }},
+            [new_permission]
+        ]}}}]
     )
+    await account_access.invalidate_user(user_to_share_with["_id"])
+    await bump_account({"_id": account_id, "user_id": current_user.id})
     return {"message": f"Conta compartilhada com {share_request.user_email} com permissão de '{share_request.permission_level.value}'."}
\ No newline at end of file
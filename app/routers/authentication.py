@@ -4,13 +4,17 @@ from fastapi import APIRouter, Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordRequestForm, OAuth2PasswordBearer
 from typing import Annotated
 from datetime import timedelta
-from jose import JWTError, jwt
+from jose import JWTError
 
 from ..models.user import UserInDB
 from ..models.token import Token, AccessTokenResponse
-from ..core.security import verify_password, create_access_token, REFRESH_TOKEN_EXPIRE_MINUTES, ALGORITHM
+from ..core.security import (
+    verify_password_async, create_access_token, decode_access_token, PasswordHasherBusyError,
+    REFRESH_TOKEN_EXPIRE_MINUTES
+)
 from ..core.config import settings
-from ..db.mongodb import database
+from ..core.cache import TTLCache
+from ..db.loader import user_by_email_loader
 
 router = APIRouter(
     tags=["Authentication"]
@@ -19,6 +23,18 @@ router = APIRouter(
 # Este esquema é usado pelo FastAPI para gerar a documentação e extrair o token do cabeçalho
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="token")
 
+# Cache dos usuários autenticados, indexado pelo 'sub' do token (o e-mail).
+# Evita uma ida ao MongoDB e a validação do UserInDB em toda requisição.
+user_cache = TTLCache(
+    maxsize=settings.USER_CACHE_MAXSIZE,
+    ttl=settings.USER_CACHE_TTL_SECONDS
+)
+
+
+def invalidate_cached_user(email: str) -> None:
+    """Remove um usuário do cache. Deve ser chamada sempre que o usuário mudar."""
+    user_cache.invalidate(email)
+
 
 # Função de dependência que valida o token (access ou refresh) e retorna o usuário
 async def get_current_active_user(token: Annotated[str, Depends(oauth2_scheme)]) -> UserInDB:
@@ -32,18 +48,24 @@ async def get_current_active_user(token: Annotated[str, Depends(oauth2_scheme)])
         headers={"WWW-Authenticate": "Bearer"},
     )
     try:
-        payload = jwt.decode(token, settings.SECRET_KEY, algorithms=[ALGORITHM])
+        payload = decode_access_token(token)
         email: str | None = payload.get("sub")
         if email is None:
             raise credentials_exception
     except JWTError:
         raise credentials_exception
-    
-    user_doc = await database["users"].find_one({"email": email})
+
+    cached_user = user_cache.get(email)
+    if cached_user is not None:
+        return cached_user
+
+    user_doc = await user_by_email_loader.load(email)
     if user_doc is None:
         raise credentials_exception
-        
-    return UserInDB(**user_doc)
+
+    user = UserInDB(**user_doc)
+    user_cache.set(email, user)
+    return user
 
 
 # Função auxiliar que verifica email e senha no banco de dados
@@ -51,12 +73,12 @@ async def authenticate_user(email: str, password: str) -> UserInDB | bool:
     """
     Busca o usuário pelo e-mail e verifica se a senha corresponde.
     """
-    user_doc = await database["users"].find_one({"email": email})
+    user_doc = await user_by_email_loader.load(email)
     if not user_doc:
         return False
     
     user = UserInDB(**user_doc)
-    if not verify_password(password, user.hashed_password):
+    if not await verify_password_async(password, user.hashed_password):
         return False
     
     return user
@@ -71,7 +93,14 @@ async def login_for_access_token(
     Endpoint de login. Recebe e-mail (no campo username) e senha.
     Retorna um access_token (curta duração) e um refresh_token (longa duração).
     """
-    user = await authenticate_user(form_data.username, form_data.password)
+    try:
+        user = await authenticate_user(form_data.username, form_data.password)
+    except PasswordHasherBusyError:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Muitas tentativas de login simultâneas. Tente novamente em instantes.",
+            headers={"Retry-After": "1"},
+        )
     if not user:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
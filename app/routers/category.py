@@ -6,6 +6,10 @@ from bson import ObjectId
 from ..models.user import UserInDB
 from ..models.category import CategoryCreate, CategoryInDB, CategoryUpdate
 from ..db.mongodb import database
+from ..db.repository import DuplicateDocumentError, category_repository
+from ..core.category_names import category_names
+from ..core.serialization import documents_response
+from ..core.versions import bump_categories
 from ..routers.authentication import get_current_active_user
 
 router = APIRouter(
@@ -19,22 +23,20 @@ async def create_category(
     current_user: Annotated[UserInDB, Depends(get_current_active_user)]
 ):
     """Cria uma nova categoria para o usuário logado."""
-    # Verifica se uma categoria com o mesmo nome já existe para este usuário
-    existing_category = await database["categories"].find_one(
-        {"name": category_data.name, "user_id": current_user.id}
-    )
-    if existing_category:
+    category_dict = category_data.dict()
+    category_dict["user_id"] = current_user.id
+
+    # O índice único (user_id, name) rejeita nomes repetidos para o mesmo usuário
+    try:
+        created_category = await category_repository.insert(category_dict)
+    except DuplicateDocumentError:
         raise HTTPException(
             status_code=400,
             detail="Uma categoria com este nome já existe."
         )
-
-    category_dict = category_data.dict()
-    category_dict["user_id"] = current_user.id
-    
-    result = await database["categories"].insert_one(category_dict)
-    created_category = await database["categories"].find_one({"_id": result.inserted_id})
-    
+    category_names.invalidate_user(current_user.id)
+    # Os relatórios mostram os nomes das categorias
+    await bump_categories(current_user.id)
     return created_category
 
 
@@ -45,7 +47,7 @@ async def list_user_categories(
     """Lista todas as categorias criadas pelo usuário logado."""
     cursor = database["categories"].find({"user_id": current_user.id})
     categories = await cursor.to_list(length=100)
-    return categories
+    return documents_response(categories, CategoryInDB)
 
 
 @router.put("/{id}", response_model=CategoryInDB)
@@ -60,20 +62,22 @@ async def update_category(
     except Exception:
         raise HTTPException(status_code=400, detail="ID de categoria inválido")
 
-    # Apenas o dono pode atualizar
-    category_doc = await database["categories"].find_one({"_id": category_id, "user_id": current_user.id})
-    if not category_doc:
-        raise HTTPException(status_code=404, detail="Categoria não encontrada ou acesso não permitido")
-
     update_data = category_data.dict(exclude_unset=True)
     if not update_data:
         raise HTTPException(status_code=400, detail="Nenhum dado para atualizar")
 
-    updated_category = await database["categories"].find_one_and_update(
-        {"_id": category_id},
-        {"$set": update_data},
-        return_document=True # pymongo.ReturnDocument.AFTER
-    )
+    # Apenas o dono pode atualizar: o filtro por user_id faz a verificação na própria escrita
+    try:
+        updated_category = await category_repository.update(
+            {"_id": category_id, "user_id": current_user.id},
+            {"$set": update_data}
+        )
+    except DuplicateDocumentError:
+        raise HTTPException(status_code=400, detail="Uma categoria com este nome já existe.")
+    if not updated_category:
+        raise HTTPException(status_code=404, detail="Categoria não encontrada ou acesso não permitido")
+    category_names.invalidate_user(current_user.id)
+    await bump_categories(current_user.id)
     return updated_category
 
 
@@ -93,9 +97,8 @@ async def delete_category(
         raise HTTPException(status_code=404, detail="Categoria não encontrada ou acesso não permitido")
 
     # REGRA DE NEGÓCIO: Não permitir deletar categorias em uso
-    # Nota: Isso verifica o campo de texto 'category'. O ideal seria refatorar para usar 'category_id'.
     transaction_count = await database["transactions"].count_documents(
-        {"category": category_doc["name"], "user_id": current_user.id}
+        {"user_id": current_user.id, "category_id": category_id}
     )
     if transaction_count > 0:
         raise HTTPException(
@@ -103,5 +106,16 @@ async def delete_category(
             detail=f"Não é possível deletar a categoria, pois ela está sendo usada em {transaction_count} transações."
         )
 
+    rule_count = await database["recurring_rules"].count_documents(
+        {"user_id": current_user.id, "category_id": category_id}
+    )
+    if rule_count > 0:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Não é possível deletar a categoria, pois ela está sendo usada em {rule_count} regras recorrentes."
+        )
+
     await database["categories"].delete_one({"_id": category_id})
+    category_names.invalidate_user(current_user.id)
+    await bump_categories(current_user.id)
     return
\ No newline at end of file
@@ -1,11 +1,16 @@
 # app/routers/dashboard.py
-from fastapi import APIRouter, Depends, HTTPException
-from typing import Annotated
-from datetime import datetime
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
+from typing import Annotated, List, Optional, Union
+from bson import ObjectId
 
+from ..core.category_names import category_names
+from ..core.versions import conditional_etag, user_version
 from ..models.user import UserInDB
-from ..models.dashboard import DashboardSummary, TopCategory
-from ..db.mongodb import database
+from ..models.dashboard import DashboardSummary, MonthlyDashboardSummary, TopCategory
+from ..models.job import JobAccepted, JobStatus
+from ..db.jobs import get_job, start_year_deletion
+from ..db.mongodb import report_database
+from ..db.rollups import ROLLUP_COLLECTION, period_of
 from ..routers.authentication import get_current_active_user
 from decimal import Decimal
 
@@ -14,61 +19,113 @@ router = APIRouter(
     tags=["Dashboard"]
 )
 
-@router.get("/summary", response_model=DashboardSummary)
+# Quantidade máxima de meses retornados em uma única chamada com months=N
+MAX_DASHBOARD_MONTHS = 36
+
+@router.get("/summary", response_model=Union[DashboardSummary, List[MonthlyDashboardSummary]])
 async def get_dashboard_summary(
     year: int,
     month: int,
-    current_user: Annotated[UserInDB, Depends(get_current_active_user)]
+    request: Request,
+    response: Response,
+    current_user: Annotated[UserInDB, Depends(get_current_active_user)],
+    months: Optional[int] = Query(default=None, ge=1, le=MAX_DASHBOARD_MONTHS)
 ):
     """
     Retorna um resumo financeiro para o mês e ano especificados.
+    Os totais vêm da coleção de rollups mensais, então o custo não cresce
+    com o número de transações do mês.
+    - Com `months=N`, retorna os resumos dos N meses que terminam em year/month
+      (em ordem cronológica), calculados na mesma passada pelos dados.
+    - Responde 304 a um `If-None-Match` com o ETag atual, sem consultar o banco.
     """
-    start_date = datetime(year, month, 1)
-    next_month = month + 1 if month < 12 else 1
-    next_year = year if month < 12 else year + 1
-    end_date = datetime(next_year, next_month, 1)
-
-    pipeline_totals = [
-        {"$match": {"user_id": current_user.id, "transaction_date": {"$gte": start_date, "$lt": end_date}}},
-        {"$group": {"_id": "$type", "total_value": {"$sum": "$value"}}}
-    ]
-    
-    pipeline_top_category = [
-        {"$match": {"user_id": current_user.id, "type": "expense", "transaction_date": {"$gte": start_date, "$lt": end_date}}},
-        {"$group": {"_id": "$category", "total_value": {"$sum": "$value"}}},
-        {"$sort": {"total_value": -1}},
-        {"$limit": 1}
-    ]
+    if not 1 <= month <= 12:
+        raise HTTPException(status_code=400, detail="Mês inválido.")
+    response.headers["ETag"] = await conditional_etag(request, user_version(current_user.id))
 
-    totals_cursor = database["transactions"].aggregate(pipeline_totals)
-    top_category_cursor = database["transactions"].aggregate(pipeline_top_category)
+    periods = _previous_periods(year, month, months or 1)
+    pipeline = _summary_pipeline(current_user.id, periods)
+    facet_result = await report_database[ROLLUP_COLLECTION].aggregate(pipeline).to_list(length=1)
+    facets = facet_result[0] if facet_result else {"totals": [], "top_categories": []}
 
-    summary_data = {"income": Decimal("0.0"), "expense": Decimal("0.0")}
-    async for doc in totals_cursor:
-        summary_data[doc['_id']] = doc['total_value']
+    summary_data = {
+        period: {"income": Decimal("0.0"), "expense": Decimal("0.0")} for period in periods
+    }
+    for doc in facets["totals"]:
+        summary_data[doc["_id"]["period"]][doc["_id"]["type"]] = doc["total_value"]
 
-    top_category_doc = await top_category_cursor.to_list(length=1)
-    
-    top_expense = None
-    if top_category_doc:
-        top_expense = TopCategory(
-            category=top_category_doc[0]['_id'],
-            total_value=top_category_doc[0]['total_value']
-        )
-        
-    total_income = summary_data['income']
-    total_expenses = summary_data['expense']
-    balance = total_income - total_expenses
-    
-    return DashboardSummary(
-        total_income=total_income,
-        total_expenses=total_expenses,
-        balance=balance,
-        top_expense_category=top_expense
+    # O agrupamento é pelo category_id; os nomes vêm do mapa de categorias do usuário
+    names = await category_names.get_names(
+        current_user.id, [doc["category_id"] for doc in facets["top_categories"] if doc.get("category_id")]
     )
+    top_categories = {
+        doc["_id"]: TopCategory(
+            category_id=doc.get("category_id"),
+            category=category_names.name_of(names, doc.get("category_id"), doc.get("category")),
+            total_value=doc["total_value"]
+        )
+        for doc in facets["top_categories"]
+    }
+
+    summaries = []
+    for period in periods:
+        total_income = summary_data[period]["income"]
+        total_expenses = summary_data[period]["expense"]
+        summaries.append(MonthlyDashboardSummary(
+            year=period // 100,
+            month=period % 100,
+            total_income=total_income,
+            total_expenses=total_expenses,
+            balance=total_income - total_expenses,
+            top_expense_category=top_categories.get(period)
+        ))
+
+    if months is None:
+        return DashboardSummary(**summaries[0].model_dump(exclude={"year", "month"}))
+    return summaries
+
+
+def _summary_pipeline(user_id: ObjectId, periods: List[int]) -> list:
+    """
+    Uma única agregação: o $facet calcula os totais por tipo e a categoria
+    de maior despesa de cada mês sobre o mesmo conjunto de documentos.
+    """
+    return [
+        {"$match": {"user_id": user_id, "period": {"$gte": periods[0], "$lte": periods[-1]}}},
+        {"$facet": {
+            "totals": [
+                {"$group": {"_id": {"period": "$period", "type": "$type"}, "total_value": {"$sum": "$total"}}}
+            ],
+            "top_categories": [
+                {"$match": {"type": "expense", "count": {"$gt": 0}}},
+                {"$group": {
+                    "_id": {"period": "$period", "category_id": "$category_id", "category": "$category"},
+                    "total_value": {"$sum": "$total"}
+                }},
+                {"$sort": {"total_value": -1}},
+                {"$group": {
+                    "_id": "$_id.period",
+                    "category_id": {"$first": "$_id.category_id"},
+                    "category": {"$first": "$_id.category"},
+                    "total_value": {"$first": "$total_value"}
+                }}
+            ]
+        }}
+    ]
+
+
+def _previous_periods(year: int, month: int, count: int) -> List[int]:
+    """Retorna os `count` períodos (YYYYMM) que terminam em year/month, em ordem cronológica."""
+    periods = []
+    for _ in range(count):
+        periods.append(period_of(year, month))
+        month -= 1
+        if month == 0:
+            year, month = year - 1, 12
+    return periods[::-1]
 
 # --- NOVA ROTA ADICIONADA ---
-@router.delete("/transactions/{year}", status_code=200)
+@router.delete("/transactions/{year}", status_code=202, response_model=JobAccepted)
 async def delete_transactions_by_year(
     year: int,
     current_user: Annotated[UserInDB, Depends(get_current_active_user)]
@@ -76,21 +133,29 @@ async def delete_transactions_by_year(
     """
     DELETA permanentemente todas as transações de um determinado ano.
     Esta é uma ação DESTRUTIVA e IRREVERSÍVEL.
+    A exclusão roda em segundo plano, em lotes (ver app/db/jobs.py); a rota
+    devolve o job na hora e o progresso é acompanhado em GET /dashboard/jobs/{job_id}.
+    Repetir a chamada enquanto o job está ativo devolve o mesmo job.
     """
-    # Define o período do ano a ser deletado
-    start_date = datetime(year, 1, 1)
-    end_date = datetime(year + 1, 1, 1)
-
-    # Define o filtro para a operação de exclusão
-    query = {
-        "user_id": current_user.id,
-        "transaction_date": {"$gte": start_date, "$lt": end_date}
+    job = await start_year_deletion(current_user.id, year)
+    return {
+        "message": f"Exclusão das transações do ano {year} agendada.",
+        "job": job
     }
 
-    # Executa a exclusão em massa
-    delete_result = await database["transactions"].delete_many(query)
 
-    # Retorna uma confirmação com o número de documentos deletados
-    return {
-        "message": f"{delete_result.deleted_count} transações do ano {year} foram deletadas com sucesso."
-    }
\ No newline at end of file
+@router.get("/jobs/{job_id}", response_model=JobStatus)
+async def get_job_status(
+    job_id: str,
+    current_user: Annotated[UserInDB, Depends(get_current_active_user)]
+):
+    """Retorna o estado e o progresso de um job em segundo plano do usuário."""
+    try:
+        job_object_id = ObjectId(job_id)
+    except Exception:
+        raise HTTPException(status_code=400, detail="ID de job inválido")
+
+    job = await get_job(job_object_id, current_user.id)
+    if not job:
+        raise HTTPException(status_code=404, detail=f"Job com id {job_id} não encontrado")
+    return job
@@ -0,0 +1,112 @@
+# app/routers/recurring.py
+from fastapi import APIRouter, Depends, HTTPException, status
+from typing import Annotated, List
+from bson import ObjectId
+
+from ..models.user import UserInDB
+from ..models.recurring import RecurringRuleCreate, RecurringRuleInDB, RecurringRuleUpdate
+from ..db.loader import category_loader
+from ..db.mongodb import database
+from ..db.recurring import RULE_COLLECTION, create_rule, update_rule
+from ..core.permissions import verify_account_permission
+from ..core.serialization import documents_response
+from ..routers.authentication import get_current_active_user
+
+router = APIRouter(
+    prefix="/recurring-transactions",
+    tags=["Recurring Transactions"]
+)
+
+
+async def _verify_category(category_id: ObjectId, current_user: UserInDB) -> None:
+    category = await category_loader.load(category_id)
+    if not category or category["user_id"] != current_user.id:
+        raise HTTPException(status_code=404, detail="Categoria não encontrada.")
+
+
+def _parse_rule_id(id: str) -> ObjectId:
+    try:
+        return ObjectId(id)
+    except Exception:
+        raise HTTPException(status_code=400, detail="ID de regra inválido")
+
+
+@router.post("/", response_model=RecurringRuleInDB, status_code=status.HTTP_201_CREATED)
+async def create_recurring_rule(
+    rule_data: RecurringRuleCreate,
+    current_user: Annotated[UserInDB, Depends(get_current_active_user)]
+):
+    """
+    Cria uma regra de transação recorrente (mensal, semanal ou a cada N dias).
+    As transações são geradas pelo agendador em segundo plano a cada vencimento,
+    inclusive as ocorrências de uma data inicial no passado.
+    """
+    await verify_account_permission(rule_data.account_id, current_user.id, required_level="edit")
+    await _verify_category(rule_data.category_id, current_user)
+
+    if rule_data.end_date is not None and rule_data.end_date < rule_data.start_date:
+        raise HTTPException(status_code=400, detail="A data final deve ser posterior à data inicial.")
+
+    rule_dict = rule_data.model_dump()
+    rule_dict["account_id"] = rule_data.account_id
+    rule_dict["category_id"] = rule_data.category_id
+    rule_dict["user_id"] = current_user.id
+    return await create_rule(rule_dict)
+
+
+@router.get("/", response_model=List[RecurringRuleInDB])
+async def list_recurring_rules(
+    current_user: Annotated[UserInDB, Depends(get_current_active_user)]
+):
+    """Lista as regras recorrentes do usuário logado."""
+    cursor = database[RULE_COLLECTION].find({"user_id": current_user.id})
+    rules = await cursor.to_list(length=None)
+    return documents_response(rules, RecurringRuleInDB)
+
+
+@router.get("/{id}", response_model=RecurringRuleInDB)
+async def get_recurring_rule(
+    id: str,
+    current_user: Annotated[UserInDB, Depends(get_current_active_user)]
+):
+    """Busca uma regra recorrente do usuário logado."""
+    rule = await database[RULE_COLLECTION].find_one({"_id": _parse_rule_id(id), "user_id": current_user.id})
+    if not rule:
+        raise HTTPException(status_code=404, detail="Regra não encontrada.")
+    return rule
+
+
+@router.put("/{id}", response_model=RecurringRuleInDB)
+async def update_recurring_rule(
+    id: str,
+    rule_data: RecurringRuleUpdate,
+    current_user: Annotated[UserInDB, Depends(get_current_active_user)]
+):
+    """
+    Atualiza os dados das próximas ocorrências, a data final ou o estado da regra.
+    Pausar (`active: false`) interrompe a geração; ao retomar, as ocorrências do
+    período pausado são puladas. As transações já geradas não mudam.
+    """
+    rule_id = _parse_rule_id(id)
+    update_data = rule_data.model_dump(exclude_unset=True)
+    if not update_data:
+        raise HTTPException(status_code=400, detail="Nenhum dado para atualizar")
+    if update_data.get("category_id") is not None:
+        await _verify_category(update_data["category_id"], current_user)
+
+    updated_rule = await update_rule(rule_id, current_user.id, update_data)
+    if not updated_rule:
+        raise HTTPException(status_code=404, detail="Regra não encontrada.")
+    return updated_rule
+
+
+@router.delete("/{id}", status_code=status.HTTP_204_NO_CONTENT)
+async def delete_recurring_rule(
+    id: str,
+    current_user: Annotated[UserInDB, Depends(get_current_active_user)]
+):
+    """Remove a regra. As transações já geradas por ela são mantidas."""
+    result = await database[RULE_COLLECTION].delete_one({"_id": _parse_rule_id(id), "user_id": current_user.id})
+    if not result.deleted_count:
+        raise HTTPException(status_code=404, detail="Regra não encontrada.")
+    return
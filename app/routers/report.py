@@ -1,11 +1,17 @@
 # app/routers/report.py
-from fastapi import APIRouter, Depends
-from typing import Annotated, List
-from datetime import datetime, date # Adicione 'date' aqui
+from fastapi import APIRouter, Depends, HTTPException, Request, Response
+from typing import Annotated, List, Literal, Optional
+from bson import ObjectId
+from datetime import datetime, date, timedelta # Adicione 'date' aqui
+from decimal import Decimal
 
+from ..core.category_names import category_names
+from ..core.versions import conditional_etag, user_version
 from ..models.user import UserInDB
-from ..models.report import CategoryExpense, MonthlySummary # Adicione MonthlySummary
-from ..db.mongodb import database
+from ..models.report import CategoryExpense, MonthlySummary, TimeSeriesPoint
+from ..db.mongodb import report_database
+from ..db.rollups import ROLLUP_COLLECTION, period_of
+from ..db.timeseries import TooManyBucketsError, income_expense_series
 from ..routers.authentication import get_current_active_user
 
 router = APIRouter(
@@ -18,22 +24,31 @@ router = APIRouter(
 async def get_expenses_by_category_report(
     year: int,
     month: int,
+    request: Request,
+    response: Response,
     current_user: Annotated[UserInDB, Depends(get_current_active_user)]
 ):
-    # ... (código existente)
-    start_date = datetime(year, month, 1)
-    next_month = month + 1 if month < 12 else 1
-    next_year = year if month < 12 else year + 1
-    end_date = datetime(next_year, next_month, 1)
-    pipeline = [
-        {"$match": {"user_id": current_user.id, "type": "expense", "transaction_date": {"$gte": start_date, "$lt": end_date}}},
-        {"$group": {"_id": "$category", "total_value": {"$sum": "$value"}}},
-        {"$project": {"category": "$_id", "total_value": "$total_value", "_id": 0}},
-        {"$sort": {"total_value": -1}}
-    ]
-    report_cursor = database["transactions"].aggregate(pipeline)
+    """
+    Total de despesas por categoria no mês, lido dos rollups mensais.
+    O agrupamento é pelo category_id; os nomes vêm do mapa de categorias do
+    usuário (transações antigas, sem category_id, usam o nome gravado nelas).
+    """
+    response.headers["ETag"] = await conditional_etag(request, user_version(current_user.id))
+    pipeline = _expenses_by_category_pipeline(current_user.id, year, month)
+    report_cursor = report_database[ROLLUP_COLLECTION].aggregate(pipeline)
     report_data = await report_cursor.to_list(length=None)
-    return report_data
+
+    names = await category_names.get_names(
+        current_user.id, [doc["_id"]["category_id"] for doc in report_data if doc["_id"].get("category_id")]
+    )
+    return [
+        CategoryExpense(
+            category_id=doc["_id"].get("category_id"),
+            category=category_names.name_of(names, doc["_id"].get("category_id"), doc["_id"].get("category")),
+            total_value=doc["total_value"]
+        )
+        for doc in report_data
+    ]
 
 
 # --- NOVA ROTA ADICIONADA ---
@@ -41,62 +56,182 @@ async def get_expenses_by_category_report(
 async def get_income_vs_expenses_report(
     start_date: date,
     end_date: date,
+    request: Request,
+    response: Response,
     current_user: Annotated[UserInDB, Depends(get_current_active_user)]
 ):
     """
     Gera um relatório de série temporal com o total de entradas e saídas
-    para cada mês dentro de um intervalo de datas.
+    para cada mês dentro de um intervalo de datas (meses sem movimento vêm zerados).
+    Meses inteiros são lidos dos rollups mensais; apenas os meses parciais
+    nas pontas do intervalo são agregados a partir das transações.
+    Para outras granularidades e filtros, use /reports/time-series.
     """
-    # Converte as datas para datetime para a query do MongoDB
+    response.headers["ETag"] = await conditional_etag(request, user_version(current_user.id))
+    # Intervalo semiaberto [start_datetime, end_datetime) cobrindo o dia final inteiro
     start_datetime = datetime.combine(start_date, datetime.min.time())
-    end_datetime = datetime.combine(end_date, datetime.max.time())
+    end_datetime = datetime.combine(end_date + timedelta(days=1), datetime.min.time())
+    if end_datetime <= start_datetime:
+        return []
+
+    # 1. Separa os meses inteiros (rollups) das pontas parciais (transações)
+    first_full = _month_start(start_datetime)
+    if first_full < start_datetime:
+        first_full = _add_month(first_full)
+    end_full = _month_start(end_datetime)
+
+    totals = {}
+    if first_full < end_full:
+        await _add_rollup_totals(totals, current_user.id, first_full, end_full)
+        partial_ranges = [(start_datetime, first_full), (end_full, end_datetime)]
+    else:
+        partial_ranges = [(start_datetime, end_datetime)]
+
+    for range_start, range_end in partial_ranges:
+        if range_start < range_end:
+            await _add_transaction_totals(totals, current_user.id, range_start, range_end)
+
+    # 2. Preenche com zero os meses sem movimento
+    month = _month_start(start_datetime)
+    while month < end_datetime:
+        totals.setdefault((month.year, month.month), {"income": Decimal("0.0"), "expense": Decimal("0.0")})
+        month = _add_month(month)
+
+    # 3. Formata o resultado para bater com nosso modelo Pydantic, em ordem cronológica
+    return [
+        MonthlySummary(
+            year=year,
+            month=month,
+            total_income=values["income"],
+            total_expenses=values["expense"]
+        )
+        for (year, month), values in sorted(totals.items())
+    ]
+
+
+@router.get("/time-series", response_model=List[TimeSeriesPoint])
+async def get_time_series_report(
+    start_date: date,
+    end_date: date,
+    request: Request,
+    response: Response,
+    current_user: Annotated[UserInDB, Depends(get_current_active_user)],
+    granularity: Literal["day", "week", "month", "quarter", "year"] = "month",
+    account_id: Optional[str] = None,
+    category_id: Optional[str] = None
+):
+    """
+    Série temporal de entradas e saídas entre start_date e end_date (inclusive),
+    agrupada por dia, semana (começando na segunda), mês, trimestre ou ano.
+    - Intervalos sem movimento vêm zerados; os das pontas cobrem só a parte dentro do período.
+    - Filtro opcional por conta e/ou categoria.
+    - Intervalos já encerrados ficam em cache; só o período aberto é recalculado.
+    """
+    response.headers["ETag"] = await conditional_etag(request, user_version(current_user.id))
+    filters = {}
+    for name, value, detail in (
+        ("account_id", account_id, "ID de conta inválido."),
+        ("category_id", category_id, "ID de categoria inválido."),
+    ):
+        if value:
+            try:
+                filters[name] = ObjectId(value)
+            except Exception:
+                raise HTTPException(status_code=400, detail=detail)
+
+    start_datetime = datetime.combine(start_date, datetime.min.time())
+    end_datetime = datetime.combine(end_date + timedelta(days=1), datetime.min.time())
+    if end_datetime <= start_datetime:
+        return []
+
+    try:
+        series = await income_expense_series(
+            current_user.id, start_datetime, end_datetime, granularity, **filters
+        )
+    except TooManyBucketsError as exc:
+        raise HTTPException(status_code=400, detail=str(exc))
+
+    return [
+        TimeSeriesPoint(
+            period_start=period_start,
+            total_income=totals["income"],
+            total_expenses=totals["expense"]
+        )
+        for period_start, totals in series
+    ]
+
 
-    pipeline = [
-        # 1. Filtra as transações pelo usuário e pelo intervalo de datas
+def _expenses_by_category_pipeline(user_id: ObjectId, year: int, month: int) -> list:
+    """Despesas do mês por categoria, a partir dos rollups."""
+    return [
+        {"$match": {"user_id": user_id, "period": period_of(year, month), "type": "expense", "count": {"$gt": 0}}},
+        {"$group": {
+            "_id": {"category_id": "$category_id", "category": "$category"},
+            "total_value": {"$sum": "$total"}
+        }},
+        {"$sort": {"total_value": -1}}
+    ]
+
+
+def _month_start(value: datetime) -> datetime:
+    return datetime(value.year, value.month, 1)
+
+
+def _add_month(value: datetime) -> datetime:
+    return datetime(value.year + value.month // 12, value.month % 12 + 1, 1)
+
+
+def _accumulate(totals: dict, year: int, month: int, type_: str, value) -> None:
+    entry = totals.setdefault((year, month), {"income": Decimal("0.0"), "expense": Decimal("0.0")})
+    if type_ in entry:
+        entry[type_] += value
+
+
+def _rollup_totals_pipeline(user_id, start: datetime, end: datetime) -> list:
+    """Totais por mês e tipo dos rollups dos meses inteiros em [start, end)."""
+    return [
         {
             "$match": {
-                "user_id": current_user.id,
-                "transaction_date": {"$gte": start_datetime, "$lt": end_datetime}
+                "user_id": user_id,
+                "period": {
+                    "$gte": period_of(start.year, start.month),
+                    "$lt": period_of(end.year, end.month)
+                },
+                "count": {"$gt": 0}
             }
         },
-        # 2. Agrupa por ano e mês
+        {"$group": {"_id": {"year": "$year", "month": "$month", "type": "$type"}, "total": {"$sum": "$total"}}}
+    ]
+
+
+async def _add_rollup_totals(totals: dict, user_id, start: datetime, end: datetime) -> None:
+    """Soma os rollups dos meses inteiros em [start, end)."""
+    pipeline = _rollup_totals_pipeline(user_id, start, end)
+    async for doc in report_database[ROLLUP_COLLECTION].aggregate(pipeline):
+        _accumulate(totals, doc["_id"]["year"], doc["_id"]["month"], doc["_id"]["type"], doc["total"])
+
+
+def _transaction_totals_pipeline(user_id, start: datetime, end: datetime) -> list:
+    """Totais por mês e tipo agregados direto das transações em [start, end)."""
+    return [
+        # Filtra as transações pelo usuário e pelo intervalo de datas
+        {"$match": {"user_id": user_id, "transaction_date": {"$gte": start, "$lt": end}}},
+        # Agrupa por ano, mês e tipo
         {
             "$group": {
                 "_id": {
                     "year": {"$year": "$transaction_date"},
-                    "month": {"$month": "$transaction_date"}
-                },
-                # 3. Usa $cond para somar condicionalmente
-                "total_income": {
-                    "$sum": {
-                        "$cond": [{"$eq": ["$type", "income"]}, "$value", 0]
-                    }
+                    "month": {"$month": "$transaction_date"},
+                    "type": "$type"
                 },
-                "total_expenses": {
-                    "$sum": {
-                        "$cond": [{"$eq": ["$type", "expense"]}, "$value", 0]
-                    }
-                }
-            }
-        },
-        # 4. Formata o resultado para bater com nosso modelo Pydantic
-        {
-            "$project": {
-                "year": "$_id.year",
-                "month": "$_id.month",
-                "total_income": "$total_income",
-                "total_expenses": "$total_expenses",
-                "_id": 0
+                "total": {"$sum": "$value"}
             }
-        },
-        # 5. Ordena cronologicamente
-        {
-            "$sort": {"year": 1, "month": 1}
         }
     ]
-    
-    report_cursor = database["transactions"].aggregate(pipeline)
-    report_data = await report_cursor.to_list(length=None)
 
-    # O TypeCodec já garante que os totais sejam Decimals
-    return report_data
\ No newline at end of file
+
+async def _add_transaction_totals(totals: dict, user_id, start: datetime, end: datetime) -> None:
+    """Agrega diretamente as transações de um trecho parcial de mês."""
+    pipeline = _transaction_totals_pipeline(user_id, start, end)
+    async for doc in report_database["transactions"].aggregate(pipeline):
+        _accumulate(totals, doc["_id"]["year"], doc["_id"]["month"], doc["_id"]["type"], doc["total"])
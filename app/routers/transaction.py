@@ -1,14 +1,31 @@
 # app/routers/transaction.py
-from fastapi import APIRouter, HTTPException, status, Depends
-from typing import List, Annotated
+from fastapi import APIRouter, HTTPException, status, Depends, Body, Query, Request
+from fastapi.responses import StreamingResponse
+from typing import Any, List, Annotated, Tuple
 from bson import ObjectId
-from pymongo import ReturnDocument
+from pydantic import ValidationError
+from pymongo import ReturnDocument, UpdateOne
 from typing import List, Annotated, Optional, Literal # Adicione Optional aqui
-from datetime import datetime, date # Adicione date aqui
+from datetime import datetime, date, timezone # Adicione date aqui
 
 from ..models.user import UserInDB
-from ..models.transaction import TransactionCreate, TransactionInDB, TransactionUpdate
-from ..db.mongodb import database
+from ..models.transaction import (
+    TransactionCreate, TransactionInDB, TransactionPartial, TransactionUpdate,
+    BulkItemError, BulkTransactionResult, InstallmentPaymentResult
+)
+from ..db.mongodb import database, run_in_transaction
+from ..db.balances import apply_balance_change
+from ..db.loader import category_loader
+from ..db.repository import as_stored, insert_transaction_batch, transaction_repository
+from ..db.rollups import apply_rollup_change
+from ..db.timeseries import invalidate_transactions
+from ..core.export import stream_csv, stream_ndjson
+from ..core.serialization import document_response, documents_response, model_field_keys
+from ..core.pagination import (
+    InvalidCursorError, decode_cursor, decode_score_cursor, encode_cursor, encode_score_cursor, keyset_filter
+)
+from ..core.permissions import accounts_with_access, verify_account_permission
+from ..core.versions import bump_transactions, conditional_etag, user_version
 from ..routers.authentication import get_current_active_user
 
 router = APIRouter(
@@ -16,6 +33,24 @@ router = APIRouter(
     tags=["Transactions"]
 )
 
+# Quantidade de documentos trazidos do MongoDB por lote durante a exportação
+EXPORT_BATCH_SIZE = 1000
+
+# Limites da importação em massa
+BULK_MAX_ITEMS = 5000
+BULK_INSERT_BATCH_SIZE = 1000
+
+# Ordem da listagem e da exportação; o _id desempata transações com a mesma data
+TRANSACTION_SORT = [("transaction_date", -1), ("_id", -1)]
+
+# Campos que podem ser pedidos no parâmetro `fields=` das leituras
+TRANSACTION_FIELDS = frozenset(model_field_keys(TransactionPartial))
+
+FIELDS_DESCRIPTION = (
+    "Lista de campos separados por vírgula (ex.: transaction_date,value,type,category_id). "
+    "O _id sempre é retornado. Sem o parâmetro, a transação completa é retornada."
+)
+
 # --- FUNÇÃO AUXILIAR PARA VERIFICAR PERMISSÕES ---
 async def _get_and_verify_account_permission(
     account_id: ObjectId, 
@@ -23,30 +58,169 @@ async def _get_and_verify_account_permission(
     required_level: str = "read"
 ):
     """
-    Busca uma conta e verifica se o usuário atual tem a permissão necessária.
+    Verifica se o usuário atual tem a permissão necessária na conta.
     Levanta exceções HTTP se a conta não for encontrada ou se não houver permissão.
     required_level pode ser 'read' ou 'edit'.
+    A verificação usa o mapa de acesso em memória, sem ir ao banco no caminho comum.
     """
-    account = await database["accounts"].find_one({"_id": account_id})
-    if not account:
-        raise HTTPException(status_code=404, detail="A conta especificada não foi encontrada.")
+    await verify_account_permission(account_id, current_user.id, required_level)
 
-    is_owner = account["user_id"] == current_user.id
-    if is_owner:
-        return  # O dono sempre tem todas as permissões
 
-    permissions = account.get("permissions", [])
-    user_perms = [p for p in permissions if p["user_id"] == current_user.id]
+# --- FUNÇÕES AUXILIARES PARA OS AGREGADOS (ROLLUPS E SALDOS DAS CONTAS) ---
+async def _apply_aggregates(before=None, after=None, session=None):
+    """Aplica a troca de `before` por `after` aos rollups mensais e aos saldos das contas."""
+    await apply_rollup_change(before=before, after=after, session=session)
+    await apply_balance_change(before=before, after=after, session=session)
 
-    if not user_perms:
-        raise HTTPException(status_code=403, detail="Você não tem permissão para acessar esta conta.")
 
-    # Se a permissão necessária for de edição, verifica o nível
-    if required_level == "edit" and user_perms[0]["permission_level"] != "edit":
-        raise HTTPException(status_code=403, detail="Você não tem permissão de edição para esta conta.")
-    
-    # Se chegou até aqui, o usuário tem pelo menos permissão de leitura.
-    return
+# --- PAGAMENTO DE PARCELAS ---
+
+# Condição para uma transação ter parcela a pagar, avaliada pelo próprio MongoDB
+# (o $exists também permite o uso do índice parcial das transações parceladas)
+INSTALLMENT_PAYABLE = {
+    "installment_details.total_installments": {"$exists": True},
+    "$expr": {"$lt": ["$installment_details.current_installment", "$installment_details.total_installments"]}
+}
+
+# Avança uma parcela e marca como paga ao chegar à última, na mesma atualização
+PAY_INSTALLMENT_PIPELINE = [
+    {"$set": {
+        "installment_details.current_installment": {"$add": ["$installment_details.current_installment", 1]}
+    }},
+    {"$set": {
+        "status": {"$cond": [
+            {"$gte": ["$installment_details.current_installment", "$installment_details.total_installments"]},
+            "paid",
+            "$status"
+        ]}
+    }},
+]
+
+
+async def _pay_next_installment(match: dict):
+    """
+    Paga a próxima parcela da transação que casar com `match` e com INSTALLMENT_PAYABLE.
+    Retorna a transação atualizada, ou None se nada casou.
+    Valor, data, tipo e categoria não mudam, então rollups e saldos não são tocados.
+    """
+    return await database["transactions"].find_one_and_update(
+        {**match, **INSTALLMENT_PAYABLE}, PAY_INSTALLMENT_PIPELINE,
+        return_document=ReturnDocument.AFTER
+    )
+
+
+def _installment_due_filter(due_before: datetime) -> dict:
+    """
+    INSTALLMENT_PAYABLE restrito às transações cuja PRÓXIMA parcela vence até
+    `due_before`: a parcela N (contando de 1) vence N meses depois da data da
+    compra, e a próxima a pagar é a `current_installment + 1`. Depois de paga,
+    a seguinte vence um mês mais tarde, então repetir a chamada com o mesmo
+    `due_before` não paga de novo a mesma parcela.
+    """
+    return {
+        "installment_details.total_installments": INSTALLMENT_PAYABLE["installment_details.total_installments"],
+        "transaction_date": {"$lte": due_before},
+        "$expr": {"$and": [
+            INSTALLMENT_PAYABLE["$expr"],
+            {"$lte": [
+                {"$dateAdd": {
+                    "startDate": "$transaction_date",
+                    "unit": "month",
+                    "amount": {"$add": ["$installment_details.current_installment", 1]}
+                }},
+                due_before
+            ]},
+        ]},
+    }
+
+
+# --- FUNÇÃO AUXILIAR PARA OS CAMPOS SELECIONADOS ---
+def _parse_fields(fields: Optional[str]) -> Optional[frozenset]:
+    """
+    Converte o parâmetro `fields=` no conjunto de campos da resposta.
+    Retorna None quando nenhum campo foi pedido (resposta completa).
+    """
+    if fields is None:
+        return None
+    selected = {field.strip() for field in fields.split(",") if field.strip()}
+    selected = {"_id" if field == "id" else field for field in selected}
+    invalid = selected - TRANSACTION_FIELDS
+    if invalid:
+        raise HTTPException(
+            status_code=400, detail=f"Campos inválidos: {', '.join(sorted(invalid))}."
+        )
+    return frozenset(selected | {"_id"})
+
+
+def _projection(selected: Optional[frozenset], *required: str) -> Optional[dict]:
+    """
+    Projeção do MongoDB para os campos pedidos, somada aos campos que a própria
+    rota precisa ler (ex.: account_id para a verificação de permissão).
+    """
+    if selected is None:
+        return None
+    return {field: 1 for field in selected.union(required)}
+
+
+# --- FUNÇÃO AUXILIAR PARA OS FILTROS DE LISTAGEM ---
+def _build_transaction_query(
+    user_id: ObjectId,
+    account_id: Optional[str],
+    category_id: Optional[str],
+    type: Optional[str],
+    start_date: Optional[date],
+    end_date: Optional[date]
+) -> dict:
+    """Monta o filtro de transações usado pela listagem e pela exportação."""
+    # A query base sempre filtra pelo usuário logado
+    query = {"user_id": user_id}
+
+    # Constrói a query dinamicamente com base nos filtros fornecidos
+    if account_id:
+        try:
+            query["account_id"] = ObjectId(account_id)
+        except Exception:
+            raise HTTPException(status_code=400, detail="ID de conta inválido.")
+            
+    if category_id:
+        try:
+            query["category_id"] = ObjectId(category_id)
+        except Exception:
+            raise HTTPException(status_code=400, detail="ID de categoria inválido.")
+
+    if type:
+        query["type"] = type
+
+    if start_date and end_date:
+        query["transaction_date"] = {
+            "$gte": datetime.combine(start_date, datetime.min.time()),
+            "$lt": datetime.combine(end_date, datetime.max.time())
+        }
+
+    return query
+
+
+def _search_pipeline(
+    query: dict,
+    q: str,
+    limit: int,
+    after: Optional[Tuple[float, ObjectId]] = None,
+    selected: Optional[frozenset] = None
+) -> List[dict]:
+    """Pipeline da busca textual, em ordem de relevância, continuando após `after` (score, _id)."""
+    pipeline = [
+        {"$match": {**query, "$text": {"$search": q}}},
+        {"$addFields": {"score": {"$meta": "textScore"}}},
+    ]
+    # Keyset sobre (score, _id): continua logo após a última linha da página anterior
+    if after is not None:
+        pipeline.append({"$match": keyset_filter("score", *after)})
+    pipeline.append({"$sort": {"score": -1, "_id": -1}})
+    pipeline.append({"$limit": limit})
+    if selected is not None:
+        pipeline.append({"$project": _projection(selected, "score")})
+    return pipeline
+
 
 # --- ROTAS ATUALIZADAS ---
 
@@ -61,10 +235,8 @@ async def create_transaction(
     )
     
     # Valida a categoria
-    category = await database["categories"].find_one(
-        {"_id": transaction_data.category_id, "user_id": current_user.id}
-    )
-    if not category:
+    category = await category_loader.load(transaction_data.category_id)
+    if not category or category["user_id"] != current_user.id:
         raise HTTPException(status_code=404, detail="Categoria não encontrada.")
 
     # Usamos model_dump() mas garantimos que os ObjectIds não sejam convertidos para string
@@ -73,16 +245,102 @@ async def create_transaction(
     transaction_dict["category_id"] = transaction_data.category_id
     transaction_dict["user_id"] = current_user.id
     
-    result = await database["transactions"].insert_one(transaction_dict)
-    created_transaction = await database["transactions"].find_one({"_id": result.inserted_id})
-    
-    if created_transaction:
-        return created_transaction
-    raise HTTPException(status_code=500, detail="Erro ao criar a transação")
+    # A transação, o rollup do mês e o saldo da conta são gravados juntos
+    async def write(session):
+        created = await transaction_repository.insert(transaction_dict, session=session)
+        await _apply_aggregates(after=created, session=session)
+        await bump_transactions([created], session=session)
+        return created
+
+    created_transaction = await run_in_transaction(write)
+    invalidate_transactions([created_transaction])
+    return created_transaction
+
+
+def _validation_detail(exc: ValidationError) -> str:
+    """Resume os erros de validação de um item como 'campo: mensagem; ...'."""
+    return "; ".join(
+        f"{'.'.join(str(part) for part in error['loc']) or 'item'}: {error['msg']}"
+        for error in exc.errors()
+    )
+
+
+@router.post("/bulk", response_model=BulkTransactionResult)
+async def create_transactions_bulk(
+    transactions_data: Annotated[List[Any], Body(max_length=BULK_MAX_ITEMS)],
+    current_user: Annotated[UserInDB, Depends(get_current_active_user)]
+):
+    """
+    Cria várias transações de uma vez (importação).
+    - Cada item é validado separadamente: um item inválido vira um erro do item, não um 422 do lote.
+    - Permissões e categorias são verificadas uma única vez por conta/categoria distinta.
+    - As inserções são feitas em lotes com insert_many não ordenado.
+    - Itens com falha são reportados individualmente, sem abortar o restante do lote.
+    """
+    errors = []
+
+    # 1. Valida cada item com o modelo de criação
+    items = []  # (posição, item válido)
+    for index, raw_item in enumerate(transactions_data):
+        try:
+            items.append((index, TransactionCreate.model_validate(raw_item)))
+        except ValidationError as exc:
+            errors.append(BulkItemError(index=index, detail=_validation_detail(exc)))
+
+    # 2. Verifica a permissão de edição uma vez por conta distinta
+    account_errors = {}
+    for account_id in {item.account_id for _, item in items}:
+        try:
+            await _get_and_verify_account_permission(account_id, current_user, required_level="edit")
+        except HTTPException as exc:
+            account_errors[account_id] = exc.detail
+
+    # 3. Valida todas as categorias distintas com uma única query
+    category_ids = list({item.category_id for _, item in items})
+    valid_categories = set()
+    async for category in database["categories"].find(
+        {"_id": {"$in": category_ids}, "user_id": current_user.id}, {"_id": 1}
+    ):
+        valid_categories.add(category["_id"])
+
+    # 4. Monta os documentos válidos, já com o _id definido para mapear falhas de escrita
+    documents = []
+    for index, item in items:
+        if item.account_id in account_errors:
+            errors.append(BulkItemError(index=index, detail=account_errors[item.account_id]))
+            continue
+        if item.category_id not in valid_categories:
+            errors.append(BulkItemError(index=index, detail="Categoria não encontrada."))
+            continue
+
+        # Normaliza as datas como o MongoDB as grava, pois rollups e saldos usam este documento
+        transaction_dict = as_stored(item.model_dump())
+        transaction_dict["_id"] = ObjectId()
+        transaction_dict["account_id"] = item.account_id
+        transaction_dict["category_id"] = item.category_id
+        transaction_dict["user_id"] = current_user.id
+        documents.append((index, transaction_dict))
+
+    # 5. Insere em lotes não ordenados; um documento com erro não impede os demais.
+    #    Cada lote grava as transações, os rollups e os saldos na mesma transação.
+    inserted = []
+    for start in range(0, len(documents), BULK_INSERT_BATCH_SIZE):
+        batch_inserted, batch_errors = await insert_transaction_batch(documents[start:start + BULK_INSERT_BATCH_SIZE])
+        inserted.extend(batch_inserted)
+        errors.extend(BulkItemError(index=index, detail=detail) for index, detail in batch_errors.items())
+    invalidate_transactions(inserted)
+
+    errors.sort(key=lambda error: error.index)
+    return BulkTransactionResult(
+        inserted_count=len(inserted),
+        inserted_ids=[doc["_id"] for doc in inserted],
+        errors=errors
+    )
 
 
 @router.get("/", response_model=List[TransactionInDB])
 async def list_transactions(
+    request: Request,
     current_user: Annotated[UserInDB, Depends(get_current_active_user)],
     # --- NOVOS PARÂMETROS DE FILTRO (OPCIONAIS) ---
     account_id: Optional[str] = None,
@@ -92,48 +350,203 @@ async def list_transactions(
     end_date: Optional[date] = None,
     # --- PARÂMETROS DE PAGINAÇÃO ---
     skip: int = 0,
-    limit: int = 100
+    limit: int = 100,
+    cursor: Optional[str] = None,
+    fields: Optional[str] = Query(None, description=FIELDS_DESCRIPTION)
 ):
     """
     Lista transações com filtros avançados e paginação.
     - Filtre por conta, categoria, tipo e/ou intervalo de datas.
+    - Paginação por cursor: envie o valor do cabeçalho `X-Next-Cursor` da página
+      anterior no parâmetro `cursor`. Nesse modo o `skip` é ignorado e a busca
+      vai direto para a próxima página, sem percorrer os documentos anteriores.
+    - `fields` limita os campos retornados (e lidos do banco), no formato de `TransactionPartial`.
+    - Responde 304 a um `If-None-Match` com o ETag atual, sem consultar o banco.
     """
-    # A query base sempre filtra pelo usuário logado
-    query = {"user_id": current_user.id}
+    selected = _parse_fields(fields)
+    query = _build_transaction_query(
+        current_user.id, account_id, category_id, type, start_date, end_date
+    )
+    headers = {"ETag": await conditional_etag(request, user_version(current_user.id))}
 
-    # Constrói a query dinamicamente com base nos filtros fornecidos
-    if account_id:
+    # Paginação por cursor (keyset): continua logo após (transaction_date, _id) da última linha
+    if cursor:
         try:
-            query["account_id"] = ObjectId(account_id)
-        except Exception:
-            raise HTTPException(status_code=400, detail="ID de conta inválido.")
-            
-    if category_id:
+            last_date, last_id = decode_cursor(cursor)
+        except InvalidCursorError:
+            raise HTTPException(status_code=400, detail="Cursor inválido.")
+        query.update(keyset_filter("transaction_date", last_date, last_id))
+        skip = 0
+
+    # Aplica a ordenação, paginação e executa a busca.
+    # O _id desempata transações com a mesma data, deixando a ordem estável entre páginas.
+    # A data é sempre lida para montar o cursor da próxima página
+    db_cursor = (
+        database["transactions"].find(query, _projection(selected, "transaction_date"))
+        .sort(TRANSACTION_SORT)
+        .skip(skip)
+        .limit(limit)
+    )
+    
+    transactions = await db_cursor.to_list(length=limit)
+
+    if limit > 0 and len(transactions) == limit:
+        last = transactions[-1]
+        headers["X-Next-Cursor"] = encode_cursor(last["transaction_date"], last["_id"])
+
+    # Documentos gravados pelo próprio servidor: serializa direto para JSON,
+    # sem revalidar cada linha pelo response_model
+    if selected is not None:
+        return documents_response(transactions, TransactionPartial, headers=headers, fields=selected)
+    return documents_response(transactions, TransactionInDB, headers=headers)
+
+
+@router.get("/search", response_model=List[TransactionInDB])
+async def search_transactions(
+    request: Request,
+    current_user: Annotated[UserInDB, Depends(get_current_active_user)],
+    q: str = Query(..., min_length=1, description="Termos buscados na descrição e nas observações"),
+    account_id: Optional[str] = None,
+    category_id: Optional[str] = None,
+    type: Optional[Literal["income", "expense"]] = None,
+    start_date: Optional[date] = None,
+    end_date: Optional[date] = None,
+    limit: int = Query(50, ge=1, le=500),
+    cursor: Optional[str] = None,
+    fields: Optional[str] = Query(None, description=FIELDS_DESCRIPTION)
+):
+    """
+    Busca transações pelo texto da descrição e das observações, usando o
+    índice de texto do MongoDB (palavras em português, sem acentuação exata;
+    frases entre aspas e termos com '-' seguem a sintaxe do $text).
+    - Aceita os mesmos filtros da listagem.
+    - Os resultados vêm em ordem de relevância (descrição pesa mais que observações).
+    - Paginação por cursor: envie o valor do cabeçalho `X-Next-Cursor` no parâmetro `cursor`.
+    """
+    selected = _parse_fields(fields)
+    query = _build_transaction_query(
+        current_user.id, account_id, category_id, type, start_date, end_date
+    )
+    headers = {"ETag": await conditional_etag(request, user_version(current_user.id))}
+
+    after = None
+    if cursor:
         try:
-            query["category_id"] = ObjectId(category_id)
-        except Exception:
-            raise HTTPException(status_code=400, detail="ID de categoria inválido.")
+            after = decode_score_cursor(cursor)
+        except InvalidCursorError:
+            raise HTTPException(status_code=400, detail="Cursor inválido.")
+    pipeline = _search_pipeline(query, q, limit, after=after, selected=selected)
 
-    if type:
-        query["type"] = type
+    transactions = await database["transactions"].aggregate(pipeline).to_list(length=limit)
 
-    if start_date and end_date:
-        query["transaction_date"] = {
-            "$gte": datetime.combine(start_date, datetime.min.time()),
-            "$lt": datetime.combine(end_date, datetime.max.time())
-        }
+    if len(transactions) == limit:
+        last = transactions[-1]
+        headers["X-Next-Cursor"] = encode_score_cursor(last["score"], last["_id"])
 
-    # Aplica a ordenação, paginação e executa a busca
-    cursor = database["transactions"].find(query).sort("transaction_date", -1).skip(skip).limit(limit)
-    
-    transactions = await cursor.to_list(length=limit)
-    return transactions
+    if selected is not None:
+        return documents_response(transactions, TransactionPartial, headers=headers, fields=selected)
+    return documents_response(transactions, TransactionInDB, headers=headers)
+
+
+@router.get("/export")
+async def export_transactions(
+    current_user: Annotated[UserInDB, Depends(get_current_active_user)],
+    format: Literal["ndjson", "csv"] = "ndjson",
+    account_id: Optional[str] = None,
+    category_id: Optional[str] = None,
+    type: Optional[Literal["income", "expense"]] = None,
+    start_date: Optional[date] = None,
+    end_date: Optional[date] = None
+):
+    """
+    Exporta o histórico de transações em NDJSON ou CSV, com os mesmos filtros da listagem.
+    A resposta é enviada em streaming direto do cursor do MongoDB, sem carregar
+    todas as transações em memória.
+    """
+    query = _build_transaction_query(
+        current_user.id, account_id, category_id, type, start_date, end_date
+    )
+    db_cursor = (
+        database["transactions"].find(query)
+        .sort(TRANSACTION_SORT)
+        .batch_size(EXPORT_BATCH_SIZE)
+    )
+
+    if format == "csv":
+        return StreamingResponse(
+            stream_csv(db_cursor),
+            media_type="text/csv",
+            headers={"Content-Disposition": 'attachment; filename="transactions.csv"'}
+        )
+    return StreamingResponse(
+        stream_ndjson(db_cursor),
+        media_type="application/x-ndjson",
+        headers={"Content-Disposition": 'attachment; filename="transactions.ndjson"'}
+    )
+
+
+@router.post("/pay-due-installments", response_model=InstallmentPaymentResult)
+async def pay_due_installments(
+    current_user: Annotated[UserInDB, Depends(get_current_active_user)],
+    account_id: Optional[str] = Query(None, description="Restringe o pagamento a uma conta"),
+    due_before: Optional[datetime] = Query(None, description="Paga as parcelas com data até este momento (padrão: agora)")
+):
+    """
+    Paga a próxima parcela de todas as transações parceladas vencidas nas contas
+    em que o usuário tem permissão de edição, em lotes de bulk_write.
+    Uma parcela está vencida quando a sua própria data (a data da compra mais
+    tantos meses quanto as parcelas já pagas) é anterior a `due_before`; repetir
+    a chamada com o mesmo `due_before` só paga parcelas que ainda estejam vencidas.
+    Cada item repete a condição de pagamento no filtro, então chamadas
+    concorrentes nunca passam do total de parcelas.
+    """
+    if account_id:
+        try:
+            account_object_id = ObjectId(account_id)
+        except Exception:
+            raise HTTPException(status_code=400, detail="ID de conta inválido")
+        await _get_and_verify_account_permission(account_object_id, current_user, required_level="edit")
+        accounts = [account_object_id]
+    else:
+        accounts = await accounts_with_access(current_user.id, "edit")
+
+    query = {
+        "account_id": {"$in": accounts},
+        **_installment_due_filter(as_stored(due_before or datetime.now(timezone.utc))),
+    }
+
+    # Percorre as transações vencidas em ordem de _id, lote a lote: cada
+    # transação é visitada uma única vez por chamada, sem limite no total
+    due_count = paid_count = 0
+    last_id = None
+    while True:
+        page_query = query if last_id is None else {**query, "_id": {"$gt": last_id}}
+        due = await database["transactions"].find(
+            page_query, {"_id": 1, "user_id": 1, "account_id": 1}
+        ).sort("_id", 1).limit(BULK_MAX_ITEMS).to_list(length=None)
+        if not due:
+            break
+
+        result = await database["transactions"].bulk_write(
+            [UpdateOne({"_id": doc["_id"], **query}, PAY_INSTALLMENT_PIPELINE) for doc in due],
+            ordered=False
+        )
+        if result.modified_count:
+            await bump_transactions(due)
+        due_count += len(due)
+        paid_count += result.modified_count
+        if len(due) < BULK_MAX_ITEMS:
+            break
+        last_id = due[-1]["_id"]
+
+    return InstallmentPaymentResult(due_count=due_count, paid_count=paid_count)
 
 
 @router.get("/{id}", response_model=TransactionInDB)
 async def get_transaction_by_id(
     id: str, 
-    current_user: Annotated[UserInDB, Depends(get_current_active_user)]
+    current_user: Annotated[UserInDB, Depends(get_current_active_user)],
+    fields: Optional[str] = Query(None, description=FIELDS_DESCRIPTION)
 ):
     """Busca uma transação e valida a permissão de leitura na conta associada."""
     try:
@@ -141,12 +554,19 @@ async def get_transaction_by_id(
     except Exception:
         raise HTTPException(status_code=400, detail="ID de transação inválido")
 
-    transaction = await database["transactions"].find_one({"_id": transaction_id})
+    selected = _parse_fields(fields)
+
+    # O account_id é sempre lido: a permissão é verificada sobre a conta da transação
+    transaction = await database["transactions"].find_one(
+        {"_id": transaction_id}, _projection(selected, "account_id")
+    )
     if not transaction:
         raise HTTPException(status_code=404, detail=f"Transação com id {id} não encontrada")
 
     await _get_and_verify_account_permission(transaction["account_id"], current_user, required_level="read")
-    
+
+    if selected is not None:
+        return document_response(transaction, TransactionPartial, fields=selected)
     return transaction
 
 
@@ -174,10 +594,25 @@ async def update_transaction(
     if not update_data:
         raise HTTPException(status_code=400, detail="Nenhum dado para atualizar")
 
-    updated_transaction = await database["transactions"].find_one_and_update(
-        {"_id": transaction_id}, {"$set": update_data}, return_document=ReturnDocument.AFTER
-    )
-    return updated_transaction
+    # O documento anterior vem da própria atualização, então a variação aplicada
+    # aos agregados corresponde exatamente ao que foi substituído
+    async def write(session):
+        before = await database["transactions"].find_one_and_update(
+            {"_id": transaction_id}, {"$set": update_data},
+            return_document=ReturnDocument.BEFORE, session=session
+        )
+        if before is None:
+            return None
+        after = {**before, **as_stored(update_data)}
+        await _apply_aggregates(before=before, after=after, session=session)
+        await bump_transactions([before, after], session=session)
+        return before, after
+
+    result = await run_in_transaction(write)
+    if not result:
+        raise HTTPException(status_code=404, detail="Transação não encontrada.")
+    invalidate_transactions(result)
+    return result[1]
 
 
 @router.delete("/{id}", status_code=status.HTTP_204_NO_CONTENT)
@@ -199,7 +634,16 @@ async def delete_transaction(
         transaction_to_delete["account_id"], current_user, required_level="edit"
     )
         
-    await database["transactions"].delete_one({"_id": transaction_id})
+    async def write(session):
+        deleted = await database["transactions"].find_one_and_delete({"_id": transaction_id}, session=session)
+        if deleted is not None:
+            await _apply_aggregates(before=deleted, session=session)
+            await bump_transactions([deleted], session=session)
+        return deleted
+
+    deleted_transaction = await run_in_transaction(write)
+    if deleted_transaction:
+        invalidate_transactions([deleted_transaction])
     return
 
 
@@ -208,16 +652,27 @@ async def pay_installment(
     id: str,
     current_user: Annotated[UserInDB, Depends(get_current_active_user)]
 ):
-    """Paga uma parcela, validando a permissão de edição na conta associada."""
+    """
+    Paga uma parcela, validando a permissão de edição na conta associada.
+    Permissão, limite de parcelas e troca do status são verificados dentro de
+    uma única atualização condicional; a transação só é lida de novo quando a
+    atualização não casa, para montar a mensagem de erro.
+    """
     try:
         transaction_id = ObjectId(id)
     except Exception:
         raise HTTPException(status_code=400, detail="ID de transação inválido")
 
+    editable_accounts = await accounts_with_access(current_user.id, "edit")
+    updated = await _pay_next_installment({"_id": transaction_id, "account_id": {"$in": editable_accounts}})
+    if updated:
+        await bump_transactions([updated])
+        return updated
+
     transaction = await database["transactions"].find_one({"_id": transaction_id})
     if not transaction:
         raise HTTPException(status_code=404, detail="Transação não encontrada")
-    
+
     await _get_and_verify_account_permission(
         transaction["account_id"], current_user, required_level="edit"
     )
@@ -225,16 +680,14 @@ async def pay_installment(
     installments = transaction.get("installment_details")
     if not installments:
         raise HTTPException(status_code=400, detail="Esta não é uma transação parcelada válida.")
-        
+
     if installments["current_installment"] >= installments["total_installments"]:
         raise HTTPException(status_code=400, detail="Todas as parcelas já foram pagas.")
 
-    update_query = {"$inc": {"installment_details.current_installment": 1}}
-    if installments["current_installment"] + 1 == installments["total_installments"]:
-        update_query["$set"] = {"status": "paid"}
-    
-    updated_transaction = await database["transactions"].find_one_and_update(
-        {"_id": transaction_id}, update_query, return_document=ReturnDocument.AFTER
-    )
-    
-    return updated_transaction
\ No newline at end of file
+    # A permissão acabou de ser confirmada pelo caminho frio (mapa de acesso
+    # desatualizado, ex.: conta compartilhada por outro worker): tenta de novo
+    updated = await _pay_next_installment({"_id": transaction_id, "account_id": transaction["account_id"]})
+    if not updated:
+        raise HTTPException(status_code=400, detail="Todas as parcelas já foram pagas.")
+    await bump_transactions([updated])
+    return updated
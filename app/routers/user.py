@@ -2,8 +2,11 @@
 
 from fastapi import APIRouter, HTTPException, status
 from ..models.user import UserCreate, UserInDB
+from ..db.balances import initial_totals
 from ..db.mongodb import database
-from ..core.security import get_password_hash
+from ..db.repository import DuplicateDocumentError, account_repository, user_repository
+from ..core.security import get_password_hash_async, PasswordHasherBusyError
+from ..routers.authentication import invalidate_cached_user
 from decimal import Decimal
 
 router = APIRouter(
@@ -15,40 +18,53 @@ router = APIRouter(
 async def register_user(user_data: UserCreate):
     """
     Registra um novo usuário no sistema.
-    - Verifica se o e-mail já existe.
     - Hashea a senha antes de salvar.
+    - Rejeita e-mails já cadastrados (busca prévia; o índice único cobre cadastros concorrentes).
     - Cria uma conta padrão ("Conta Principal") para o novo usuário.
     """
-    # 1. Verifica se o usuário já existe
-    existing_user = await database["users"].find_one({"email": user_data.email})
-    if existing_user:
+    # 1. Rejeita e-mails já cadastrados antes de gastar um hash bcrypt
+    if await database["users"].find_one({"email": user_data.email}, {"_id": 1}):
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="Um usuário com este e-mail já existe."
         )
 
-    # 2. Cria o novo usuário
-    hashed_password = get_password_hash(user_data.password)
+    # 2. Hashea a senha do novo usuário
+    try:
+        hashed_password = await get_password_hash_async(user_data.password)
+    except PasswordHasherBusyError:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Servidor ocupado. Tente novamente em instantes.",
+            headers={"Retry-After": "1"},
+        )
     new_user_data = {
         "name": user_data.name,
         "email": user_data.email,
         "hashed_password": hashed_password
     }
-    result = await database["users"].insert_one(new_user_data)
-    created_user = await database["users"].find_one({"_id": result.inserted_id})
 
-    if not created_user:
-        # Se, por algum motivo, o usuário não foi criado, lançamos um erro.
-        raise HTTPException(status_code=500, detail="Erro ao criar o usuário.")
+    # 3. Cria o novo usuário; o índice único ainda rejeita um cadastro concorrente
+    try:
+        created_user = await user_repository.insert(new_user_data)
+    except DuplicateDocumentError:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Um usuário com este e-mail já existe."
+        )
 
-    # 3. Cria a conta padrão para o usuário recém-criado
+    # 4. Cria a conta padrão para o usuário recém-criado
     default_account = {
         "user_id": created_user["_id"],  # Associa a conta ao ID do novo usuário
         "name": "Conta Principal",
         "type": "checking",
-        "balance": Decimal("0.0")
+        "balance": Decimal("0.0"),
+        **initial_totals(Decimal("0.0"))
     }
-    await database["accounts"].insert_one(default_account)
+    await account_repository.insert(default_account)
+
+    # Garante que nenhuma versão antiga deste e-mail continue no cache de autenticação
+    invalidate_cached_user(created_user["email"])
 
-    # 4. Retorna os dados do usuário criado
+    # 5. Retorna os dados do usuário criado
     return created_user
\ No newline at end of file
@@ -0,0 +1,126 @@
+# benchmarks/common.py
+
+"""
+Utilitários compartilhados pelos benchmarks: configuração do ambiente,
+execução de carga concorrente e cálculo das estatísticas de latência.
+"""
+
+import asyncio
+import json
+import os
+import platform
+import subprocess
+import time
+from datetime import datetime, timezone
+from typing import Awaitable, Callable, Dict, List
+
+DEFAULT_MONGO_URL = "mongodb://localhost:27017"
+DEFAULT_DATABASE = "financial_bench"
+BENCH_SECRET_KEY = "benchmark-secret-key-not-for-production"
+
+
+def configure_environment(mongo_url: str, database_name: str) -> None:
+    """
+    Aponta a aplicação para o MongoDB local de benchmark.
+    Precisa ser chamada ANTES de importar qualquer módulo de `app`, pois as
+    configurações são lidas na importação. Variáveis de ambiente têm
+    prioridade sobre o arquivo .env.
+    """
+    if "bench" not in database_name:
+        # Proteção: o seed apaga o banco inteiro antes de popular
+        raise SystemExit(f"O banco de benchmark deve conter 'bench' no nome (recebido: {database_name}).")
+
+    os.environ["MONGO_URL"] = mongo_url
+    os.environ["DATABASE_NAME"] = database_name
+    os.environ.setdefault("SECRET_KEY", BENCH_SECRET_KEY)
+
+
+def percentile(sorted_values: List[float], pct: float) -> float:
+    """Percentil por interpolação linear sobre uma lista já ordenada."""
+    if not sorted_values:
+        return 0.0
+    position = (len(sorted_values) - 1) * pct / 100
+    lower = int(position)
+    upper = min(lower + 1, len(sorted_values) - 1)
+    fraction = position - lower
+    return sorted_values[lower] + (sorted_values[upper] - sorted_values[lower]) * fraction
+
+
+def summarize(latencies: List[float], wall_time: float, errors: int) -> Dict[str, float]:
+    """Resume uma rodada: vazão e latências (em milissegundos)."""
+    ordered = sorted(latencies)
+    count = len(ordered)
+    return {
+        "requests": count,
+        "errors": errors,
+        "wall_time_s": round(wall_time, 4),
+        "throughput_rps": round(count / wall_time, 2) if wall_time else 0.0,
+        "mean_ms": round(sum(ordered) / count * 1000, 3) if count else 0.0,
+        "p50_ms": round(percentile(ordered, 50) * 1000, 3),
+        "p95_ms": round(percentile(ordered, 95) * 1000, 3),
+        "p99_ms": round(percentile(ordered, 99) * 1000, 3),
+        "max_ms": round(ordered[-1] * 1000, 3) if count else 0.0,
+    }
+
+
+async def run_load(
+    operation: Callable[[int], Awaitable[None]],
+    requests: int,
+    concurrency: int
+) -> Dict[str, float]:
+    """
+    Executa `operation(i)` para i em [0, requests) com até `concurrency`
+    chamadas simultâneas e retorna as estatísticas de latência.
+    Uma operação que levanta exceção conta como erro.
+    """
+    latencies: List[float] = []
+    errors = 0
+    counter = iter(range(requests))
+
+    async def worker():
+        nonlocal errors
+        for index in counter:
+            started = time.perf_counter()
+            try:
+                await operation(index)
+            except Exception:
+                errors += 1
+                continue
+            latencies.append(time.perf_counter() - started)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return summarize(latencies, time.perf_counter() - started, errors)
+
+
+def environment_metadata() -> Dict[str, str]:
+    """Informações para identificar a rodada ao comparar resultados."""
+    try:
+        commit = subprocess.check_output(
+            ["git", "rev-parse", "--short", "HEAD"], stderr=subprocess.DEVNULL, text=True
+        ).strip()
+    except Exception:
+        commit = "unknown"
+
+    return {
+        "timestamp": datetime.now(timezone.utc).isoformat(),
+        "git_commit": commit,
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+    }
+
+
+def save_results(path: str, payload: dict) -> None:
+    with open(path, "w", encoding="utf-8") as output:
+        json.dump(payload, output, indent=2, ensure_ascii=False)
+
+
+def print_table(results: Dict[str, Dict[str, float]]) -> None:
+    header = f"{'cenário':<28}{'req/s':>10}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'erros':>8}"
+    print(header)
+    print("-" * len(header))
+    for name, stats in results.items():
+        print(
+            f"{name:<28}{stats['throughput_rps']:>10}{stats['p50_ms']:>10}"
+            f"{stats['p95_ms']:>10}{stats['p99_ms']:>10}{stats['errors']:>8}"
+        )
@@ -0,0 +1,44 @@
+# benchmarks/compare.py
+
+"""
+Compara dois arquivos de resultado gerados pelos benchmarks.
+
+Uso:
+    python -m benchmarks.compare antes.json depois.json
+"""
+
+import json
+import sys
+
+METRICS = ("throughput_rps", "p50_ms", "p95_ms", "p99_ms")
+
+
+def _change(before: float, after: float) -> str:
+    if not before:
+        return "n/a"
+    return f"{(after - before) / before * 100:+.1f}%"
+
+
+def compare(before_path: str, after_path: str) -> None:
+    with open(before_path, encoding="utf-8") as before_file:
+        before = json.load(before_file)["results"]
+    with open(after_path, encoding="utf-8") as after_file:
+        after = json.load(after_file)["results"]
+
+    header = f"{'cenário':<28}" + "".join(f"{metric:>18}" for metric in METRICS)
+    print(header)
+    print("-" * len(header))
+    for name in before:
+        if name not in after:
+            continue
+        cells = "".join(
+            f"{_change(before[name][metric], after[name][metric]):>18}" for metric in METRICS
+        )
+        print(f"{name:<28}{cells}")
+
+
+if __name__ == "__main__":
+    if len(sys.argv) != 3:
+        print("Uso: python -m benchmarks.compare antes.json depois.json")
+        sys.exit(1)
+    compare(sys.argv[1], sys.argv[2])
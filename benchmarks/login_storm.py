@@ -0,0 +1,124 @@
+# benchmarks/login_storm.py
+
+"""
+Mede o impacto de uma avalanche de logins na latência de endpoints não relacionados.
+
+Enquanto `--storm-concurrency` clientes fazem login sem parar, um cliente
+separado chama GET /accounts/ em ritmo fixo e registra a latência contada a
+partir do horário agendado de cada chamada. A mesma medição é feita
+antes da avalanche (linha de base) para comparação. Com `--inline-hashing`
+o bcrypt volta a rodar dentro do event loop, reproduzindo o comportamento
+antigo na mesma rodada. Requer o httpx do grupo de dependências bench
+(instalado pelo `uv sync`).
+
+Uso:
+    python -m benchmarks.login_storm --output login_storm.json
+    python -m benchmarks.login_storm --inline-hashing --output login_storm_inline.json
+"""
+
+import argparse
+import asyncio
+import os
+import time
+
+from .common import (
+    DEFAULT_DATABASE, DEFAULT_MONGO_URL, configure_environment, environment_metadata,
+    print_table, save_results, summarize
+)
+
+EMAIL = "storm@example.com"
+PASSWORD = "storm-password"
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Benchmark de avalanche de logins.")
+    parser.add_argument("--mongo-url", default=os.getenv("BENCH_MONGO_URL", DEFAULT_MONGO_URL))
+    parser.add_argument("--database", default=os.getenv("BENCH_DATABASE", DEFAULT_DATABASE))
+    parser.add_argument("--storm-concurrency", type=int, default=32)
+    parser.add_argument("--duration", type=float, default=10.0, help="Duração da avalanche em segundos")
+    parser.add_argument("--probe-requests", type=int, default=200)
+    parser.add_argument("--probe-interval", type=float, default=0.02,
+                        help="Intervalo entre as chamadas de sonda em segundos")
+    parser.add_argument("--inline-hashing", action="store_true",
+                        help="Roda o bcrypt no event loop (comportamento anterior)")
+    parser.add_argument("--output", default="bench_results_login_storm.json")
+    return parser.parse_args()
+
+
+async def main(args):
+    configure_environment(args.mongo_url, args.database)
+
+    import httpx
+    from app.core import security
+    from app.main import app
+
+    if args.inline_hashing:
+        async def run_inline(func, *func_args):
+            return func(*func_args)
+        security._run_in_hash_pool = run_inline
+
+    async with app.router.lifespan_context(app):
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+            await client.post("/users/register", json={"email": EMAIL, "name": "Storm", "password": PASSWORD})
+            token = (await client.post("/token", data={"username": EMAIL, "password": PASSWORD})).json()["access_token"]
+            headers = {"Authorization": f"Bearer {token}"}
+
+            async def probe():
+                """
+                Dispara GET /accounts/ em ritmo fixo e mede a latência a partir do
+                horário agendado, para que travamentos do event loop (que atrasam
+                o próprio disparo) apareçam na medição.
+                """
+                latencies, errors = [], 0
+                started = time.perf_counter()
+                for index in range(args.probe_requests):
+                    scheduled = started + index * args.probe_interval
+                    await asyncio.sleep(max(0.0, scheduled - time.perf_counter()))
+                    response = await client.get("/accounts/", headers=headers)
+                    if response.status_code != 200:
+                        errors += 1
+                        continue
+                    latencies.append(time.perf_counter() - scheduled)
+                return summarize(latencies, time.perf_counter() - started, errors)
+
+            baseline = await probe()
+
+            # Avalanche: logins contínuos até o fim da duração
+            stop_at = time.perf_counter() + args.duration
+            login_latencies, login_errors = [], 0
+
+            async def storm_worker():
+                nonlocal login_errors
+                while time.perf_counter() < stop_at:
+                    started = time.perf_counter()
+                    response = await client.post("/token", data={"username": EMAIL, "password": PASSWORD})
+                    if response.status_code == 200:
+                        login_latencies.append(time.perf_counter() - started)
+                    else:
+                        login_errors += 1
+
+            storm_started = time.perf_counter()
+            storm = asyncio.gather(*(storm_worker() for _ in range(args.storm_concurrency)))
+            await asyncio.sleep(0.5)  # deixa a avalanche encher a fila
+            during_storm = await probe()
+            await storm
+            storm_stats = summarize(login_latencies, time.perf_counter() - storm_started, login_errors)
+
+    results = {
+        "accounts_baseline": baseline,
+        "accounts_during_storm": during_storm,
+        "login_storm": storm_stats,
+    }
+    save_results(args.output, {
+        "meta": {**environment_metadata(), "config": {
+            key: value for key, value in vars(args).items() if key not in ("output", "mongo_url")
+        }},
+        "results": results,
+    })
+    print_table(results)
+    print(f"\nResultados salvos em {args.output}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main(parse_args()))
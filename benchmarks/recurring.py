@@ -0,0 +1,182 @@
+# benchmarks/recurring.py
+
+"""
+Mede a vazão do agendador de transações recorrentes (app/db/recurring.py).
+
+Popula um MongoDB local com uma população sintética de regras (mensais,
+semanais e a cada N dias, com datas iniciais espalhadas pelos últimos meses)
+e roda varreduras do agendador diretamente, sem HTTP:
+
+- first_sweep: materializa todas as ocorrências vencidas;
+- idle_sweep: roda de novo sem nada vencido (custo da varredura vazia);
+- replay_sweep: volta as regras ao estado inicial, simulando um processo que
+  caiu depois dos inserts e antes de avançar as regras. Todas as ocorrências
+  devem ser descartadas como duplicadas, sem nenhuma transação nova.
+
+Com transações multi-documento (replica set) o caminho de escrita é outro: um
+lote com uma duplicada aborta o insert_many inteiro. Rode as duas topologias e
+compare o replay_sweep; `--require-transactions` falha se o servidor não
+aceitar transações. Um replica set de um nó basta:
+
+    docker run -d -p 27017:27017 mongo:7 --replSet rs0
+    docker exec <container> mongosh --eval 'rs.initiate()'
+    python -m benchmarks.recurring --mongo-url 'mongodb://localhost:27017/?directConnection=true' \
+        --require-transactions --output recurring_rs.json
+
+Uso (servidor standalone):
+    python -m benchmarks.recurring --users 200 --rules-per-user 20 --output recurring.json
+"""
+
+import argparse
+import asyncio
+import os
+import random
+import time
+from datetime import datetime, timedelta
+from decimal import Decimal
+
+from .common import DEFAULT_DATABASE, DEFAULT_MONGO_URL, configure_environment, environment_metadata, save_results
+
+FREQUENCIES = ("monthly", "weekly", "custom")
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Benchmark do agendador de transações recorrentes.")
+    parser.add_argument("--mongo-url", default=os.getenv("BENCH_MONGO_URL", DEFAULT_MONGO_URL))
+    parser.add_argument("--database", default=os.getenv("BENCH_DATABASE", DEFAULT_DATABASE))
+    parser.add_argument("--users", type=int, default=200)
+    parser.add_argument("--rules-per-user", type=int, default=20)
+    parser.add_argument("--months", type=int, default=6, help="Meses de atraso máximo das datas iniciais")
+    parser.add_argument("--batch-size", type=int, default=None, help="Sobrescreve RECURRING_INSERT_BATCH_SIZE")
+    parser.add_argument("--require-transactions", action="store_true",
+                        help="Falha se o MongoDB não aceitar transações (ex.: standalone)")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--output", default="bench_results_recurring.json")
+    return parser.parse_args()
+
+
+def fake_rules(rng, user_id, account_id, category_ids, count, now, months):
+    """Gera regras sintéticas com a primeira ocorrência nos últimos `months` meses."""
+    span_seconds = months * 30 * 24 * 3600
+    for index in range(count):
+        frequency = rng.choice(FREQUENCIES)
+        start_date = now - timedelta(seconds=rng.randrange(span_seconds))
+        yield {
+            "description": f"Conta recorrente {index}",
+            "value": Decimal(rng.randint(1000, 300000)) / 100,
+            "type": "expense",
+            "account_id": account_id,
+            "category_id": rng.choice(category_ids),
+            "status": "pending",
+            "expense_type": "fixed",
+            "notes": None,
+            "frequency": frequency,
+            "interval": 1 if frequency != "custom" else rng.choice((3, 10, 15)),
+            "start_date": start_date.replace(microsecond=0),
+            "end_date": None,
+            "user_id": user_id,
+            "active": True,
+            "occurrences": 0,
+            "next_run": start_date.replace(microsecond=0),
+            "created_at": now,
+            "updated_at": now,
+        }
+
+
+async def seed(args, now):
+    """Recria o banco de benchmark com usuários, contas, categorias e regras."""
+    from app.db.mongodb import client as mongo_client, database
+    from app.db.balances import initial_totals
+
+    rng = random.Random(args.seed)
+    await mongo_client.drop_database(args.database)
+
+    rules = []
+    for user_index in range(args.users):
+        user_id = (await database["users"].insert_one({
+            "email": f"recurring{user_index}@example.com", "name": f"Recurring {user_index}",
+            "hashed_password": "-",
+        })).inserted_id
+        account_id = (await database["accounts"].insert_one({
+            "name": "Conta", "type": "checking", "balance": Decimal("0"), "user_id": user_id,
+            **initial_totals(Decimal("0")),
+        })).inserted_id
+        category_ids = (await database["categories"].insert_many([
+            {"name": f"Categoria {index}", "icon": None, "user_id": user_id} for index in range(5)
+        ])).inserted_ids
+        rules.extend(fake_rules(rng, user_id, account_id, category_ids, args.rules_per_user, now, args.months))
+
+    await database["recurring_rules"].insert_many(rules, ordered=False)
+    return len(rules)
+
+
+async def timed_sweep(now):
+    from app.db.recurring import materialize_due
+
+    started = time.perf_counter()
+    stats = await materialize_due(now)
+    wall_time = time.perf_counter() - started
+    processed = stats["inserted"] + stats["duplicates"]
+    return {
+        **stats,
+        "wall_time_s": round(wall_time, 4),
+        "rules_per_s": round(stats["rules"] / wall_time, 2) if wall_time else 0.0,
+        "occurrences_per_s": round(processed / wall_time, 2) if wall_time else 0.0,
+    }
+
+
+async def main(args):
+    configure_environment(args.mongo_url, args.database)
+    # O agendador em segundo plano não roda: as varreduras são disparadas aqui
+    os.environ["RECURRING_SCHEDULER_ENABLED"] = "false"
+    if args.batch_size:
+        os.environ["RECURRING_INSERT_BATCH_SIZE"] = str(args.batch_size)
+
+    from app.db.indexes import ensure_indexes
+    from app.db.mongodb import close_mongo_connection, connect_to_mongo, database, transactions_enabled
+
+    now = datetime(2025, 1, 1)
+    await connect_to_mongo()
+    if args.require_transactions and not transactions_enabled():
+        close_mongo_connection()
+        raise SystemExit("O MongoDB não aceita transações: use um replica set ou mongos.")
+    try:
+        rule_count = await seed(args, now)
+        await ensure_indexes()
+
+        results = {"first_sweep": await timed_sweep(now)}
+        results["idle_sweep"] = await timed_sweep(now)
+
+        transactions_before = await database["transactions"].count_documents({})
+        await database["recurring_rules"].update_many(
+            {}, [{"$set": {"occurrences": 0, "next_run": "$start_date", "active": True}}]
+        )
+        results["replay_sweep"] = await timed_sweep(now)
+        results["replay_sweep"]["new_transactions"] = (
+            await database["transactions"].count_documents({}) - transactions_before
+        )
+    finally:
+        close_mongo_connection()
+
+    save_results(args.output, {
+        "meta": {**environment_metadata(), "config": {
+            **{key: value for key, value in vars(args).items() if key not in ("output", "mongo_url")},
+            "rules": rule_count,
+            "transactions": transactions_enabled(),
+        }},
+        "results": results,
+    })
+
+    header = f"{'varredura':<16}{'regras':>10}{'inseridas':>12}{'duplicadas':>12}{'ocorr./s':>12}{'tempo s':>10}"
+    print(header)
+    print("-" * len(header))
+    for name, stats in results.items():
+        print(
+            f"{name:<16}{stats['rules']:>10}{stats['inserted']:>12}{stats['duplicates']:>12}"
+            f"{stats['occurrences_per_s']:>12}{stats['wall_time_s']:>10}"
+        )
+    print(f"\nResultados salvos em {args.output}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main(parse_args()))
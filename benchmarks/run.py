@@ -0,0 +1,254 @@
+# benchmarks/run.py
+
+"""
+Benchmark reproduzível dos caminhos mais usados da API.
+
+Popula um MongoDB local (nunca o de produção) com um conjunto sintético de
+usuários, categorias e transações, sobe a aplicação FastAPI no mesmo processo
+e a exercita por um cliente ASGI (httpx), sem rede nem servidor HTTP.
+Para cada cenário mede a vazão e as latências p50/p95/p99 e grava tudo em JSON.
+
+Pré-requisitos:
+    - um mongod local (ex.: docker run -p 27017:27017 mongo:7)
+    - httpx, do grupo de dependências bench (instalado pelo `uv sync`)
+
+Uso:
+    python -m benchmarks.run --users 5 --transactions-per-user 20000 --output bench.json
+    python -m benchmarks.compare antes.json depois.json
+"""
+
+import argparse
+import asyncio
+import os
+import random
+from datetime import datetime, timedelta
+from decimal import Decimal
+
+from .common import (
+    DEFAULT_DATABASE, DEFAULT_MONGO_URL, configure_environment, environment_metadata,
+    print_table, run_load, save_results
+)
+
+PASSWORD = "benchmark-password"
+INSERT_BATCH_SIZE = 5000
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Benchmark dos endpoints da API.")
+    parser.add_argument("--mongo-url", default=os.getenv("BENCH_MONGO_URL", DEFAULT_MONGO_URL))
+    parser.add_argument("--database", default=os.getenv("BENCH_DATABASE", DEFAULT_DATABASE))
+    parser.add_argument("--users", type=int, default=3)
+    parser.add_argument("--categories-per-user", type=int, default=10)
+    parser.add_argument("--transactions-per-user", type=int, default=10_000)
+    parser.add_argument("--months", type=int, default=24, help="Meses de histórico gerados")
+    parser.add_argument("--requests", type=int, default=500, help="Requisições por cenário")
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--output", default="bench_results.json")
+    parser.add_argument("--skip-seed", action="store_true", help="Reaproveita os dados já populados")
+    return parser.parse_args()
+
+
+def fake_transactions(rng, user_id, account_id, category_ids, count, months):
+    """Gera transações sintéticas distribuídas pelos últimos `months` meses."""
+    now = datetime(2025, 1, 1)
+    span_seconds = months * 30 * 24 * 3600
+    for index in range(count):
+        is_income = rng.random() < 0.2
+        yield {
+            "user_id": user_id,
+            "account_id": account_id,
+            "category_id": rng.choice(category_ids),
+            "type": "income" if is_income else "expense",
+            "description": f"Transação sintética {index}",
+            "value": Decimal(rng.randint(1000, 700000)) / 100,
+            "transaction_date": now - timedelta(seconds=rng.randrange(span_seconds)),
+            "status": "received" if is_income else rng.choice(["paid", "pending"]),
+            "expense_type": None if is_income else rng.choice(["fixed", "variable"]),
+            "notes": rng.choice([None, "Observação de exemplo para o benchmark"]),
+            "installment_details": None,
+        }
+
+
+async def seed(client, args):
+    """Recria o banco de benchmark e devolve o contexto de cada usuário."""
+    from app.db.mongodb import client as mongo_client, database
+    from app.db.balances import reconcile_balances
+    from app.db.rollups import rebuild_rollups
+
+    rng = random.Random(args.seed)
+    if not args.skip_seed:
+        await mongo_client.drop_database(args.database)
+
+    users = []
+    for user_index in range(args.users):
+        email = f"bench{user_index}@example.com"
+        if not args.skip_seed:
+            response = await client.post(
+                "/users/register", json={"email": email, "name": f"Bench {user_index}", "password": PASSWORD}
+            )
+            response.raise_for_status()
+
+        user_doc = await database["users"].find_one({"email": email})
+        account = await database["accounts"].find_one({"user_id": user_doc["_id"]})
+        token = (await client.post("/token", data={"username": email, "password": PASSWORD})).json()["access_token"]
+        headers = {"Authorization": f"Bearer {token}"}
+
+        if not args.skip_seed:
+            for category_index in range(args.categories_per_user):
+                response = await client.post(
+                    "/categories/", json={"name": f"Categoria {category_index}"}, headers=headers
+                )
+                response.raise_for_status()
+
+        category_ids = [doc["_id"] async for doc in database["categories"].find({"user_id": user_doc["_id"]})]
+
+        if not args.skip_seed:
+            batch = []
+            for doc in fake_transactions(
+                rng, user_doc["_id"], account["_id"], category_ids, args.transactions_per_user, args.months
+            ):
+                batch.append(doc)
+                if len(batch) >= INSERT_BATCH_SIZE:
+                    await database["transactions"].insert_many(batch, ordered=False)
+                    batch = []
+            if batch:
+                await database["transactions"].insert_many(batch, ordered=False)
+
+        users.append({
+            "email": email,
+            "headers": headers,
+            "account_id": str(account["_id"]),
+            "category_ids": [str(category_id) for category_id in category_ids],
+        })
+
+    if not args.skip_seed:
+        await rebuild_rollups()
+        await reconcile_balances()
+    return users
+
+
+def build_scenarios(client, users, rng):
+    """Cada cenário é uma função async que faz uma requisição e valida o status."""
+    created_ids = {}
+
+    def user_for(index):
+        return users[index % len(users)]
+
+    async def check(response, expected=200):
+        if response.status_code != expected:
+            raise RuntimeError(f"{response.request.url}: {response.status_code} {response.text[:200]}")
+        return response
+
+    def transaction_body(user, index):
+        return {
+            "description": f"Benchmark {index}",
+            "value": "42.50",
+            "transaction_date": "2024-06-15T12:00:00",
+            "category_id": rng.choice(user["category_ids"]),
+            "type": "expense",
+            "account_id": user["account_id"],
+            "status": "paid",
+        }
+
+    async def login(index):
+        user = user_for(index)
+        await check(await client.post("/token", data={"username": user["email"], "password": PASSWORD}))
+
+    async def create(index):
+        user = user_for(index)
+        response = await check(
+            await client.post("/transactions/", json=transaction_body(user, index), headers=user["headers"]), 201
+        )
+        created_ids[index] = response.json()["_id"]
+
+    async def read(index):
+        user = user_for(index)
+        await check(await client.get(f"/transactions/{created_ids[index]}", headers=user["headers"]))
+
+    async def update(index):
+        user = user_for(index)
+        await check(await client.put(
+            f"/transactions/{created_ids[index]}", json={"value": "43.00"}, headers=user["headers"]
+        ))
+
+    async def delete(index):
+        user = user_for(index)
+        await check(await client.delete(f"/transactions/{created_ids[index]}", headers=user["headers"]), 204)
+
+    async def list_first_page(index):
+        user = user_for(index)
+        await check(await client.get("/transactions/", params={"limit": 50}, headers=user["headers"]))
+
+    async def list_deep_page(index):
+        user = user_for(index)
+        await check(await client.get(
+            "/transactions/", params={"limit": 50, "skip": 5000}, headers=user["headers"]
+        ))
+
+    async def dashboard(index):
+        user = user_for(index)
+        await check(await client.get(
+            "/dashboard/summary", params={"year": 2024, "month": 1 + index % 12}, headers=user["headers"]
+        ))
+
+    async def expenses_by_category(index):
+        user = user_for(index)
+        await check(await client.get(
+            "/reports/expenses-by-category", params={"year": 2024, "month": 1 + index % 12},
+            headers=user["headers"]
+        ))
+
+    async def income_vs_expenses(index):
+        user = user_for(index)
+        await check(await client.get(
+            "/reports/income-vs-expenses", params={"start_date": "2023-01-15", "end_date": "2024-12-20"},
+            headers=user["headers"]
+        ))
+
+    # A ordem importa: read/update/delete usam as transações criadas em "create"
+    return {
+        "login": login,
+        "transaction_create": create,
+        "transaction_read": read,
+        "transaction_update": update,
+        "transaction_delete": delete,
+        "transaction_list": list_first_page,
+        "transaction_list_deep": list_deep_page,
+        "dashboard_summary": dashboard,
+        "report_expenses_by_category": expenses_by_category,
+        "report_income_vs_expenses": income_vs_expenses,
+    }
+
+
+async def main(args):
+    configure_environment(args.mongo_url, args.database)
+
+    import httpx
+    from app.main import app
+
+    async with app.router.lifespan_context(app):
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+            users = await seed(client, args)
+            scenarios = build_scenarios(client, users, random.Random(args.seed))
+
+            results = {}
+            for name, operation in scenarios.items():
+                # Login é dominado pelo bcrypt; usamos menos requisições para não alongar a rodada
+                requests = max(args.requests // 10, 1) if name == "login" else args.requests
+                results[name] = await run_load(operation, requests, args.concurrency)
+
+    payload = {
+        "meta": {**environment_metadata(), "config": {
+            key: value for key, value in vars(args).items() if key not in ("output", "mongo_url")
+        }},
+        "results": results,
+    }
+    save_results(args.output, payload)
+    print_table(results)
+    print(f"\nResultados salvos em {args.output}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main(parse_args()))
@@ -0,0 +1,116 @@
+# benchmarks/serialization.py
+
+"""
+Custo por linha da serialização das listagens: caminho antigo vs. caminho rápido.
+
+- antigo: o que o FastAPI faz com response_model=List[TransactionInDB]
+  (valida cada documento pelo modelo, gera o dicionário em modo JSON e
+  serializa com json.dumps, como a JSONResponse).
+- rápido: app.core.serialization, que converte os documentos direto em bytes.
+
+Antes de medir, confere que os dois caminhos produzem exatamente o mesmo JSON.
+Não precisa de MongoDB: os documentos são gerados em memória com os mesmos
+tipos que o driver devolve (ObjectId, Decimal, datetime).
+
+Uso:
+    python -m benchmarks.serialization --rows 100 --repeat 200
+"""
+
+import argparse
+import json
+import random
+import time
+from datetime import datetime, timedelta
+from decimal import Decimal
+from typing import List
+
+from bson import ObjectId
+
+from .common import configure_environment, environment_metadata, save_results, DEFAULT_DATABASE
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Benchmark de serialização das listagens.")
+    parser.add_argument("--rows", type=int, default=100, help="Linhas por resposta")
+    parser.add_argument("--repeat", type=int, default=200, help="Respostas serializadas por caminho")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--output", default="bench_results_serialization.json")
+    return parser.parse_args()
+
+
+def fake_documents(rows: int, seed: int) -> List[dict]:
+    rng = random.Random(seed)
+    user_id, account_id = ObjectId(), ObjectId()
+    base = datetime(2024, 1, 1)
+    docs = []
+    for index in range(rows):
+        docs.append({
+            "_id": ObjectId(),
+            "user_id": user_id,
+            "account_id": account_id,
+            "category_id": ObjectId(),
+            "type": rng.choice(["income", "expense"]),
+            "description": f"Transação {index}",
+            "value": Decimal(rng.randint(100, 1_000_000)) / 100,
+            "transaction_date": base + timedelta(minutes=rng.randrange(500_000), milliseconds=rng.randrange(1000)),
+            "status": "paid",
+            "expense_type": rng.choice([None, "fixed", "variable"]),
+            "notes": rng.choice([None, "Observação"]),
+            "installment_details": rng.choice([None, {"current_installment": 1, "total_installments": 12}]),
+        })
+    return docs
+
+
+def main(args):
+    # O app lê as configurações ao ser importado; nenhum acesso ao banco é feito aqui
+    configure_environment("mongodb://localhost:27017", DEFAULT_DATABASE)
+
+    from pydantic import TypeAdapter
+    from app.core.serialization import serializer_for
+    from app.models.transaction import TransactionInDB
+
+    docs = fake_documents(args.rows, args.seed)
+    adapter = TypeAdapter(List[TransactionInDB])
+    serializer = serializer_for(TransactionInDB)
+
+    def legacy_path() -> bytes:
+        validated = adapter.validate_python(docs)
+        content = adapter.dump_python(validated, mode="json", by_alias=True)
+        return json.dumps(
+            content, ensure_ascii=False, allow_nan=False, indent=None, separators=(",", ":")
+        ).encode("utf-8")
+
+    def fast_path() -> bytes:
+        return serializer.dumps(docs)
+
+    if json.loads(legacy_path()) != json.loads(fast_path()):
+        raise SystemExit("Os dois caminhos produziram respostas diferentes.")
+
+    results = {}
+    for name, path in (("response_model", legacy_path), ("fast_serializer", fast_path)):
+        path()  # aquecimento
+        started = time.perf_counter()
+        for _ in range(args.repeat):
+            path()
+        elapsed = time.perf_counter() - started
+        results[name] = {
+            "rows": args.rows,
+            "responses": args.repeat,
+            "per_response_ms": round(elapsed / args.repeat * 1000, 4),
+            "per_row_us": round(elapsed / (args.repeat * args.rows) * 1_000_000, 3),
+        }
+
+    speedup = results["response_model"]["per_row_us"] / results["fast_serializer"]["per_row_us"]
+    for name, stats in results.items():
+        print(f"{name:<18} {stats['per_row_us']:>10} µs/linha {stats['per_response_ms']:>10} ms/resposta")
+    print(f"Ganho: {speedup:.2f}x")
+
+    save_results(args.output, {
+        "meta": {**environment_metadata(), "config": vars(args)},
+        "results": results,
+        "speedup": round(speedup, 2),
+    })
+
+
+if __name__ == "__main__":
+    main(parse_args())